@@ -22,6 +22,7 @@ from rbac.common.addresser.addressers import get_address_type
 from rbac.common.addresser.addressers import get_addresser
 from rbac.common.addresser.addressers import deserialize
 from rbac.common.addresser.addressers import deserialize_list
+from rbac.common.addresser.addressers import find_addresser
 from rbac.common.addresser.addressers import parse
 from rbac.common.addresser.addressers import parse_addresses
 from rbac.common.addresser.family_address import family
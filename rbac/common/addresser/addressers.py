@@ -12,24 +12,49 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # -----------------------------------------------------------------------------
-"""A registry of addressers; to facilitate root level addresser functions"""
+"""A registry of addressers; to facilitate root level addresser functions
+
+Addressers are looked up by the type fields of the fixed address layout
+(see AddressBase) rather than by trying each addresser's pattern in turn.
+By default the matched addresser's pattern still validates the whole
+address; callers that have already checked an address (e.g. ledger sync,
+which filters on the family namespace) may pass validate=False."""
 from rbac.common.logs import get_default_logger
 
 LOGGER = get_default_logger(__name__)
 ADDRESSERS = {}
+ADDRESSER_DISPATCH = {}
+ADDRESS_LENGTH = 70
+
+
+def dispatch_key(address):
+    """Returns the object type, related type and relationship type fields
+    of an address, which together identify its address type"""
+    return address[10:14] + address[38:44]
 
 
 def register_addresser(addresser):
     """Register the addresser so it can respond to root addresser methods"""
     ADDRESSERS[addresser.address_type_name] = addresser
+    ADDRESSER_DISPATCH[addresser.dispatch_key] = addresser
 
 
-def get_address_type(address):
+def find_addresser(address, validate=True):
+    """Returns the registered addresser for the address type of the address,
+    or None if the address is not of a registered address type"""
+    if not isinstance(address, str) or len(address) != ADDRESS_LENGTH:
+        return None
+    addresser = ADDRESSER_DISPATCH.get(dispatch_key(address))
+    if addresser is None or (validate and not addresser.matches(address)):
+        return None
+    return addresser
+
+
+def get_address_type(address, validate=True):
     """Returns the address type of the address from AddressSpace"""
-    for _, addresser in ADDRESSERS.items():
-        result = addresser.get_address_type(address=address)
-        if result:
-            return result
+    addresser = find_addresser(address, validate)
+    if addresser:
+        return addresser.address_type
     raise ValueError(
         "get_address_type error, no addresser found for address {}".format(
             parse(address)
@@ -37,35 +62,34 @@ def get_address_type(address):
     )
 
 
-def get_addresser(address):
+def get_addresser(address, validate=True):
     """Returns addresser that handles the address type of given address"""
-    for _, addresser in ADDRESSERS.items():
-        result = addresser.get_addresser(address=address)
-        if result:
-            return result
+    addresser = find_addresser(address, validate)
+    if addresser:
+        return addresser
     raise ValueError(
         "get_addresser error, no addresser found for address {}".format(parse(address))
     )
 
 
-def parse(address):
+def parse(address, validate=True):
     """Parses an address into its components"""
-    for _, addresser in ADDRESSERS.items():
-        result = addresser.parse(address=address)
-        if result:
-            return result
+    addresser = find_addresser(address, validate)
+    if addresser:
+        return addresser.parse(address=address, validate=False)
     raise ValueError("parse error, no addresser found for address {}".format(address))
 
 
-def parse_addresses(addresses):
+def parse_addresses(addresses, validate=True):
     """Parse the given address list into each of their components"""
-    return [parse(address) for address in addresses]
+    return [parse(address, validate) for address in addresses]
 
 
-def deserialize(address, data):
+def deserialize(address, data, validate=True):
     """Deserializes the container of a given an address"""
-    for _, addresser in ADDRESSERS.items():
-        result = addresser.deserialize(address=address, data=data)
+    addresser = find_addresser(address, validate)
+    if addresser:
+        result = addresser.deserialize(address=address, data=data, validate=False)
         if result:
             return result
     raise ValueError(
@@ -73,10 +97,11 @@ def deserialize(address, data):
     )
 
 
-def deserialize_list(address, data):
+def deserialize_list(address, data, validate=True):
     """Deserializes the container of a given an address and returns the store list"""
-    for _, addresser in ADDRESSERS.items():
-        result = addresser.deserialize_list(address=address, data=data)
+    addresser = find_addresser(address, validate)
+    if addresser:
+        result = addresser.deserialize_list(address=address, data=data, validate=False)
         if result:
             return result
     raise ValueError(
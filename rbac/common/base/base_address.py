@@ -146,10 +146,25 @@ class AddressBase(StateBase):
         )
         return address
 
-    def parse(self, address):
+    def matches(self, address):
+        """Determines if the address is of the address type implemented by this class"""
+        return bool(self._pattern.match(address))
+
+    @property
+    def dispatch_key(self):
+        """The object type, related type and relationship type fields of
+        addresses of this address type (see addressers.dispatch_key)"""
+        return (
+            hex(self.object_type.value)[2:].zfill(4)
+            + hex(self.related_type.value)[2:].zfill(4)
+            + hex(self.relationship_type.value)[2:].zfill(2)
+        )
+
+    def parse(self, address, validate=True):
         """Returns the components of an address if the address if of the address type
-        implemented by this class or a child class, otherwise returns None"""
-        if self._pattern.match(address):
+        implemented by this class or a child class, otherwise returns None
+        validate=False skips the pattern match for an already dispatched address"""
+        if not validate or self._pattern.match(address):
             return Address(
                 address=address,
                 address_type=self.address_type,
@@ -212,17 +227,17 @@ class AddressBase(StateBase):
         """Determines if all addresses given are of the classes' address type"""
         return all([self.get_address_type(a) for a in addresses])
 
-    def get_address_type(self, address):
+    def get_address_type(self, address, validate=True):
         """Returns the address type if the address is of the address type
         implemented by this class, otherwise returns None"""
-        if self._pattern.match(address):
+        if not validate or self._pattern.match(address):
             return self.address_type
         return None
 
-    def get_addresser(self, address):
+    def get_addresser(self, address, validate=True):
         """Returns the self if the address is of the address type
         implemented by this class, otherwise returns None"""
-        if self._pattern.match(address):
+        if not validate or self._pattern.match(address):
             return self
         return None
 
@@ -239,16 +254,16 @@ class AddressBase(StateBase):
             return None
         return value
 
-    def deserialize(self, address, data):
+    def deserialize(self, address, data, validate=True):
         """Returns the deserialized content if the address is of the address type
         implemented by this class or a child class, otherwise returns None"""
-        if self._pattern.match(address):
+        if not validate or self._pattern.match(address):
             return super().deserialize(address=address, data=data)
         return None
 
-    def deserialize_list(self, address, data):
+    def deserialize_list(self, address, data, validate=True):
         """Returns the deserialized content if the address is of the address type
         implemented by this class or a child class, otherwise returns None"""
-        if self._pattern.match(address):
+        if not validate or self._pattern.match(address):
             return super().deserialize_list(address=address, data=data)
         return None
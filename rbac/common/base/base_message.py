@@ -33,6 +33,7 @@ from rbac.common.sawtooth.client_sync import ClientSync
 from rbac.common.sawtooth import state_client
 from rbac.common.base import base_processor as processor
 from rbac.common.base.base_address import AddressBase
+from rbac.common.base.base_state import per_class_property
 from rbac.common.protobuf.rbac_payload_pb2 import Signer
 from rbac.common.sawtooth.rbac_payload import MessagePayload
 from rbac.common.logs import get_default_logger
@@ -105,7 +106,7 @@ class BaseMessage(AddressBase):
         """The relationship type this message acts upon"""
         return self.relationship_type
 
-    @property
+    @per_class_property
     def _name_id(self):
         """The attribute name for the object type
         Example: ObjectType.ROLE -> 'role_id'
@@ -118,7 +119,7 @@ class BaseMessage(AddressBase):
             return "next_id"
         return self.message_object_type.name.lower() + "_id"
 
-    @property
+    @per_class_property
     def _related_id(self):
         """The attribute name for the related_id if not related_id
         e.g. RelatedType.TASK -> 'task_id'
@@ -132,7 +133,7 @@ class BaseMessage(AddressBase):
             return "next_id"
         return self.message_related_type.name.lower() + "_id"
 
-    @property
+    @per_class_property
     def message_type_name(self):
         """The name of the message type, derives from the message properties
         Example: ObjectType.USER  MessageActionType.CREATE -> CREATE_USER
@@ -180,7 +181,7 @@ class BaseMessage(AddressBase):
             return self.message_action_type.name + "_" + self.message_object_type.name
         return self._message_type_name
 
-    @property
+    @per_class_property
     def message_subtype_name(self):
         """The name of the message sub type, derives from the message properties
         Example: SubActionType.UPDATE, MessageObjectType.USER,
@@ -211,7 +212,7 @@ class BaseMessage(AddressBase):
             )
         return None
 
-    @property
+    @per_class_property
     def message_type(self):
         """The message type of this message, an attribute enum of RBACPayload
         Defaults to protobuf.rbac_payload_pb2.{message_type_name}
@@ -220,7 +221,7 @@ class BaseMessage(AddressBase):
             raise NotImplementedError("Class must implement this property")
         return getattr(protobuf.rbac_payload_pb2.RBACPayload, self.message_type_name)
 
-    @property
+    @per_class_property
     def message_proto(self):
         """The protobuf used to serialize this message type
         Derives name form the object type and message action type names.
@@ -256,7 +257,7 @@ class BaseMessage(AddressBase):
             self._camel_case(self.message_type_name),
         )
 
-    @property
+    @per_class_property
     def proposal_type(self):
         """The type of the proposal (if any) implemented by this message"""
         if not hasattr(protobuf.proposal_state_pb2.Proposal, self.message_subtype_name):
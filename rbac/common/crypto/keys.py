@@ -30,6 +30,9 @@ PUBLIC_KEY_PATTERN = re.compile(r"^[0-9a-f]{66}$")
 PRIVATE_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
 ELLIPTIC_CURVE_ALGORITHM = "secp256k1"
 
+# Signing contexts hold no per-key state, so every Key shares one
+CONTEXT = create_context(ELLIPTIC_CURVE_ALGORITHM)
+
 
 class Key:
     """
@@ -43,7 +46,7 @@ class Key:
         Key() -- generates a new key
         Key(private_key:str) -- Uses the private key passed
         """
-        self._context = create_context(ELLIPTIC_CURVE_ALGORITHM)
+        self._context = CONTEXT
 
         if private_key is None and public_key is None:
             private_key = Secp256k1PrivateKey.new_random()
@@ -56,13 +59,14 @@ class Key:
 
         self._public_key = public_key
         self._private_key = private_key
+        # Every transaction signed with a Key names its public key, usually
+        # several times over, so the hex is worked out only once
+        self._public_key_hex = public_key.as_hex() if public_key else None
 
     @property
     def public_key(self):
         """Public part of this Key as a 66 character hexidecimal string"""
-        if self._public_key is None:
-            return None
-        return self._public_key.as_hex()
+        return self._public_key_hex
 
     @property
     def private_key(self):
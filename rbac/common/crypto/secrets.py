@@ -51,10 +51,11 @@ def generate_api_key(secret_key, next_id):
     return token.decode("ascii")
 
 
-def deserialize_api_key(secret_key, token):
-    """Decode the API key of a user"""
+def deserialize_api_key(secret_key, token, return_header=False):
+    """Decode the API key of a user. With return_header, also return the
+    token header, whose exp field is the token's expiry in unix time"""
     serializer = Serializer(secret_key)
-    return serializer.loads(token)
+    return serializer.loads(token, return_header=return_header)
 
 
 # pylint: disable=unused-argument
@@ -123,6 +123,49 @@ def make_batch_from_txns(transactions, signer_keypair):
     )
 
 
+def make_batch_list_from_txns(transactions, signer_keypair, batch_size=None):
+    """ Given a list of transactions, create a batch list that applies them
+    in order, in batches of at most batch_size transactions (or a single
+    batch if batch_size is not given).
+
+    Sawtooth commits each batch of a list on its own, so the first
+    transaction of every batch after the first is made to depend on the last
+    transaction of the batch before it. If a batch is invalid, none of the
+    batches after it can commit, and the list stays all or nothing. Its
+    transactions must have been signed by signer_keypair.
+    """
+    if not batch_size:
+        batch_size = len(transactions)
+    batches = []
+    for start in range(0, len(transactions), batch_size):
+        chunk = list(transactions[start : start + batch_size])
+        if batches:
+            chunk[0] = add_dependency(
+                chunk[0], batches[-1].transactions[-1].header_signature, signer_keypair
+            )
+        batches.append(
+            make_batch_from_txns(transactions=chunk, signer_keypair=signer_keypair)
+        )
+    return batch_pb2.BatchList(batches=batches)
+
+
+def add_dependency(transaction, dependency, signer_keypair):
+    """ Return a copy of a transaction that may only be applied after the
+    transaction whose id is dependency, re-signed by signer_keypair.
+    """
+    header = transaction_pb2.TransactionHeader()
+    header.ParseFromString(transaction.header)
+    if header.signer_public_key != signer_keypair.public_key:
+        raise ValueError("Transaction was not signed by the batch signer")
+    header.dependencies.append(dependency)  # pylint: disable=no-member
+    header_bytes = header.SerializeToString()
+    return transaction_pb2.Transaction(
+        payload=transaction.payload,
+        header=header_bytes,
+        header_signature=signer_keypair.sign(header_bytes),
+    )
+
+
 def batch_to_list(batch):
     """ Make a batch list from a batch
     """
@@ -0,0 +1,373 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+""" Syncs a whole block of state changes to RethinkDB with one write per table
+
+The per-change updater and remover issue several round trips for every
+address. Here all changes of a block are decoded first, grouped by target
+table and written with a single for_each replace or get_all delete per
+table. Changes are split into segments in which every address appears at
+most once, and segments are applied in order, so repeated writes to the
+same address within a block land in the same order as the per-change path.
+A step that fails is logged and skipped, so the rest of the block is still
+applied and the block is still recorded.
+"""
+import rethinkdb as r
+
+from rbac.common import addresser
+from rbac.common.addresser import AddressSpace
+from rbac.common.logs import get_default_logger
+from rbac.common.util import bytes_from_hex
+from rbac.ledger_sync.deltas.decoding import TABLE_NAMES, data_to_dicts
+from rbac.ledger_sync.deltas.updating import (
+    format_role,
+    get_provider,
+    legacy_record,
+    metadata_record,
+    pre_filter,
+    state_records,
+)
+from rbac.server.db.org_hierarchy_query import sync_org_hierarchy
+from rbac.server.db.relationships_query import fetch_remote_id_relationships
+
+LOGGER = get_default_logger(__name__)
+
+OUTBOUND_ROLE_TYPES = (AddressSpace.ROLES_ATTRIBUTES, AddressSpace.ROLES_MEMBERS)
+
+
+def decode_changes(state_changes):
+    """Decode the RBAC family changes of a block into (address, resource)
+    pairs, in block order. resource is None for a removed address.
+    """
+    decoded = []
+    for change in state_changes:
+        if addresser.family.is_family(change.address):
+            if not change.value:
+                decoded.append((change.address, None))
+            else:
+                resource = data_to_dicts(change.address, change.value)[0]
+                decoded.append((change.address, resource))
+    return decoded
+
+
+def split_segments(decoded):
+    """Split decoded changes into ordered segments with unique addresses."""
+    segments = []
+    segment = []
+    seen = set()
+    for address, resource in decoded:
+        if address in seen:
+            segments.append(segment)
+            segment = []
+            seen = set()
+        seen.add(address)
+        segment.append((address, resource))
+    if segment:
+        segments.append(segment)
+    return segments
+
+
+def apply_block_changes(conn, block_num, decoded):
+    """Write a block's decoded changes to the database in bulk.
+    Returns the change in row count of each legacy table.
+    """
+    count_deltas = {}
+    for segment in split_segments(decoded):
+        updates = [(adr, rsc) for adr, rsc in segment if rsc is not None]
+        removals = [adr for adr, rsc in segment if rsc is None]
+        history = []
+        if updates:
+            history.extend(
+                _isolated("updating state", [], _update_state, conn, block_num, updates)
+            )
+        if removals:
+            history.extend(_remove_state(conn, removals))
+        _isolated("inserting history", None, _insert_history, conn, history)
+        if updates:
+            _update_legacy(conn, block_num, updates, count_deltas)
+        if removals:
+            _remove_legacy(conn, removals, count_deltas)
+        if updates:
+            _isolated("updating providers", None, _update_providers, conn, updates)
+    return count_deltas
+
+
+def _isolated(step, default, func, *args):
+    """Run one step of applying a block. If it fails, log the error and
+    return default, so the steps after it still run."""
+    try:
+        return func(*args)
+    except Exception as err:  # pylint: disable=broad-except
+        LOGGER.warning("error %s:", step)
+        LOGGER.warning(err)
+        return default
+
+
+def _log_errors(result, table):
+    if result and result.get("errors"):
+        LOGGER.warning(
+            "error writing %s batch: %s", table, result.get("first_error", result)
+        )
+
+
+def _update_state(conn, block_num, updates):
+    """Replace the state and metadata records of updated addresses.
+    Returns the previous versions of replaced state records.
+    """
+    now = r.now()
+    state_rows = []
+    metadata_rows = []
+    for address, resource in updates:
+        pre_filter(resource)
+        address_binary = bytes_from_hex(address)
+        data, delta, related_id = state_records(block_num, address, resource, now)
+        state_rows.append({"key": address_binary, "data": data, "delta": delta})
+        if not related_id:
+            metadata_rows.append(
+                {
+                    "key": address_binary,
+                    "data": metadata_record(data, address_binary),
+                    "delta": delta,
+                }
+            )
+
+    result = _write_rows(conn, "state", state_rows, return_changes=True)
+    if metadata_rows:
+        _write_rows(conn, "metadata", metadata_rows)
+    return [
+        change["old_val"]
+        for change in result.get("changes", [])
+        if change.get("old_val") is not None
+    ]
+
+
+def _remove_state(conn, removals):
+    """Delete the state and metadata records of removed addresses.
+    Returns the deleted state records.
+    """
+    state_keys = []
+    metadata_keys = []
+    for address in removals:
+        address_binary = bytes_from_hex(address)
+        state_keys.append(address_binary)
+        if not bytes_from_hex(addresser.parse(address, validate=False).related_id):
+            metadata_keys.append(address_binary)
+
+    result = _delete_rows(conn, "state", state_keys, return_changes=True)
+    if metadata_keys:
+        _delete_rows(conn, "metadata", metadata_keys)
+    return [
+        change["old_val"]
+        for change in result.get("changes", [])
+        if change.get("old_val") is not None
+    ]
+
+
+def _insert_history(conn, history):
+    if history:
+        _log_errors(r.table("state_history").insert(history).run(conn), "history")
+
+
+def _replace_rows(table, rows, return_changes=False):
+    """Query that inserts each row's data, or merges its delta into the
+    existing record, in a single round trip."""
+    return r.expr(rows).for_each(
+        lambda row: r.table(table)
+        .get(row["key"])
+        .replace(
+            lambda doc: r.branch(
+                # pylint: disable=singleton-comparison
+                (doc == None),  # noqa
+                row["data"],
+                doc.merge(row["delta"]),
+            ),
+            return_changes=return_changes,
+        )
+    )
+
+
+def _write_rows(conn, table, rows, return_changes=False):
+    """Replace rows of a table in one query. If the query fails, write the
+    rows one at a time instead, logging and skipping the ones that fail, so
+    one bad record does not drop the rest of the block's changes.
+    Returns the write result, summed over the rows written one at a time.
+    """
+    try:
+        result = _replace_rows(table, rows, return_changes).run(conn)
+    except r.ReqlError as err:
+        LOGGER.warning(
+            "batched %s write failed, writing %s rows one at a time: %s",
+            table,
+            len(rows),
+            err,
+        )
+        result = {}
+        for row in rows:
+            try:
+                row_result = _replace_rows(table, [row], return_changes).run(conn)
+            except Exception as row_err:  # pylint: disable=broad-except
+                LOGGER.warning("error writing %s row %s:", table, row["key"])
+                LOGGER.warning(row_err)
+                continue
+            _add_result(result, row_result)
+    _log_errors(result, table)
+    return result
+
+
+def _delete_rows(conn, table, keys, return_changes=False):
+    """Delete rows of a table by key in one query, logging and skipping the
+    delete if it fails. Returns the delete result, empty if it failed."""
+    result = _isolated(
+        "deleting {} rows".format(table),
+        {},
+        lambda: r.table(table)
+        .get_all(*keys)
+        .delete(return_changes=return_changes)
+        .run(conn),
+    )
+    _log_errors(result, table)
+    return result
+
+
+def _add_result(total, result):
+    """Add the counts and changes of a write result to a running total."""
+    for key, value in result.items():
+        if key == "changes":
+            total.setdefault(key, []).extend(value)
+        elif isinstance(value, int):
+            total[key] = total.get(key, 0) + value
+        else:
+            total.setdefault(key, value)
+
+
+def _update_legacy(conn, block_num, updates, count_deltas):
+    """Replace the legacy sync table records of updated addresses."""
+    tables = {}
+    for address, resource in updates:
+        data_type = addresser.get_address_type(address, validate=False)
+        if data_type in TABLE_NAMES:
+            tables.setdefault(TABLE_NAMES[data_type], []).append(
+                {
+                    "key": address,
+                    "data": legacy_record(block_num, address, resource),
+                    "delta": resource,
+                }
+            )
+    for table, rows in tables.items():
+        users = table == "users"
+        result = _write_rows(conn, table, rows, return_changes=users)
+        count_deltas[table] = count_deltas.get(table, 0) + result.get("inserted", 0)
+        if users:
+            _isolated(
+                "syncing org hierarchy",
+                None,
+                sync_org_hierarchy,
+                conn,
+                result.get("changes", []),
+            )
+
+
+def _remove_legacy(conn, removals, count_deltas):
+    """Delete the legacy sync table records of removed addresses, and the
+    off chain records of deleted users."""
+    tables = {}
+    for address in removals:
+        data_type = addresser.get_address_type(address, validate=False)
+        if data_type in TABLE_NAMES:
+            tables.setdefault(TABLE_NAMES[data_type], []).append(address)
+    for table, addresses in tables.items():
+        result = _delete_rows(conn, table, addresses, return_changes=True)
+        count_deltas[table] = count_deltas.get(table, 0) - result.get("deleted", 0)
+        if table == "users":
+            next_ids = [
+                change["old_val"]["next_id"]
+                for change in result.get("changes", [])
+                if change.get("old_val")
+            ]
+            if next_ids:
+                _isolated(
+                    "removing user records", None, _remove_user_records, conn, next_ids
+                )
+            _isolated(
+                "syncing org hierarchy",
+                None,
+                sync_org_hierarchy,
+                conn,
+                result.get("changes", []),
+            )
+
+
+def _remove_user_records(conn, next_ids):
+    """When users have been deleted from the blockchain, also clear out the
+    following off chain tables related to them: auth, metadata,
+    user_mapping, and pack_owners"""
+    next_id_list = r.expr(next_ids)
+    r.table("auth").get_all(*next_ids).delete().run(conn)
+    r.table("metadata").filter(
+        lambda doc: next_id_list.contains(doc["next_id"].default(None))
+    ).delete().run(conn)
+    r.table("user_mapping").get_all(*next_ids).delete().run(conn)
+    r.table("pack_owners").get_all(*next_ids, index="identifiers").filter(
+        lambda doc: r.expr([[next_id] for next_id in next_ids]).contains(
+            doc["identifiers"]
+        )
+    ).delete().run(conn)
+
+
+def _update_providers(conn, updates):
+    """Place one outbound queue entry per updated outbound synced role.
+
+    Each entry carries a snapshot of the role and its full member list, so
+    several changes to the same role within a block need only one entry.
+    """
+    role_ids = []
+    for address, resource in updates:
+        if addresser.get_address_type(address, validate=False) in OUTBOUND_ROLE_TYPES:
+            if resource["role_id"] not in role_ids:
+                role_ids.append(resource["role_id"])
+    if not role_ids:
+        return
+
+    roles = (
+        r.table("roles")
+        .get_all(*role_ids, index="role_id")
+        .merge(
+            lambda role: {
+                "members": fetch_remote_id_relationships(
+                    "role_members", "role_id", role["role_id"]
+                )
+            }
+        )
+        .coerce_to("array")
+        .run(conn)
+    )
+    found = {role["role_id"] for role in roles}
+    for role_id in role_ids:
+        if role_id not in found:
+            LOGGER.debug("Role %s has not been inserted into RethinkDB yet...", role_id)
+
+    outbound_entries = [
+        {
+            "data": format_role(role),
+            "data_type": "group",
+            "timestamp": r.now(),
+            "provider_id": get_provider(role["name"]),
+            "status": "UNCONFIRMED",
+            "action": "",
+        }
+        for role in roles
+        if role["metadata"].get("sync_direction", "") == "OUTBOUND"
+    ]
+    if outbound_entries:
+        r.table("outbound_queue").insert(outbound_entries).run(conn)
@@ -43,11 +43,12 @@ TABLE_NAMES = {
 
 def data_to_dicts(address, data):
     """Deserializes a protobuf binary based on its address. Returns a list of
-    the decoded objects which were stored at that address.
+    the decoded objects which were stored at that address. The address must
+    already be known to belong to the RBAC family (see family.is_family).
     """
     return [
         _proto_to_dict(pb)
-        for pb in addresser.deserialize_list(address=address, data=data)
+        for pb in addresser.deserialize_list(address=address, data=data, validate=False)
     ]
 
 
@@ -14,15 +14,26 @@
 # -----------------------------------------------------------------------------
 """ Handle state changes
 """
+from environs import Env
 import rethinkdb as r
 from rbac.common import addresser
 from rbac.common.logs import get_default_logger
+from rbac.ledger_sync.deltas.batching import apply_block_changes, decode_changes
 from rbac.ledger_sync.deltas.decoding import data_to_dicts
 from rbac.ledger_sync.deltas.updating import get_updater
 from rbac.ledger_sync.deltas.removing import get_remover
+from rbac.server.db.org_hierarchy_query import rebuild_org_hierarchy
+from rbac.server.db.table_counts_query import (
+    invalidate_table_counts,
+    update_table_counts,
+)
 
+ENV = Env()
 LOGGER = get_default_logger(__name__)
 
+# Write each block with one query per table instead of per state change
+BATCH_WRITES = ENV.bool("LEDGER_SYNC_BATCH_WRITES", True)
+
 
 def get_delta_handler(conn):
     """Returns a delta handler with a reference to a specific Database object.
@@ -35,16 +46,27 @@ def update_database(conn, state_change):
     """Takes in a delta and database object,
     parses the change in the delta,
     and writes the changes to the database.
+    Returns the change in row count of each legacy table.
     """
+    if BATCH_WRITES:
+        decoded = getattr(state_change, "decoded_changes", None)
+        if decoded is None:
+            decoded = decode_changes(state_change.state_changes)
+        return apply_block_changes(conn, state_change.block_num, decoded)
     update = get_updater(conn, state_change.block_num)
     remove = get_remover(conn)
+    count_deltas = {}
     for change in state_change.state_changes:
         if addresser.family.is_family(change.address):
             if not change.value:
-                remove(change.address)
+                table, deleted = remove(change.address)
+                count_deltas[table] = count_deltas.get(table, 0) - deleted
             else:
                 resource = data_to_dicts(change.address, change.value)[0]
-                update(change.address, resource)
+                table, inserted = update(change.address, resource)
+                count_deltas[table] = count_deltas.get(table, 0) + inserted
+    count_deltas.pop(None, None)
+    return count_deltas
 
 
 def _handle_state_changes(conn, state_change):
@@ -58,6 +80,8 @@ def _handle_state_changes(conn, state_change):
         if old_block is not None:
             if old_block["block_id"] != state_change.block_id:
                 drop_results = drop_fork(conn, state_change.block_num)
+                invalidate_table_counts().run(conn)
+                rebuild_org_hierarchy(conn)
                 if drop_results["deleted"] == 0:
                     LOGGER.warning(
                         "Failed to drop forked resources since block: %s",
@@ -67,7 +91,7 @@ def _handle_state_changes(conn, state_change):
                 return
 
         # Parse changes and update database
-        update_database(conn, state_change)
+        count_deltas = update_database(conn, state_change)
 
         # Add new block to database
         new_block = {
@@ -85,6 +109,10 @@ def _handle_state_changes(conn, state_change):
                 str(state_change.block_num),
                 state_change.block_id,
             )
+        count_deltas["blocks"] = block_results["inserted"]
+
+        # Advance the paging total cache to this block
+        update_table_counts(state_change.block_num, count_deltas).run(conn)
 
     except Exception as err:  # pylint: disable=broad-except
         LOGGER.exception("%s error handling delta:", type(err))
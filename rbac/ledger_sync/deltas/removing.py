@@ -19,6 +19,7 @@ from rbac.common import addresser
 from rbac.common.util import bytes_from_hex
 from rbac.ledger_sync.deltas.decoding import TABLE_NAMES
 from rbac.common.logs import get_default_logger
+from rbac.server.db.org_hierarchy_query import sync_org_hierarchy
 
 LOGGER = get_default_logger(__name__)
 
@@ -68,6 +69,7 @@ def _remove_state(conn, address):
 
 def _remove_legacy(conn, address, data_type):
     """ Remove from the legacy sync tables (expansion by object type name)
+        Returns the number of rows deleted
     """
     try:
         next_object = (
@@ -76,7 +78,9 @@ def _remove_legacy(conn, address, data_type):
             .coerce_to("array")
             .run(conn)
         )
-        query = r.table(TABLE_NAMES[data_type]).get(address).delete()
+        query = (
+            r.table(TABLE_NAMES[data_type]).get(address).delete(return_changes=True)
+        )
         result = query.run(conn)
         if result["errors"] > 0:
             LOGGER.warning(
@@ -87,25 +91,30 @@ def _remove_legacy(conn, address, data_type):
             # the following off chain tables related to the user: auth,
             # metadata, user_mapping, and pack_owners
 
-            user_filter = {"next_id": next_object[0]["next_id"]}
-            r.table("auth").filter(user_filter).delete().run(conn)
-            r.table("metadata").filter(user_filter).delete().run(conn)
-            r.table("user_mapping").filter(user_filter).delete().run(conn)
-            r.table("pack_owners").filter(
-                {"identifiers": [next_object[0]["next_id"]]}
+            next_id = next_object[0]["next_id"]
+            r.table("auth").get(next_id).delete().run(conn)
+            r.table("metadata").filter({"next_id": next_id}).delete().run(conn)
+            r.table("user_mapping").get(next_id).delete().run(conn)
+            r.table("pack_owners").get_all(next_id, index="identifiers").filter(
+                {"identifiers": [next_id]}
             ).delete().run(conn)
+            sync_org_hierarchy(conn, result.get("changes", []))
+        return result["deleted"]
 
     except Exception as err:  # pylint: disable=broad-except
         LOGGER.warning("_remove_legacy %s error:", type(err))
         LOGGER.warning(err)
+    return 0
 
 
 def _remove(conn, address):
     """ Handle the removal of a given address
+        Returns a (legacy table name, rows deleted) tuple
     """
     data_type = addresser.get_address_type(address)
 
     _remove_state(conn, address)
 
     if data_type in TABLE_NAMES:
-        _remove_legacy(conn, address, data_type)
+        return TABLE_NAMES[data_type], _remove_legacy(conn, address, data_type)
+    return None, 0
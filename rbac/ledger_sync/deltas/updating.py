@@ -22,6 +22,7 @@ from rbac.common.addresser import AddressSpace, parse, get_address_type
 from rbac.common.logs import get_default_logger
 from rbac.common.util import bytes_from_hex
 from rbac.ledger_sync.deltas.decoding import TABLE_NAMES
+from rbac.server.db.org_hierarchy_query import sync_org_hierarchy
 from rbac.server.db.relationships_query import (
     fetch_relationships_by_id,
     fetch_remote_id_relationships,
@@ -87,33 +88,53 @@ def get_updater(conn, block_num):
     return lambda adr, rsc: _update(conn, block_num, adr, rsc)
 
 
+def state_records(block_num, address, resource, now):
+    """ Build the state table record for an address and the delta merged into
+        an existing record. Returns (data, delta, related_id).
+    """
+    address_parts = parse(address)
+    address_binary = bytes_from_hex(address)
+    object_id = bytes_from_hex(address_parts.object_id)
+    object_type = address_parts.object_type.value
+    related_id = bytes_from_hex(address_parts.related_id)
+    related_type = address_parts.related_type.value
+    relationship_type = address_parts.relationship_type.value
+
+    data = {
+        "address": address_binary,
+        "object_type": object_type,
+        "object_id": object_id,
+        "related_type": related_type,
+        "relationship_type": relationship_type,
+        "related_id": related_id,
+        "block_created": int(block_num),
+        "block_num": int(block_num),
+        "updated_date": now,
+        **resource,
+    }
+    delta = {"block_num": int(block_num), "updated_at": now, **resource}
+    return data, delta, related_id
+
+
+def metadata_record(data, address_binary):
+    """ Strip the relationship fields from a state record for the metadata table
+    """
+    data = dict(data)
+    data["address"] = address_binary
+    del data["related_type"]
+    del data["relationship_type"]
+    del data["related_id"]
+    return data
+
+
 def _update_state(conn, block_num, address, resource):
     """ Update the state, state_history and metadata tables
     """
     try:
         # update state table
         now = r.now()
-        address_parts = parse(address)
         address_binary = bytes_from_hex(address)
-        object_id = bytes_from_hex(address_parts.object_id)
-        object_type = address_parts.object_type.value
-        related_id = bytes_from_hex(address_parts.related_id)
-        related_type = address_parts.related_type.value
-        relationship_type = address_parts.relationship_type.value
-
-        data = {
-            "address": address_binary,
-            "object_type": object_type,
-            "object_id": object_id,
-            "related_type": related_type,
-            "relationship_type": relationship_type,
-            "related_id": related_id,
-            "block_created": int(block_num),
-            "block_num": int(block_num),
-            "updated_date": now,
-            **resource,
-        }
-        delta = {"block_num": int(block_num), "updated_at": now, **resource}
+        data, delta, related_id = state_records(block_num, address, resource, now)
 
         query = (
             r.table("state")
@@ -143,10 +164,7 @@ def _update_state(conn, block_num, address, resource):
                 )
 
         if not related_id:
-            data["address"] = address_binary
-            del data["related_type"]
-            del data["relationship_type"]
-            del data["related_id"]
+            data = metadata_record(data, address_binary)
             query = (
                 r.table("metadata")
                 .get(address_binary)
@@ -168,16 +186,24 @@ def _update_state(conn, block_num, address, resource):
         LOGGER.warning(err)
 
 
+def legacy_record(block_num, address, resource):
+    """ Build the record inserted into a legacy sync table for a new address
+    """
+    return {
+        "id": address,
+        "start_block_num": int(block_num),
+        "end_block_num": int(sys.maxsize),
+        **resource,
+    }
+
+
 def _update_legacy(conn, block_num, address, resource, data_type):
     """ Update the legacy sync tables (expansion by object type name)
+        Returns the number of rows inserted (0 for an update of an existing row)
     """
     try:
-        data = {
-            "id": address,
-            "start_block_num": int(block_num),
-            "end_block_num": int(sys.maxsize),
-            **resource,
-        }
+        data = legacy_record(block_num, address, resource)
+        users = TABLE_NAMES[data_type] == "users"
 
         query = (
             r.table(TABLE_NAMES[data_type])
@@ -188,16 +214,21 @@ def _update_legacy(conn, block_num, address, resource, data_type):
                     (doc == None),  # noqa
                     r.expr(data),
                     doc.merge(resource),
-                )
+                ),
+                return_changes=users,
             )
         )
         result = query.run(conn)
         if result["errors"] > 0:
             LOGGER.warning("error updating legacy state table:\n%s\n%s", result, query)
+        if users:
+            sync_org_hierarchy(conn, result.get("changes", []))
+        return result["inserted"]
 
     except Exception as err:  # pylint: disable=broad-except
         LOGGER.warning("_update_legacy %s error:", type(err))
         LOGGER.warning(err)
+    return 0
 
 
 def format_role(role_resource):
@@ -303,6 +334,7 @@ def _update_provider(conn, address_type, resource):
 
 def _update(conn, block_num, address, resource):
     """ Handle the update of a given address + resource update
+        Returns a (legacy table name, rows inserted) tuple
     """
     data_type = get_address_type(address)
     pre_filter(resource)
@@ -310,8 +342,10 @@ def _update(conn, block_num, address, resource):
     _update_state(conn, block_num, address, resource)
 
     if data_type in TABLE_NAMES:
-        _update_legacy(conn, block_num, address, resource, data_type)
+        inserted = _update_legacy(conn, block_num, address, resource, data_type)
         _update_provider(conn, data_type, resource)
+        return TABLE_NAMES[data_type], inserted
+    return None, 0
 
 
 def pre_filter(resource):
@@ -0,0 +1,148 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+""" Pool of pre-generated key pairs for inbound records
+
+Every inbound record is signed with a key pair of its own, whose private key
+is stored AES encrypted. A KeyPool generates and encrypts these in a worker
+process ahead of time, keeping a bounded queue of them filled, so the inbound
+workers only take one. If the queue runs dry, or the pool was never started,
+a key pair is generated inline as before.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+
+from rbac.common.crypto.keys import Key
+from rbac.common.crypto.secrets import encrypt_private_key
+from rbac.common.logs import get_default_logger
+
+LOGGER = get_default_logger(__name__)
+
+AES_KEY = os.getenv("AES_KEY")
+INBOUND_KEY_POOL_SIZE = int(os.getenv("INBOUND_KEY_POOL_SIZE", "1000"))
+# Key pairs are passed from the worker process in chunks, as sending them one
+# at a time would cost about as much as generating them
+KEY_POOL_CHUNK = 100
+
+
+def make_key_pair(aes_key):
+    """Generates a key pair and encrypts its private key.
+
+    Returns:
+        tuple: the private key and public key as hex, and the encrypted
+            private key
+    """
+    key_pair = Key()
+    encrypted_private_key = encrypt_private_key(
+        aes_key, key_pair.public_key, key_pair.private_key_bytes
+    )
+    return key_pair.private_key, key_pair.public_key, encrypted_private_key
+
+
+def produce(aes_key, chunks, chunk_size):
+    """Fills chunks with chunks of key pairs until the process is ended."""
+    while True:
+        chunks.put([make_key_pair(aes_key) for _ in range(chunk_size)])
+
+
+class KeyPool(object):
+    """A bounded queue of key pairs generated by a worker process.
+
+    Args:
+        size:
+            int: most key pairs generated ahead, 0 to generate them inline
+        aes_key:
+            str: the key encrypting the private keys
+        chunk_size:
+            int: key pairs passed from the worker process at a time
+    """
+
+    def __init__(
+        self, size=INBOUND_KEY_POOL_SIZE, aes_key=AES_KEY, chunk_size=KEY_POOL_CHUNK
+    ):
+        self.size = size
+        self.aes_key = aes_key
+        self.chunk_size = min(chunk_size, size) or 1
+        self._chunks = None
+        self._process = None
+        self._keys = deque()
+        self._lock = threading.Lock()
+        self._stats = {"pooled": 0, "inline": 0}
+
+    def start(self):
+        """Starts the worker process, if the pool has a size."""
+        if self.size <= 0 or self._process is not None:
+            return
+        # A fresh interpreter, rather than a fork of one holding database
+        # connections and threads
+        context = multiprocessing.get_context("spawn")
+        self._chunks = context.Queue(maxsize=max(1, self.size // self.chunk_size))
+        self._process = context.Process(
+            target=produce,
+            args=(self.aes_key, self._chunks, self.chunk_size),
+            name="Inbound Key Pool",
+            daemon=True,
+        )
+        self._process.start()
+        LOGGER.info("Started inbound key pool of %s key pairs", self.size)
+
+    def close(self):
+        """Ends the worker process."""
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def take(self):
+        """Takes a key pair from the pool, or generates one if it is empty.
+
+        Returns:
+            tuple: the Key and its encrypted private key
+        """
+        with self._lock:
+            if not self._keys and self._chunks is not None:
+                try:
+                    self._keys.extend(self._chunks.get_nowait())
+                except queue.Empty:
+                    pass
+            if self._keys:
+                private_key, public_key, encrypted_private_key = self._keys.popleft()
+                self._stats["pooled"] += 1
+            else:
+                private_key = None
+                self._stats["inline"] += 1
+        if private_key is None:
+            key_pair = Key()
+            return (
+                key_pair,
+                encrypt_private_key(
+                    self.aes_key, key_pair.public_key, key_pair.private_key_bytes
+                ),
+            )
+        return (
+            Key(private_key=private_key, public_key=public_key),
+            encrypted_private_key,
+        )
+
+    def stats(self):
+        """Returns the counts of key pairs taken from the pool and generated
+        inline."""
+        with self._lock:
+            return dict(self._stats)
+
+
+KEY_POOL = KeyPool()
@@ -13,28 +13,48 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 """ Sawtooth Inbound Transaction Queue Listener
+
+Records are processed by a pool of worker threads. Each worker claims a
+record with a lease before processing it, so that records held by a worker
+that died are picked up again once the lease expires. Records with the same
+remote_id always go to the same worker, keeping changes to an object in
+order, and users are finished before the groups that follow them are
+processed, so group members resolve to their next_ids. The workers' batches
+are sent to the validator together by a BatchSubmitter.
 """
+import os
+import queue
+import socket
+import threading
+import zlib
+
 import rethinkdb as r
 
 from sawtooth_sdk.protobuf import batch_pb2
 from rbac.common.logs import get_default_logger
-from rbac.common.sawtooth.client_sync import ClientSync
-from rbac.common.sawtooth.batcher import batch_to_list
+from rbac.ledger_sync.inbound.key_pool import KEY_POOL
 from rbac.ledger_sync.inbound.rbac_transactions import add_transaction
+from rbac.ledger_sync.inbound.resolver import USER_IDS, start_resolvers
+from rbac.ledger_sync.inbound.submitter import BatchSubmitter
 from rbac.providers.common.db_queries import connect_to_db
 
 LOGGER = get_default_logger(__name__)
 
+INBOUND_WORKERS = int(os.getenv("INBOUND_WORKERS", "32"))
+INBOUND_LEASE_SECS = int(os.getenv("INBOUND_LEASE_SECS", "300"))
+# Seconds without new records after which expired leases are looked for
+LEASE_SWEEP_SECS = 60
+WORKER_QUEUE_SIZE = 100
+WORKER_ID = "{}-{}".format(socket.gethostname(), os.getpid())
+
 
-def process(rec, conn):
-    """ Process inbound queue records
+def process(rec, conn, submitter):
+    """ Process inbound queue records, submitting their batches with others
+    through submitter
     """
     try:
-        # Changes members from distinguished name to next_id for roles
-        if "members" in rec["data"]:
-            rec = translate_field_to_next(rec, "members")
-        if "owners" in rec["data"]:
-            rec = translate_field_to_next(rec, "owners")
+        # Changes members and owners from distinguished name to next_id for roles
+        rec = translate_fields_to_next(rec, ("members", "owners"), conn)
 
         add_transaction(rec)
         if "batch" not in rec or not rec["batch"]:
@@ -45,13 +65,8 @@ def process(rec, conn):
 
         batch = batch_pb2.Batch()
         batch.ParseFromString(rec["batch"])
-        batch_list = batch_to_list(batch=batch)
-        client = ClientSync()
-        status = client.send_batches_get_status(batch_list=batch_list)
-        while status[0]["status"] == "PENDING":
-            LOGGER.info("Batch status is %s", status)
-            status = client.status_recheck(batch_list)
-        if status[0]["status"] == "COMMITTED":
+        status = submitter.submit(batch)
+        if status["status"] == "COMMITTED":
             if rec["data_type"] == "user":
                 insert_to_user_mapping(rec)
             if "metadata" in rec and rec["metadata"]:
@@ -103,11 +118,11 @@ def process(rec, conn):
 
 
 def get_status_error(status):
-    """ Try to get the error from a transaction status
+    """ Try to get the error from a batch status
     """
     try:
         LOGGER.warning("Error status %s", status)
-        return status[0]["invalid_transactions"][0]["message"]
+        return status["invalid_transactions"][0]["message"]
     except Exception:  # pylint: disable=broad-except
         return "Unhandled error {}".format(status)
 
@@ -120,11 +135,9 @@ def insert_to_user_mapping(user_record):
     # Find user if object already exists in user mapping table
     existing_rec = (
         r.table("user_mapping")
-        .filter(
-            {
-                "provider_id": user_record["provider_id"],
-                "remote_id": user_record["data"]["remote_id"],
-            }
+        .get_all(
+            [user_record["provider_id"], user_record["data"]["remote_id"]],
+            index="provider_remote",
         )
         .coerce_to("array")
         .run(conn)
@@ -146,54 +159,193 @@ def insert_to_user_mapping(user_record):
     conn.close()
 
 
-def translate_field_to_next(resource, field):
-    """ Takes in a resource dict that contains a list  at a specified field and switches
-        their remote_ids with the next_id of the same user.
+def translate_fields_to_next(resource, fields, conn=None):
+    """ Takes in a resource dict that contains lists at the specified fields and
+        switches their remote_ids with the next_id of the same user, resolving
+        the remote_ids of all the fields together.
     """
-    resource_list = resource["data"][field]
-    new_list = []
-    conn = connect_to_db()
-    if not isinstance(resource_list, list):
-        resource_list = [resource_list]
-    for user in resource_list:
-        user_in_db = (
-            r.table("users").filter({"remote_id": user}).coerce_to("array").run(conn)
-        )
-        if user_in_db:
-            user_next_id = user_in_db[0].get("next_id")
-            new_list.append(user_next_id)
-        else:
-            new_list.append(user)
-    resource["data"][field] = new_list
-    conn.close()
+    lists = {}
+    for field in fields:
+        if field in resource["data"]:
+            resource_list = resource["data"][field]
+            if not isinstance(resource_list, list):
+                resource_list = [resource_list]
+            lists[field] = resource_list
+    if not lists:
+        return resource
+    next_ids = USER_IDS.resolve(
+        [user for resource_list in lists.values() for user in resource_list], conn
+    )
+    for field, resource_list in lists.items():
+        resource["data"][field] = [next_ids.get(user, user) for user in resource_list]
     return resource
 
 
+def claim(rec_id, conn, worker_id=WORKER_ID, lease_secs=INBOUND_LEASE_SECS):
+    """Claims an inbound_queue record for worker_id until its lease expires.
+
+    Returns:
+        dict: the claimed record, or None if it has been processed or is
+            leased to another worker
+    """
+    result = (
+        r.table("inbound_queue")
+        .get(rec_id)
+        .update(
+            lambda rec: r.branch(
+                rec.has_fields("lease_expires").and_(rec["lease_expires"] > r.now()),
+                {},
+                {"claimed_by": worker_id, "lease_expires": r.now() + lease_secs},
+            ),
+            return_changes=True,
+        )
+        .run(conn)
+    )
+    if not result["replaced"]:
+        return None
+    return result["changes"][0]["new_val"]
+
+
+def fetch_unclaimed(conn):
+    """Returns a cursor over the inbound_queue records that are not leased,
+    oldest first."""
+    return (
+        r.table("inbound_queue")
+        .order_by(index=r.asc("timestamp"))
+        .filter(
+            lambda rec: rec.has_fields("lease_expires")
+            .not_()
+            .or_(rec["lease_expires"] <= r.now())
+        )
+        .run(conn)
+    )
+
+
+def object_kind(rec):
+    """Returns whether the record is of a user or a group."""
+    return rec["data_type"].split("_")[0]
+
+
+class InboundWorkers(object):
+    """Processes inbound_queue records concurrently on worker threads.
+
+    Args:
+        size:
+            int: the number of worker threads
+        lease_secs:
+            int: seconds a claimed record is held before another worker may
+                claim it
+        submitter:
+            BatchSubmitter: submits the workers' batches together, created
+                if not given
+    """
+
+    def __init__(
+        self, size=INBOUND_WORKERS, lease_secs=INBOUND_LEASE_SECS, submitter=None
+    ):
+        self.lease_secs = lease_secs
+        self.submitter = submitter or BatchSubmitter()
+        self.in_flight = set()
+        self.kind = None
+        self._changed = threading.Condition()
+        self._queues = [queue.Queue(maxsize=WORKER_QUEUE_SIZE) for _ in range(size)]
+        for index, work_queue in enumerate(self._queues):
+            threading.Thread(
+                target=self._work,
+                args=(work_queue,),
+                name="Inbound Worker {}".format(index),
+                daemon=True,
+            ).start()
+
+    def dispatch(self, rec):
+        """Queues a record to the worker for its remote_id, first waiting for
+        the records in flight to finish if they are of another kind. Returns
+        False if the record is already in flight."""
+        kind = object_kind(rec)
+        with self._changed:
+            if rec["id"] in self.in_flight:
+                return False
+            if kind != self.kind:
+                self._changed.wait_for(lambda: not self.in_flight)
+                self.kind = kind
+            self.in_flight.add(rec["id"])
+        remote_id = str(rec["data"].get("remote_id", rec["id"]))
+        worker = zlib.crc32(remote_id.encode()) % len(self._queues)
+        self._queues[worker].put(rec)
+        return True
+
+    def join(self):
+        """Waits for every dispatched record to finish."""
+        with self._changed:
+            self._changed.wait_for(lambda: not self.in_flight)
+
+    def _work(self, work_queue):
+        conn = None
+        while True:
+            rec = work_queue.get()
+            try:
+                if conn is None:
+                    conn = connect_to_db()
+                claimed = claim(rec["id"], conn, lease_secs=self.lease_secs)
+                if claimed is not None:
+                    claimed.pop("claimed_by", None)
+                    claimed.pop("lease_expires", None)
+                    LOGGER.debug("Processing inbound_queue record")
+                    LOGGER.debug(claimed)
+                    process(claimed, conn, self.submitter)
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.exception(
+                    "%s exception claiming inbound record %s",
+                    type(err).__name__,
+                    rec["id"],
+                )
+                if conn is not None:
+                    conn.close()
+                conn = None
+            finally:
+                with self._changed:
+                    self.in_flight.discard(rec["id"])
+                    self._changed.notify_all()
+
+
+def dispatch_unclaimed(workers, conn):
+    """Dispatches every record that is not leased, returning how many were
+    dispatched."""
+    count = 0
+    for rec in fetch_unclaimed(conn):
+        if workers.dispatch(rec):
+            count += 1
+    return count
+
+
 def listener():
     """ Listener for Sawtooth State changes
     """
     try:
+        KEY_POOL.start()
         conn = connect_to_db()
+        start_resolvers(conn)
+        workers = InboundWorkers()
 
+        # Open the feed first so records inserted while the queue is being
+        # read are not missed
+        feed = r.table("inbound_queue").changes().run(conn)
         LOGGER.info("Reading queued Sawtooth transactions")
-        while True:
-            feed = r.table("inbound_queue").order_by(index=r.asc("timestamp")).run(conn)
-            count = 0
-            for rec in feed:
-                LOGGER.debug("Processing inbound_queue record")
-                LOGGER.debug(rec)
-                process(rec, conn)
-                count = count + 1
-            if count == 0:
-                break
-            LOGGER.info("Processed %s records in the inbound queue", count)
+        count = dispatch_unclaimed(workers, conn)
+        workers.join()
+        LOGGER.info("Processed %s records in the inbound queue", count)
+
         LOGGER.info("Listening for incoming Sawtooth transactions")
-        feed = r.table("inbound_queue").changes().run(conn)
-        for rec in feed:
+        while True:
+            try:
+                rec = feed.next(wait=LEASE_SWEEP_SECS)
+            except r.ReqlTimeoutError:
+                count = dispatch_unclaimed(workers, conn)
+                if count:
+                    LOGGER.info("Recovered %s unclaimed inbound records", count)
+                continue
             if rec["new_val"] and not rec["old_val"]:  # only insertions
-                LOGGER.debug("Processing inbound_queue record")
-                LOGGER.debug(rec["new_val"])
-                process(rec["new_val"], conn)
+                workers.dispatch(rec["new_val"])
 
     except Exception as err:  # pylint: disable=broad-except
         LOGGER.exception("Inbound listener %s exception", type(err).__name__)
@@ -204,3 +356,4 @@ def listener():
             conn.close()
         except UnboundLocalError:
             pass
+        KEY_POOL.close()
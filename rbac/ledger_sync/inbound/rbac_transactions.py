@@ -14,14 +14,11 @@
 # ------------------------------------------------------------------------------
 """ Inbound Provider Sawtooth Transaction Creation
 """
-import os
 from uuid import uuid4
 
 import rethinkdb as r
 
 from rbac.common import addresser
-from rbac.common.crypto.keys import Key
-from rbac.common.crypto.secrets import encrypt_private_key
 from rbac.common.logs import get_default_logger
 from rbac.common.role import Role
 from rbac.common.role.delete_role import DeleteRole
@@ -32,6 +29,8 @@ from rbac.common.user import User
 from rbac.common.user.delete_user import DeleteUser
 from rbac.common.util import bytes_from_hex
 from rbac.common.sawtooth import batcher
+from rbac.ledger_sync.inbound.key_pool import KEY_POOL
+from rbac.ledger_sync.inbound.resolver import ROLE_IDS
 from rbac.providers.common.db_queries import connect_to_db
 from rbac.server.api.proposals import PROPOSAL_TRANSACTION
 from rbac.server.db.proposals_query import (
@@ -58,8 +57,6 @@ META_DATA_PROHIBITED = {
     "related_id",
 }
 
-AES_KEY = os.getenv("AES_KEY")
-
 
 def add_transaction(inbound_entry):
     """ Adds transactional entries onto inbound_entry
@@ -67,10 +64,7 @@ def add_transaction(inbound_entry):
     try:
         set_metadata_flag = {}
         data = inbound_entry["data"]
-        key_pair = Key()
-        encrypted_private_key = encrypt_private_key(
-            AES_KEY, key_pair.public_key, key_pair.private_key_bytes
-        )
+        key_pair, encrypted_private_key = KEY_POOL.take()
         inbound_entry["public_key"] = key_pair.public_key
         inbound_entry["private_key"] = encrypted_private_key
         set_metadata_flag["sync_direction"] = "INBOUND"
@@ -136,7 +130,7 @@ def add_transaction(inbound_entry):
             conn = connect_to_db()
             user_in_db = (
                 r.table("users")
-                .filter({"remote_id": deleted_user})
+                .get_all(deleted_user, index="remote_id")
                 .coerce_to("array")
                 .run(conn)
             )
@@ -154,7 +148,7 @@ def add_transaction(inbound_entry):
             conn = connect_to_db()
             role_in_db = (
                 r.table("roles")
-                .filter({"remote_id": deleted_group})
+                .get_all(deleted_group, index="remote_id")
                 .coerce_to("array")
                 .run(conn)
             )
@@ -196,11 +190,17 @@ def add_metadata(inbound_entry, message):
 
 def get_next_object(table, remote_id, provider_id):
     """Check if object already exists in NEXT and return it."""
-    query_filter = {"remote_id": remote_id}
+    if table == "roles":
+        role_id = ROLE_IDS.get(remote_id)
+        return [{"role_id": role_id}] if role_id else []
     if table == "user_mapping":
-        query_filter["provider_id"] = provider_id
+        query = r.table(table).get_all(
+            [provider_id, remote_id], index="provider_remote"
+        )
+    else:
+        query = r.table(table).get_all(remote_id, index="remote_id")
     conn = connect_to_db()
-    result = r.table(table).filter(query_filter).coerce_to("array").run(conn)
+    result = query.coerce_to("array").run(conn)
     conn.close()
     return result
 
@@ -344,7 +344,7 @@ def create_delete_role_owner_txns(key_pair, next_id, txn_list):
     conn = connect_to_db()
     roles = (
         r.table("role_owners")
-        .filter({"related_id": next_id})
+        .get_all(next_id, index="related_id")
         .coerce_to("array")
         .run(conn)
     )
@@ -372,7 +372,7 @@ def create_delete_role_admin_txns(key_pair, next_id, txn_list):
     conn = connect_to_db()
     roles = (
         r.table("role_admins")
-        .filter({"related_id": next_id})
+        .get_all(next_id, index="related_id")
         .coerce_to("array")
         .run(conn)
     )
@@ -400,7 +400,7 @@ def create_delete_role_member_txns(key_pair, next_id, txn_list):
     conn = connect_to_db()
     roles = (
         r.table("role_members")
-        .filter({"related_id": next_id})
+        .get_all(next_id, index="related_id")
         .coerce_to("array")
         .run(conn)
     )
@@ -0,0 +1,203 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+""" Resolution of provider remote_ids to NEXT ids for inbound records
+
+Groups name their members and owners by remote_id, and each inbound group
+record needs them as next_ids. A RemoteIdResolver looks up all of a record's
+remote_ids at once, answering from a bounded LRU of known ids and fetching
+the rest with a single get_all. The cache is warmed from its table when the
+inbound listener starts and kept current by following the table's
+changefeed. Unknown remote_ids are not cached, as the user they name may be
+created by an earlier record at any moment.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import rethinkdb as r
+
+from rbac.common.logs import get_default_logger
+from rbac.providers.common.db_queries import connect_to_db
+
+LOGGER = get_default_logger(__name__)
+
+RESOLVER_CACHE_SIZE = int(os.getenv("INBOUND_RESOLVER_CACHE_SIZE", "100000"))
+FEED_RETRY_SECS = 5
+
+
+class RemoteIdResolver(object):
+    """A bounded LRU of remote_id to NEXT id, backed by a table.
+
+    Args:
+        table:
+            str: the table holding the objects, e.g. users
+        id_field:
+            str: the field holding their NEXT id, e.g. next_id
+        max_size:
+            int: most ids held before the least recently used is dropped
+    """
+
+    def __init__(self, table, id_field, max_size=RESOLVER_CACHE_SIZE):
+        self.table = table
+        self.id_field = id_field
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def resolve(self, remote_ids, conn=None):
+        """Returns the NEXT ids of the given remote_ids, querying the table
+        once for those not cached.
+
+        Returns:
+            dict: NEXT id by remote_id, without the remote_ids not found
+        """
+        resolved = {}
+        missing = []
+        with self._lock:
+            for remote_id in remote_ids:
+                next_id = self._entries.get(remote_id)
+                if next_id is None:
+                    missing.append(remote_id)
+                else:
+                    self._entries.move_to_end(remote_id)
+                    resolved[remote_id] = next_id
+            self._stats["hits"] += len(resolved)
+            self._stats["misses"] += len(missing)
+        if missing:
+            rows = self._fetch(list(set(missing)), conn)
+            found = {}
+            for row in rows:
+                found.setdefault(row["remote_id"], row[self.id_field])
+            with self._lock:
+                for remote_id, next_id in found.items():
+                    self._put(remote_id, next_id)
+            resolved.update(found)
+        return resolved
+
+    def get(self, remote_id, conn=None):
+        """Returns the NEXT id of a remote_id, or None if it is not found."""
+        return self.resolve([remote_id], conn).get(remote_id)
+
+    def warm(self, conn):
+        """Fills the cache with up to max_size ids from the table."""
+        rows = (
+            r.table(self.table)
+            .has_fields("remote_id")
+            .pluck("remote_id", self.id_field)
+            .limit(self.max_size)
+            .run(conn)
+        )
+        count = 0
+        with self._lock:
+            for row in rows:
+                if row.get(self.id_field):
+                    self._put(row["remote_id"], row[self.id_field])
+                    count += 1
+        LOGGER.info("Warmed %s resolver with %s ids", self.table, count)
+
+    def apply_change(self, change):
+        """Updates the cache from a changefeed change of the table."""
+        old_val = change.get("old_val") or {}
+        new_val = change.get("new_val") or {}
+        with self._lock:
+            if old_val.get("remote_id") and (
+                old_val.get("remote_id") != new_val.get("remote_id")
+                or old_val.get(self.id_field) != new_val.get(self.id_field)
+            ):
+                if self._entries.pop(old_val["remote_id"], None) is not None:
+                    self._stats["invalidations"] += 1
+            if new_val.get("remote_id") and new_val.get(self.id_field):
+                self._put(new_val["remote_id"], new_val[self.id_field])
+
+    def follow(self):
+        """Applies the table's changefeed to the cache, reopening it if it
+        fails. Runs until the process exits."""
+        while True:
+            conn = None
+            try:
+                conn = connect_to_db()
+                feed = (
+                    r.table(self.table)
+                    .changes()
+                    .pluck(
+                        {
+                            "old_val": ["remote_id", self.id_field],
+                            "new_val": ["remote_id", self.id_field],
+                        }
+                    )
+                    .run(conn)
+                )
+                for change in feed:
+                    self.apply_change(change)
+            except (r.ReqlError, r.ReqlCursorEmpty) as err:
+                LOGGER.warning("%s resolver feed failed: %s", self.table, err)
+                # Changes may have been missed while the feed was down
+                self.clear()
+            finally:
+                if conn is not None:
+                    conn.close()
+            time.sleep(FEED_RETRY_SECS)
+
+    def clear(self):
+        """Drops every cached id."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns hit, miss, eviction and invalidation counts and the
+        current size."""
+        with self._lock:
+            return dict(self._stats, size=len(self._entries))
+
+    def _put(self, remote_id, next_id):
+        self._entries[remote_id] = next_id
+        self._entries.move_to_end(remote_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _fetch(self, remote_ids, conn):
+        close = conn is None
+        if close:
+            conn = connect_to_db()
+        try:
+            return (
+                r.table(self.table)
+                .get_all(*remote_ids, index="remote_id")
+                .pluck("remote_id", self.id_field)
+                .coerce_to("array")
+                .run(conn)
+            )
+        finally:
+            if close:
+                conn.close()
+
+
+USER_IDS = RemoteIdResolver("users", "next_id")
+ROLE_IDS = RemoteIdResolver("roles", "role_id")
+
+
+def start_resolvers(conn):
+    """Warms the user and role resolvers and starts following their tables'
+    changefeeds."""
+    for resolver in (USER_IDS, ROLE_IDS):
+        threading.Thread(
+            target=resolver.follow,
+            name="{} Resolver Feed".format(resolver.table),
+            daemon=True,
+        ).start()
+        resolver.warm(conn)
@@ -0,0 +1,141 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+""" Micro-batching of inbound record batches
+
+The inbound workers each hand the batch of their record to a BatchSubmitter,
+which gathers the batches handed to it within a short window into one batch
+list, sends it with a single request and waits for all of their statuses
+together. Each record keeps a batch of its own, so that one invalid record
+does not invalidate the others and each status is reported back to the
+worker that submitted it.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sawtooth_sdk.protobuf import batch_pb2
+
+from rbac.common.logs import get_default_logger
+from rbac.common.sawtooth.client_sync import ClientSync
+
+LOGGER = get_default_logger(__name__)
+
+INBOUND_BATCH_SIZE = int(os.getenv("INBOUND_BATCH_SIZE", "32"))
+INBOUND_BATCH_WAIT_MS = int(os.getenv("INBOUND_BATCH_WAIT_MS", "100"))
+# Stay well below the REST API's limit on the size of a request
+MAX_SUBMIT_BYTES = 4 * 1024 * 1024
+STATUS_WAIT_SECS = 10
+
+
+class BatchSubmitter(object):
+    """Submits batches from concurrent callers to the validator together.
+
+    Args:
+        max_batches:
+            int: most batches sent in one request
+        max_wait:
+            float: seconds to wait for more batches after the first arrives
+        max_bytes:
+            int: most bytes of batches sent in one request
+        client:
+            ClientSync: the REST API client, created if not given
+    """
+
+    def __init__(
+        self,
+        max_batches=INBOUND_BATCH_SIZE,
+        max_wait=INBOUND_BATCH_WAIT_MS / 1000,
+        max_bytes=MAX_SUBMIT_BYTES,
+        client=None,
+    ):
+        self.max_batches = max_batches
+        self.max_wait = max_wait
+        self.max_bytes = max_bytes
+        self.client = client or ClientSync()
+        self._pending = queue.Queue()
+        self._carried = None
+        threading.Thread(
+            target=self._run, name="Inbound Batch Submitter", daemon=True
+        ).start()
+
+    def submit(self, batch):
+        """Submits a batch and waits for it to leave PENDING.
+
+        Returns:
+            dict: the batch's status, with 'id', 'status' and
+                'invalid_transactions'
+        """
+        future = Future()
+        self._pending.put((batch, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            gathered = self._gather()
+            try:
+                statuses = self._send([batch for batch, _ in gathered])
+            except Exception as err:  # pylint: disable=broad-except
+                for _, future in gathered:
+                    future.set_exception(err)
+                continue
+            for batch, future in gathered:
+                future.set_result(statuses[batch.header_signature])
+
+    def _gather(self):
+        """Takes the next batches to send, waiting up to max_wait after the
+        first for more to arrive."""
+        if self._carried is not None:
+            first, self._carried = self._carried, None
+        else:
+            first = self._pending.get()
+        gathered = [first]
+        size = first[0].ByteSize()
+        deadline = time.monotonic() + self.max_wait
+        while len(gathered) < self.max_batches:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            size += item[0].ByteSize()
+            if size > self.max_bytes:
+                self._carried = item
+                break
+            gathered.append(item)
+        return gathered
+
+    def _send(self, batches):
+        """Sends batches in one batch list and waits for them all to leave
+        PENDING, returning their statuses by batch id."""
+        batch_list = batch_pb2.BatchList(batches=batches)
+        LOGGER.debug("Submitting %s inbound batches", len(batches))
+        self.client.send_batches(batch_list)
+        statuses = {}
+        pending = [batch.header_signature for batch in batches]
+        while pending:
+            for status in self.client.get_statuses(pending, wait=STATUS_WAIT_SECS):
+                statuses[status["id"]] = status
+            pending = [
+                batch_id
+                for batch_id in pending
+                if statuses[batch_id]["status"] == "PENDING"
+            ]
+            if pending:
+                LOGGER.info("%s inbound batches are still pending", len(pending))
+        return statuses
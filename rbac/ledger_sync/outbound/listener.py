@@ -21,6 +21,7 @@ from rbac.common.logs import get_default_logger
 from rbac.ledger_sync.deltas.handlers import get_delta_handler
 from rbac.ledger_sync.subscriber import Subscriber
 from rbac.providers.common.db_queries import connect_to_db
+from rbac.server.db.org_hierarchy_query import ensure_org_hierarchy
 
 LOGGER = get_default_logger(__name__)
 VALIDATOR = get_config("VALIDATOR")
@@ -35,6 +36,8 @@ def listener():
     """
     try:
         conn = connect_to_db()
+        # Chains must be complete before state changes start refreshing them
+        ensure_org_hierarchy(conn)
         subscriber = Subscriber(VALIDATOR)
         subscriber.add_handler(get_delta_handler(conn))
         known_blocks = get_last_known_blocks(conn)
@@ -14,7 +14,11 @@
 # ------------------------------------------------------------------------------
 """Subscriber class that can subscribe to state delta events using the
     Sawtooth SDK's Stream class."""
+import queue
+import threading
+import time
 
+from environs import Env
 from sawtooth_sdk.messaging.stream import Stream
 from sawtooth_sdk.protobuf import client_event_pb2
 from sawtooth_sdk.protobuf import events_pb2
@@ -23,21 +27,103 @@ from sawtooth_sdk.protobuf.validator_pb2 import Message
 
 from rbac.common import addresser
 from rbac.common.logs import get_default_logger
+from rbac.ledger_sync.deltas.batching import decode_changes
 
+ENV = Env()
 LOGGER = get_default_logger(__name__)
 
+# Blocks that may wait between pipeline stages before intake blocks
+QUEUE_SIZE = ENV.int("LEDGER_SYNC_QUEUE_SIZE", 32)
+# Seconds between pipeline metrics log lines
+METRICS_INTERVAL = ENV.int("LEDGER_SYNC_METRICS_INTERVAL", 60)
+
+_STOP = object()
+
+
+class PipelineMetrics(object):
+    """Thread-safe latency, throughput and queue depth counters for the
+    subscriber pipeline stages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._stages = {}
+        self._max_depth = {}
+        self._blocks = 0
+        self._window_started = self._started
+        self._window_blocks = 0
+
+    def record(self, stage, seconds):
+        """Record the time one block spent in a stage."""
+        with self._lock:
+            stats = self._stages.setdefault(
+                stage, {"count": 0, "total": 0.0, "max": 0.0}
+            )
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def record_depth(self, name, depth):
+        """Record the depth of a stage queue after a put."""
+        with self._lock:
+            self._max_depth[name] = max(self._max_depth.get(name, 0), depth)
+
+    def block_applied(self):
+        """Count a block that made it through the whole pipeline."""
+        with self._lock:
+            self._blocks += 1
+            self._window_blocks += 1
+
+    def snapshot(self, queues):
+        """Return current metrics and start a new blocks/sec window.
+
+        Args:
+            queues:
+                dict: stage queue name -> queue.Queue
+        """
+        with self._lock:
+            now = time.monotonic()
+            window = now - self._window_started
+            snapshot = {
+                "blocks": self._blocks,
+                "blocks_per_sec": self._window_blocks / window if window else 0.0,
+                "blocks_per_sec_total": self._blocks / (now - self._started),
+                "queue_depth": {name: q.qsize() for name, q in queues.items()},
+                "queue_depth_max": dict(self._max_depth),
+                "latency": {
+                    stage: {
+                        "avg": stats["total"] / stats["count"],
+                        "max": stats["max"],
+                    }
+                    for stage, stats in self._stages.items()
+                },
+            }
+            self._window_started = now
+            self._window_blocks = 0
+        return snapshot
+
 
 class Subscriber(object):
     """Creates an object that can subscribe to state delta events using the
     Sawtooth SDK's Stream class. Handler functions can be added prior to
     subscribing, and each will be called on each delta event received.
+
+    Events flow through three stages connected by bounded queues: the
+    receive stage reads messages off the stream, the decode stage parses
+    them into StateDeltaEvents with decoded changes, and the apply stage
+    calls the handlers. A slow handler fills the queues, which then blocks
+    intake instead of buffering without bound.
     """
 
-    def __init__(self, validator_url):
+    def __init__(self, validator_url, queue_size=QUEUE_SIZE):
         LOGGER.info("Connecting to validator: %s", validator_url)
         self._stream = Stream(validator_url)
         self._delta_handlers = []
         self._is_active = False
+        self._decode_queue = queue.Queue(maxsize=queue_size)
+        self._apply_queue = queue.Queue(maxsize=queue_size)
+        self._workers = []
+        self.metrics = PipelineMetrics()
 
     def add_handler(self, event_handler):
         """Adds a handler which will be passed state delta events when they
@@ -98,6 +184,7 @@ class Subscriber(object):
             )
 
         self._is_active = True
+        self._start_workers()
 
         LOGGER.debug("Successfully subscribed to state delta events")
         while self._is_active:
@@ -105,15 +192,76 @@ class Subscriber(object):
             msg = message_future.result()
 
             if msg.message_type == Message.CLIENT_EVENTS:
+                received = time.monotonic()
+                self._put(self._decode_queue, "decode", (received, msg.content))
+                self.metrics.record("receive", time.monotonic() - received)
+
+    def _start_workers(self):
+        """Start the decode and apply stage threads, once."""
+        if self._workers:
+            return
+        for name, target in (("decode", self._decode), ("apply", self._apply)):
+            worker = threading.Thread(
+                name="Ledger Sync {} Stage".format(name.title()),
+                target=target,
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _put(self, stage_queue, name, item):
+        """Enqueue for the next stage, blocking while it is full."""
+        stage_queue.put(item)
+        self.metrics.record_depth(name, stage_queue.qsize())
+
+    def _decode(self):
+        """Decode stage: parse event lists and decode state changes."""
+        while True:
+            item = self._decode_queue.get()
+            if item is _STOP:
+                self._apply_queue.put(_STOP)
+                return
+            received, content = item
+            started = time.monotonic()
+            try:
                 event_list = events_pb2.EventList()
-                event_list.ParseFromString(msg.content)
-                events = list(event_list.events)
-                event = StateDeltaEvent(events)
+                event_list.ParseFromString(content)
+                event = StateDeltaEvent(list(event_list.events))
+                event.decode()
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.exception("Failed to decode state delta event: %s", err)
+                continue
+            self.metrics.record("decode", time.monotonic() - started)
+            if event.state_changes:
+                self._put(self._apply_queue, "apply", (received, event))
 
-                delta_count = len(event.state_changes)
-                if delta_count > 0:
-                    for handler in self._delta_handlers:
-                        handler(event)
+    def _apply(self):
+        """Apply stage: pass decoded events to every handler, in order."""
+        last_report = time.monotonic()
+        while True:
+            item = self._apply_queue.get()
+            if item is _STOP:
+                return
+            received, event = item
+            started = time.monotonic()
+            for handler in self._delta_handlers:
+                try:
+                    handler(event)
+                except Exception as err:  # pylint: disable=broad-except
+                    LOGGER.exception("State delta handler failed: %s", err)
+            finished = time.monotonic()
+            self.metrics.record("apply", finished - started)
+            self.metrics.record("end_to_end", finished - received)
+            self.metrics.block_applied()
+            if finished - last_report >= METRICS_INTERVAL:
+                last_report = finished
+                LOGGER.info("Ledger sync pipeline metrics: %s", self.get_metrics())
+
+    def get_metrics(self):
+        """Current queue depth, per-stage latency and blocks/sec."""
+        return self.metrics.snapshot(
+            {"decode": self._decode_queue, "apply": self._apply_queue}
+        )
 
     def stop(self):
         """Stops the Subscriber, unsubscribing from state delta events and
@@ -138,6 +286,11 @@ class Subscriber(object):
             )
 
         self._stream.close()
+        if self._workers:
+            self._decode_queue.put(_STOP)
+            for worker in self._workers:
+                worker.join()
+            self._workers = []
 
 
 class StateDeltaEvent:
@@ -165,6 +318,11 @@ class StateDeltaEvent:
             self.state_changes = state_change_list.state_changes
         except KeyError:
             self.state_changes = []
+        self.decoded_changes = None
+
+    def decode(self):
+        """Decode the RBAC state changes ahead of the handlers."""
+        self.decoded_changes = decode_changes(self.state_changes)
 
     @staticmethod
     def _get_attr(event, key):
@@ -34,11 +34,16 @@ from rbac.providers.common.outbound_filters import (
     outbound_group_filter,
 )
 from rbac.providers.common.expected_errors import ExpectedError
-from rbac.providers.common.db_queries import peek_at_queue, put_entry_changelog
+from rbac.providers.common.db_queries import (
+    consume_queue,
+    put_entry_changelog,
+    update_outbound_entry_status,
+)
 
 LOGGER = get_default_logger(__name__)
 
 LISTENER_POLLING_DELAY = int(os.getenv("LISTENER_POLLING_DELAY", "1"))
+OUTBOUND_BATCH_SIZE = 50
 TENANT_ID = os.getenv("TENANT_ID")
 GRAPH_URL = "https://graph.microsoft.com"
 GRAPH_VERSION = "beta"
@@ -204,32 +209,36 @@ def outbound_sync_listener():
     """Initialize a delta outbound sync with Azure Active Directory."""
     LOGGER.info("Starting outbound sync listener...")
 
-    while True:
-        try:
-            queue_entry = peek_at_queue("outbound_queue", TENANT_ID)
-            LOGGER.info(
-                "Received queue entry %s from outbound queue...", queue_entry["id"]
-            )
+    for queue_entries in consume_queue(
+        "outbound_queue", TENANT_ID, OUTBOUND_BATCH_SIZE
+    ):
+        for queue_entry in queue_entries:
+            try:
+                LOGGER.info(
+                    "Received queue entry %s from outbound queue...", queue_entry["id"]
+                )
 
-            data_type = queue_entry["data_type"]
-            LOGGER.info("Putting %s into aad...", data_type)
-            if is_entry_in_aad(queue_entry):
-                update_entry_aad(queue_entry)
-            else:
-                create_entry_aad(queue_entry)
-
-            LOGGER.info("Putting queue entry into changelog...")
-            put_entry_changelog(queue_entry, "outbound")
-
-        except ExpectedError as err:
-            LOGGER.debug(
-                (
-                    "%s Repolling after %s seconds...",
-                    err.__str__,
-                    LISTENER_POLLING_DELAY,
+                data_type = queue_entry["data_type"]
+                LOGGER.info("Putting %s into aad...", data_type)
+                if is_entry_in_aad(queue_entry):
+                    update_entry_aad(queue_entry)
+                else:
+                    create_entry_aad(queue_entry)
+
+                LOGGER.info("Putting queue entry into changelog...")
+                put_entry_changelog(queue_entry, "outbound")
+                update_outbound_entry_status(queue_entry["id"])
+
+            except ExpectedError as err:
+                LOGGER.debug(
+                    (
+                        "%s Repolling after %s seconds...",
+                        err.__str__,
+                        LISTENER_POLLING_DELAY,
+                    )
                 )
-            )
-            time.sleep(LISTENER_POLLING_DELAY)
-        except Exception as err:
-            LOGGER.exception(err)
-            raise err
+                time.sleep(LISTENER_POLLING_DELAY)
+                break
+            except Exception as err:
+                LOGGER.exception(err)
+                raise err
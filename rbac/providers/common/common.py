@@ -51,7 +51,7 @@ def wait_for_rethink(max_attempts=200, delay=0.5):
         while attempts < max_attempts and not is_rethink_ready:
             db_status = r.db("rbac").wait().coerce_to("object").run(conn)
             ready_table_count = db_status["ready"]
-            is_rethink_ready = ready_table_count == 25
+            is_rethink_ready = ready_table_count == 27
             attempts += 1
             time.sleep(delay)
     return is_rethink_ready
@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 """ Database (RethinkDB) helper functions"""
+import time
 from datetime import timezone
 from datetime import datetime as dt
 import rethinkdb as r
@@ -23,6 +24,8 @@ from rbac.utils import connect_to_db
 
 LOGGER = get_default_logger(__name__)
 
+QUEUE_FEED_RETRY_SECS = 5
+
 
 def get_last_sync(source, sync_type):
     """
@@ -86,6 +89,93 @@ def peek_at_queue(table_name, provider_id=None):
         return None
 
 
+def unconfirmed_queue(table_name, provider_id):
+    """Returns a query for the unconfirmed entries of provider_id in
+    table_name, using the provider_status_timestamp index, so confirmed
+    entries are never read."""
+    return r.table(table_name).between(
+        [provider_id, "UNCONFIRMED", r.minval],
+        [provider_id, "UNCONFIRMED", r.maxval],
+        index="provider_status_timestamp",
+    )
+
+
+def fetch_queue_entries(table_name, provider_id, limit, conn=None):
+    """Returns up to limit unconfirmed entries from table_name for provider_id,
+    oldest first."""
+    close = conn is None
+    try:
+        if close:
+            conn = connect_to_db()
+        queue_entries = list(
+            unconfirmed_queue(table_name, provider_id)
+            .order_by(index="provider_status_timestamp")
+            .limit(limit)
+            .run(conn)
+        )
+        if close:
+            conn.close()
+        return queue_entries
+    except (r.ReqlOpFailedError, r.ReqlDriverError):
+        return []
+
+
+def wait_for_queue_change(feed):
+    """Blocks until the changefeed reports a new or changed unconfirmed entry,
+    ignoring entries that leave the queue, then discards any other changes
+    already received."""
+    while not feed.next().get("new_val"):
+        pass
+    try:
+        while True:
+            feed.next(wait=False)
+    except r.ReqlTimeoutError:
+        pass
+
+
+def consume_queue(table_name, provider_id, batch_size):
+    """Yields batches of up to batch_size unconfirmed entries from table_name
+    for provider_id, oldest first, for as long as there are any. While the
+    queue is empty, waits on a changefeed rather than polling.
+
+    The changefeed is opened before the queue is read, so entries added while
+    a batch is being processed are not missed. If it fails, it is reopened
+    after QUEUE_FEED_RETRY_SECS.
+
+    Args:
+        table_name:
+            str: the queue table, e.g. outbound_queue
+        provider_id:
+            str: the provider whose entries are consumed
+        batch_size:
+            int: most entries yielded at once
+    """
+    while True:
+        conn = None
+        try:
+            conn = connect_to_db()
+            feed = unconfirmed_queue(table_name, provider_id).changes().run(conn)
+            while True:
+                queue_entries = fetch_queue_entries(
+                    table_name, provider_id, batch_size, conn
+                )
+                if queue_entries:
+                    yield queue_entries
+                else:
+                    wait_for_queue_change(feed)
+        except (r.ReqlError, r.ReqlCursorEmpty) as err:
+            LOGGER.warning(
+                "%s changefeed failed, reopening in %s seconds: %s",
+                table_name,
+                QUEUE_FEED_RETRY_SECS,
+                err,
+            )
+        finally:
+            if conn is not None:
+                conn.close()
+        time.sleep(QUEUE_FEED_RETRY_SECS)
+
+
 def put_entry_changelog(queue_entry, direction):
     """Puts the referenced document in the changelog table."""
     queue_entry["changelog_timestamp"] = dt.now().isoformat()
@@ -14,10 +14,17 @@
 # ------------------------------------------------------------------------------
 """ LDAP Connector
 """
+import queue
+import threading
 import time
+from contextlib import contextmanager
 
-from ldap3 import Connection, Server, ALL
-from ldap3.core.exceptions import LDAPSocketOpenError
+from ldap3 import Connection, Server, ALL, BASE
+from ldap3.core.exceptions import (
+    LDAPCommunicationError,
+    LDAPException,
+    LDAPSocketOpenError,
+)
 
 from rbac.providers.common.provider_errors import LdapBindException
 from rbac.common.logs import get_default_logger
@@ -27,6 +34,7 @@ LOGGER = get_default_logger(__name__)
 LDAP_READ_TIMEOUT_SECS = 10
 LDAP_CONNECT_TIMEOUT_SECS = 6
 LDAP_CONNECT_RETRY_SECS = 10
+LDAP_POOL_LIVENESS_SECS = 30
 
 
 def create_connection(server, user, password):
@@ -73,3 +81,97 @@ def await_connection(server, user, password):
 def can_connect_to_ldap(server, user, password):
     """Able to connect to LDAP"""
     return create_connection(server, user, password) is not None
+
+
+def is_alive(connection):
+    """Checks a connection is still open and bound by reading the root DSE"""
+    if connection.closed or not connection.bound:
+        return False
+    try:
+        return connection.search(
+            "", "(objectClass=*)", search_scope=BASE, attributes=["1.1"]
+        )
+    except LDAPException:
+        return False
+
+
+def close_quietly(connection):
+    """Unbinds a connection, ignoring errors from one already broken"""
+    try:
+        connection.unbind()
+    except LDAPException:
+        pass
+
+
+class LdapConnectionPool(object):
+    """A pool of bound connections to an LDAP server, reused instead of
+    connecting and binding for every operation.
+
+    A connection that has been idle for longer than liveness_secs is checked
+    before it is handed out, and replaced if it has gone stale. A connection
+    in use when an LDAPCommunicationError is raised is discarded.
+
+    Args:
+        server:
+            str: the LDAP server to connect to
+        user:
+            str: the user to bind as
+        password:
+            str: the user's password
+        size:
+            int: most connections open at once
+        liveness_secs:
+            float: idle time after which a connection is checked
+    """
+
+    def __init__(
+        self, server, user, password, size=1, liveness_secs=LDAP_POOL_LIVENESS_SECS
+    ):
+        self.server = server
+        self.user = user
+        self.password = password
+        self.size = size
+        self.liveness_secs = liveness_secs
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        """Borrows a bound connection, waiting for one to be returned if
+        size connections are already in use."""
+        with self._slots:
+            connection = self._checkout()
+            broken = False
+            try:
+                yield connection
+            except LDAPCommunicationError:
+                broken = True
+                raise
+            finally:
+                if broken:
+                    LOGGER.warning("Discarding broken LDAP connection")
+                    close_quietly(connection)
+                else:
+                    self._idle.put((connection, time.monotonic()))
+
+    def close(self):
+        """Unbinds every idle connection."""
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            close_quietly(connection)
+
+    def _checkout(self):
+        while True:
+            try:
+                connection, returned_at = self._idle.get_nowait()
+            except queue.Empty:
+                return await_connection(self.server, self.user, self.password)
+            if time.monotonic() - returned_at < self.liveness_secs:
+                return connection
+            if is_alive(connection):
+                return connection
+            LOGGER.info("Replacing stale LDAP connection")
+            close_quietly(connection)
@@ -30,6 +30,7 @@ from rbac.providers.common.inbound_filters import (
     outbound_queue_filter,
 )
 
+DELETED_ENTRIES_PER_INSERT = 1000
 DELTA_SYNC_INTERVAL_SECONDS = int(os.getenv("DELTA_SYNC_INTERVAL_SECONDS", "3600"))
 GROUP_BASE_DN = os.getenv("GROUP_BASE_DN")
 LDAP_DC = os.getenv("LDAP_DC")
@@ -134,7 +135,7 @@ def fetch_ldap_deletions():
         if data_type == "user":
             search_filter = "(objectClass=person)"
             search_base = USER_BASE_DN
-            existing_records = list(
+            existing_records = set(
                 r.table("user_mapping")
                 .filter({"provider_id": LDAP_DC})
                 .get_field("remote_id")
@@ -143,7 +144,7 @@ def fetch_ldap_deletions():
         else:
             search_filter = "(objectClass=group)"
             search_base = GROUP_BASE_DN
-            existing_records = list(
+            existing_records = set(
                 r.table("metadata")
                 .has_fields("role_id")
                 .filter({"provider_id": LDAP_DC})
@@ -166,10 +167,9 @@ def fetch_ldap_deletions():
 
             # For each user/group in AD, remove the user/group from existing_records.
             # Remaining entries in existing_records were deleted from AD.
-
-            for entry in ldap_connection.entries:
-                if entry.distinguishedName.value in existing_records:
-                    existing_records.remove(entry.distinguishedName.value)
+            existing_records.difference_update(
+                entry.distinguishedName.value for entry in ldap_connection.entries
+            )
 
             # 1.2.840.113556.1.4.319 is the OID/extended control for PagedResults
 
@@ -195,10 +195,11 @@ def fetch_ldap_deletions():
 
 
 def insert_deleted_entries(deleted_entries, data_type):
-    """ Inserts every entry in deleted_entries dict into inbound_queue table.
+    """ Inserts every entry in deleted_entries into inbound_queue table, with
+    one insert per DELETED_ENTRIES_PER_INSERT entries.
 
     Args:
-        deleted_entries: An array containing the remote_ids/distinguished names
+        deleted_entries: A collection of the remote_ids/distinguished names
             of the users/groups that were deleted.
         data_type: A string with the value of either user_deleted or group_deleted.
             This value will be used in the data_type field when we insert our data
@@ -215,20 +216,27 @@ def insert_deleted_entries(deleted_entries, data_type):
             "user_deleted or group_deleted. Found {}".format(data_type)
         )
 
-    conn = connect_to_db()
-    for remote_id in deleted_entries:
-        data = {"remote_id": remote_id}
-        inbound_entry = {
-            "data": data,
+    timestamp = datetime.now().replace(tzinfo=timezone.utc).isoformat()
+    inbound_entries = [
+        {
+            "data": {"remote_id": remote_id},
             "data_type": data_type,
             "sync_type": "delta",
-            "timestamp": datetime.now().replace(tzinfo=timezone.utc).isoformat(),
+            "timestamp": timestamp,
             "provider_id": LDAP_DC,
         }
-        LOGGER.debug(
-            "Inserted deleted LDAP %s into inbound queue: %s", data_type, remote_id
-        )
-        r.table("inbound_queue").insert(inbound_entry).run(conn)
+        for remote_id in deleted_entries
+    ]
+    conn = connect_to_db()
+    for start in range(0, len(inbound_entries), DELETED_ENTRIES_PER_INSERT):
+        r.table("inbound_queue").insert(
+            inbound_entries[start : start + DELETED_ENTRIES_PER_INSERT]
+        ).run(conn)
+    LOGGER.debug(
+        "Inserted %s deleted LDAP %s into inbound queue",
+        len(inbound_entries),
+        data_type,
+    )
     conn.close()
 
 
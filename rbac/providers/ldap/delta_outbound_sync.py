@@ -15,15 +15,17 @@
 """ Delta Outbound Sync for LDAP to get changes from NEXT into LDAP."""
 import os
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from ldap3 import ObjectDef, Reader, Writer
-from ldap3.core.exceptions import LDAPSessionTerminatedByServerError
+from ldap3.core.exceptions import LDAPCommunicationError
 
 from rbac.common.logs import get_default_logger
 from rbac.providers.common import ldap_connector
 from rbac.providers.common.db_queries import (
+    consume_queue,
     delete_entry_queue,
-    peek_at_queue,
     put_entry_changelog,
     update_outbound_entry_status,
 )
@@ -34,6 +36,8 @@ from rbac.providers.ldap.ldap_validator import validate_update_entry
 LOGGER = get_default_logger(__name__)
 
 LISTENER_POLLING_DELAY = int(os.getenv("LISTENER_POLLING_DELAY", "1"))
+LDAP_POOL_SIZE = int(os.getenv("LDAP_POOL_SIZE", "4"))
+OUTBOUND_BATCH_SIZE = int(os.getenv("LDAP_OUTBOUND_BATCH_SIZE", "50"))
 LDAP_DC = os.getenv("LDAP_DC")
 LDAP_SERVER = os.getenv("LDAP_SERVER")
 LDAP_USER = os.getenv("LDAP_USER")
@@ -104,60 +108,113 @@ def process_outbound_entry(queue_entry, ldap_connection):
     return False
 
 
-def ldap_outbound_listener():
-    """Initialize LDAP delta outbound sync with Active Directory."""
-    LOGGER.info("Starting LDAP outbound sync listener...")
-
-    while True:
+def apply_outbound_entry(queue_entry, ldap_connection):
+    """Applies queue_entry to LDAP, then confirms it and records it in the
+    changelog, or deletes it from the outbound queue if it made no change
+    or failed validation."""
+    LOGGER.debug("Processing LDAP outbound_queue entry: %s", str(queue_entry))
+    try:
+        successful_ldap_write = process_outbound_entry(queue_entry, ldap_connection)
+        if successful_ldap_write:
+            update_outbound_entry_status(queue_entry["id"])
+
+            LOGGER.debug("Putting queue entry into changelog...")
+            put_entry_changelog(queue_entry, "outbound")
+        else:
+            LOGGER.error(
+                "No changes were made in AD - deleting entry from outbound queue..."
+            )
+            delete_entry_queue(queue_entry["id"], "outbound_queue")
+
+    except ValidationException as err:
+        LOGGER.warning(
+            "Outbound payload failed validation, deleting entry from outbound queue..."
+        )
+        LOGGER.warning(err)
+        delete_entry_queue(queue_entry["id"], "outbound_queue")
+
+
+def apply_outbound_entries(queue_entries, pool):
+    """Applies the queue entries of one LDAP object in order with a pooled
+    connection. Returns the number applied, stopping at the first that
+    could not reach LDAP so that it and the rest are retried in order."""
+    applied = 0
+    try:
+        with pool.connection() as ldap_connection:
+            for queue_entry in queue_entries:
+                apply_outbound_entry(queue_entry, ldap_connection)
+                applied += 1
+    except LDAPCommunicationError as err:
+        LOGGER.warning(
+            "Lost LDAP connection, %s queue entries will be retried: %s",
+            len(queue_entries) - applied,
+            err,
+        )
+    return applied
+
+
+def process_outbound_batch(queue_entries, pool, executor):
+    """Applies a batch of outbound queue entries, those for different LDAP
+    objects concurrently and those for the same object in order.
 
+    Args:
+        queue_entries:
+            list: outbound_queue entries, oldest first
+        pool:
+            LdapConnectionPool: bound connections to the LDAP server
+        executor:
+            ThreadPoolExecutor: runs the entries of each LDAP object
+    Returns:
+        int: the number of queue entries applied
+    """
+    by_object = OrderedDict()
+    applied = 0
+    for queue_entry in queue_entries:
         try:
-            queue_entry = peek_at_queue("outbound_queue", LDAP_DC)
+            distinguished_name = get_distinguished_name(queue_entry)
+        except ValidationException as err:
+            LOGGER.warning(
+                "Outbound payload failed validation, deleting entry from outbound queue..."
+            )
+            LOGGER.warning(err)
+            delete_entry_queue(queue_entry["id"], "outbound_queue")
+            applied += 1
+            continue
+        by_object.setdefault(distinguished_name.lower(), []).append(queue_entry)
+    futures = [
+        executor.submit(apply_outbound_entries, object_entries, pool)
+        for object_entries in by_object.values()
+    ]
+    return applied + sum(future.result() for future in futures)
 
-            while queue_entry is None:
-                queue_entry = peek_at_queue("outbound_queue", LDAP_DC)
-                time.sleep(LISTENER_POLLING_DELAY)
 
+def ldap_outbound_listener():
+    """Initialize LDAP delta outbound sync with Active Directory."""
+    LOGGER.info("Starting LDAP outbound sync listener...")
+    pool = ldap_connector.LdapConnectionPool(
+        LDAP_SERVER, LDAP_USER, LDAP_PASS, size=LDAP_POOL_SIZE
+    )
+    total_entries = 0
+    total_seconds = 0.0
+    with ThreadPoolExecutor(max_workers=LDAP_POOL_SIZE) as executor:
+        for queue_entries in consume_queue(
+            "outbound_queue", LDAP_DC, OUTBOUND_BATCH_SIZE
+        ):
             LOGGER.info(
-                "Received queue entry %s from outbound queue...", queue_entry["id"]
+                "Received %s queue entries from outbound queue...", len(queue_entries)
             )
-
-            data_type = queue_entry["data_type"]
-            LOGGER.debug("Putting %s into ad...", data_type)
-
-            try:
-                LOGGER.debug(
-                    "Processing LDAP outbound_queue entry: %s", str(queue_entry)
-                )
-                ldap_connection = ldap_connector.await_connection(
-                    LDAP_SERVER, LDAP_USER, LDAP_PASS
-                )
-                successful_ldap_write = process_outbound_entry(
-                    queue_entry, ldap_connection
-                )
-                ldap_connection.unbind()
-
-                if successful_ldap_write:
-                    update_outbound_entry_status(queue_entry["id"])
-
-                    LOGGER.debug("Putting queue entry into changelog...")
-                    put_entry_changelog(queue_entry, "outbound")
-                else:
-                    LOGGER.error(
-                        "No changes were made in AD - deleting entry from outbound queue..."
-                    )
-                    delete_entry_queue(queue_entry["id"], "outbound_queue")
-
-            except ValidationException as err:
-                LOGGER.warning(
-                    "Outbound payload failed validation, deleting entry from outbound queue..."
-                )
-                LOGGER.warning(err)
-                delete_entry_queue(queue_entry["id"], "outbound_queue")
-
-        except LDAPSessionTerminatedByServerError:
-            LOGGER.warning(
-                "Ldap connection was terminated by the server. Attempting to reconnect..."
-            )
-            ldap_connection = ldap_connector.await_connection(
-                LDAP_SERVER, LDAP_USER, LDAP_PASS
+            start_time = time.perf_counter()
+            applied = process_outbound_batch(queue_entries, pool, executor)
+            elapsed = time.perf_counter() - start_time
+            total_entries += applied
+            total_seconds += elapsed
+            LOGGER.info(
+                "Applied %s outbound entries in %.3f seconds (%.1f entries/sec, "
+                "%.1f entries/sec since start)",
+                applied,
+                elapsed,
+                applied / elapsed if elapsed else 0.0,
+                total_entries / total_seconds if total_seconds else 0.0,
             )
+            if applied < len(queue_entries):
+                time.sleep(LISTENER_POLLING_DELAY)
@@ -44,7 +44,16 @@ LDAP_USER = os.getenv("LDAP_USER")
 LDAP_PASS = os.getenv("LDAP_PASS")
 USER_BASE_DN = os.getenv("USER_BASE_DN")
 GROUP_BASE_DN = os.getenv("GROUP_BASE_DN")
-LDAP_SEARCH_PAGE_SIZE = 500
+LDAP_SEARCH_PAGE_SIZE = int(os.getenv("LDAP_SEARCH_PAGE_SIZE", "500"))
+# "soft" acknowledges each page of the initial sync once it is in memory
+# rather than once it is written to disk.
+INITIAL_SYNC_DURABILITY = os.getenv("LDAP_INITIAL_SYNC_DURABILITY", "hard")
+if INITIAL_SYNC_DURABILITY not in ("hard", "soft"):
+    LOGGER.warning(
+        "Unsupported LDAP_INITIAL_SYNC_DURABILITY %s, using hard.",
+        INITIAL_SYNC_DURABILITY,
+    )
+    INITIAL_SYNC_DURABILITY = "hard"
 
 
 def fetch_ldap_data(data_type):
@@ -73,17 +82,17 @@ def fetch_ldap_data(data_type):
 
     conn = connect_to_db()
     while True:
-        start_time = time.clock()
+        start_time = time.perf_counter()
         ldap_connection.search(**search_parameters)
         record_count = len(ldap_connection.entries)
         LOGGER.info(
             "Got %s entries in %s seconds.",
             record_count,
-            "%.3f" % (time.clock() - start_time),
+            "%.3f" % (time.perf_counter() - start_time),
+        )
+        entry_count += insert_page(
+            entries=ldap_connection.entries, data_type=data_type, conn=conn
         )
-        for entry in ldap_connection.entries:
-            entry_count = entry_count + 1
-            insert_to_db(entry=entry, data_type=data_type, conn=conn)
 
         # 1.2.840.113556.1.4.319 is the OID/extended control for PagedResults
         cookie = ldap_connection.result["controls"]["1.2.840.113556.1.4.319"]["value"][
@@ -101,29 +110,64 @@ def fetch_ldap_data(data_type):
     conn.close()
 
 
-def insert_to_db(entry, data_type, conn):
-    """Insert user or group individually to RethinkDB from dict of data and begins delta sync timer."""
+def make_inbound_entry(entry, data_type):
+    """Standardize a user or group from LDAP into an inbound_queue entry.
+
+    Args:
+        entry:
+            ldap3.Entry: the user or group as read from LDAP
+        data_type:
+            str: "user" or "group"
+    Returns:
+        dict: the inbound_queue entry, or None if data_type is not supported
+    """
     if data_type == "user":
         standard_entry = inbound_user_filter(entry, "ldap")
     elif data_type == "group":
         standard_entry = inbound_group_filter(entry, "ldap")
     else:
         LOGGER.warning("unsupported data type: %s", data_type)
-        return
+        return None
 
-    inbound_entry = {
+    return {
         "data": standard_entry,
         "data_type": data_type,
         "sync_type": "initial",
         "timestamp": r.now(),
         "provider_id": LDAP_DC,
     }
+
+
+def insert_page(entries, data_type, conn, durability=None):
+    """Insert a page of users or groups into the inbound queue with a
+    single multi-document insert.
+
+    Args:
+        entries:
+            list: ldap3.Entry objects from one page of the search
+        data_type:
+            str: "user" or "group"
+        conn:
+            RethinkDB connection
+        durability:
+            str: "hard" or "soft", defaults to INITIAL_SYNC_DURABILITY
+    Returns:
+        int: the number of entries inserted
+    """
+    inbound_entries = []
+    for entry in entries:
+        inbound_entry = make_inbound_entry(entry, data_type)
+        if inbound_entry is not None:
+            inbound_entries.append(inbound_entry)
+    if not inbound_entries:
+        return 0
     LOGGER.debug(
-        "Inserting LDAP %s into inbound queue: %s",
-        data_type,
-        standard_entry["remote_id"],
+        "Inserting %s LDAP %ss into inbound queue", len(inbound_entries), data_type
     )
-    r.table("inbound_queue").insert(inbound_entry).run(conn)
+    r.table("inbound_queue").insert(
+        inbound_entries, durability=durability or INITIAL_SYNC_DURABILITY
+    ).run(conn)
+    return len(inbound_entries)
 
 
 def initiate_delta_sync():
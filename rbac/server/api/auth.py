@@ -29,10 +29,11 @@ from sanic.response import json as sanic_json
 from sanic_openapi import doc
 
 from rbac.app.config import ADAPI_REST_ENDPOINT
-from rbac.common.crypto.secrets import deserialize_api_key, generate_api_key
+from rbac.common.crypto.secrets import generate_api_key
 from rbac.common.logs import get_default_logger
 from rbac.server.api import utils
 from rbac.server.api.errors import ApiNotFound, ApiUnauthorized, ApiBadRequest
+from rbac.server.api.token_cache import verify_token
 from rbac.server.api.utils import log_request
 from rbac.server.db.auth_query import (
     create_auth_entry,
@@ -63,10 +64,9 @@ def authorized():
         @wraps(func)
         async def decorated_function(request, *args, **kwargs):
             try:
-                id_dict = deserialize_api_key(
+                await verify_token(
                     request.app.config.SECRET_KEY, utils.extract_request_token(request)
                 )
-                await get_auth_by_next_id(id_dict.get("id"))
             except (ApiNotFound, BadSignature):
                 raise ApiUnauthorized("Unauthorized: Invalid bearer token")
             response = await func(request, *args, **kwargs)
@@ -0,0 +1,387 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Asynchronous batch submission and batch status APIs.
+
+By default write endpoints hold the request open until sawtooth commits the
+batch. A client that asks for asynchronous handling, with ?async=true or a
+"Prefer: respond-async" header, gets a 202 response as soon as the batch is
+accepted, carrying the batch ids to poll at api/batches/<batch_id> or to
+watch on the api/batches/feed socket. Each worker tracks the batches it
+submitted and checks all outstanding ones with a single status request per
+poll interval. Batches submitted through another worker are only looked up
+once, when asked about.
+"""
+import asyncio
+import json as json_lib
+import time
+from collections import OrderedDict
+
+from itsdangerous import BadSignature
+from sanic import Blueprint
+from sanic.response import json
+from sanic_openapi import doc
+from sawtooth_sdk.protobuf import client_batch_submit_pb2
+
+from rbac.common.logs import get_default_logger
+from rbac.server.api.auth import authorized
+from rbac.server.api.errors import ApiNotFound
+from rbac.server.api import utils
+from rbac.server.api.token_cache import verify_token
+
+LOGGER = get_default_logger(__name__)
+
+BATCHES_BP = Blueprint("batches")
+
+FINAL_STATUSES = ("COMMITTED", "INVALID")
+STATUS_RESPONSE_OK = client_batch_submit_pb2.ClientBatchStatusResponse.OK
+
+
+def status_name(status):
+    """The name of a ClientBatchStatus status value."""
+    return client_batch_submit_pb2.ClientBatchStatus.Status.Name(status)
+
+
+def batch_status_resource(batch_status):
+    """Compose the json resource of a ClientBatchStatus."""
+    return {
+        "id": batch_status.batch_id,
+        "status": status_name(batch_status.status),
+        "invalid_transactions": [
+            {"id": txn.transaction_id, "message": txn.message}
+            for txn in batch_status.invalid_transactions
+        ],
+    }
+
+
+class BatchTracker(object):
+    """Status of the batches a worker submitted without waiting on them.
+
+    Args:
+        retention:
+            float: seconds a batch's status is kept after it was submitted
+        clock:
+            function: returns the current monotonic time, for tests
+    """
+
+    def __init__(self, retention=600.0, clock=time.monotonic):
+        self.retention = retention
+        self._clock = clock
+        self._batches = OrderedDict()
+        self._waiters = []
+
+    def track(self, batch_ids):
+        """Start tracking newly submitted batches."""
+        submitted_at = self._clock()
+        for batch_id in batch_ids:
+            self._batches[batch_id] = (
+                submitted_at,
+                {"id": batch_id, "status": "PENDING", "invalid_transactions": []},
+            )
+
+    def get(self, batch_id):
+        """Return the last known status resource of a batch, or None."""
+        entry = self._batches.get(batch_id)
+        return dict(entry[1]) if entry else None
+
+    def pending(self):
+        """Ids of tracked batches that are not yet committed or invalid."""
+        return [
+            batch_id
+            for batch_id, (_, resource) in self._batches.items()
+            if resource["status"] not in FINAL_STATUSES
+        ]
+
+    def update(self, batch_statuses):
+        """Record polled batch statuses, waking waiters if any changed."""
+        changed = False
+        for batch_status in batch_statuses:
+            entry = self._batches.get(batch_status.batch_id)
+            if entry is None:
+                continue
+            resource = batch_status_resource(batch_status)
+            if resource != entry[1]:
+                self._batches[batch_status.batch_id] = (entry[0], resource)
+                changed = True
+        if changed:
+            self._notify()
+
+    def expire(self):
+        """Stop tracking batches submitted longer than retention ago, waking
+        waiters if any were dropped."""
+        cutoff = self._clock() - self.retention
+        expired = False
+        while self._batches:
+            batch_id, (submitted_at, _) = next(iter(self._batches.items()))
+            if submitted_at > cutoff:
+                break
+            del self._batches[batch_id]
+            expired = True
+        # Feeds waiting on an expired batch must re-read it as unknown
+        if expired:
+            self._notify()
+
+    def wait_for_change(self):
+        """Return a future done at the next poll that changes a batch's
+        status, or when a batch expires. The waiter is registered right
+        away, so a change made before the future is awaited is not missed."""
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        return waiter
+
+    async def poll(self, conn, timeout):
+        """Fetch the status of every outstanding batch in one request."""
+        batch_ids = self.pending()
+        if not batch_ids:
+            return
+        status_response = await utils.fetch_batch_statuses(conn, batch_ids, timeout)
+        if status_response.status != STATUS_RESPONSE_OK:
+            LOGGER.warning(
+                "Polling %s batches failed with status %s",
+                len(batch_ids),
+                status_response.status,
+            )
+            return
+        self.update(status_response.batch_statuses)
+
+    def _notify(self):
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+TRACKER = BatchTracker()
+
+
+def configure(retention):
+    """Set how long this worker keeps the status of submitted batches."""
+    global TRACKER  # pylint: disable=global-statement
+    TRACKER = BatchTracker(retention=retention)
+    return TRACKER
+
+
+async def poll_batches(conn, interval, timeout):
+    """Poll the status of this worker's outstanding batches until cancelled.
+
+    Args:
+        conn:
+            obj: validator connection
+        interval:
+            float: seconds between polls
+        timeout:
+            int: seconds to wait for the validator to answer
+    """
+    while True:
+        try:
+            await TRACKER.poll(conn, timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.warning("Polling batch statuses failed: %s", err)
+        TRACKER.expire()
+        await asyncio.sleep(interval)
+
+
+def wants_async(request):
+    """True if a request asked not to wait for its batches to commit."""
+    if request.args.get("async", "").lower() in ("1", "true"):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "").lower()
+
+
+async def submit(request, batch_list):
+    """Send a write request's batches to sawtooth.
+
+    Waits for the batches to commit, unless the request asked for
+    asynchronous handling, in which case they are only submitted and
+    tracked, and the response is turned into a 202 carrying their ids.
+    Returns the same status as utils.send.
+    """
+    if not wants_async(request):
+        return await utils.send(
+            request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT
+        )
+    status = await utils.submit_batches(
+        request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT
+    )
+    batch_ids = [batch.header_signature for batch in batch_list.batches]
+    TRACKER.track(batch_ids)
+    request["batch_ids"] = request.get("batch_ids", []) + batch_ids
+    return status
+
+
+async def fetch_batch_status(request, batch_id):
+    """Get the status resource of a batch, asking the validator about
+    batches this worker is not tracking."""
+    resource = TRACKER.get(batch_id)
+    if resource is not None:
+        return resource
+    resources = await fetch_untracked_statuses(request, [batch_id])
+    return resources[batch_id]
+
+
+async def fetch_untracked_statuses(request, batch_ids):
+    """Ask the validator once for the status of batches this worker is not
+    tracking, without tracking them. Returns their status resources by id."""
+    status_response = await utils.fetch_batch_statuses(
+        request.app.config.VAL_CONN, batch_ids, request.app.config.TIMEOUT
+    )
+    resources = {batch_id: unknown_batch(batch_id) for batch_id in batch_ids}
+    if status_response.status == STATUS_RESPONSE_OK:
+        for batch_status in status_response.batch_statuses:
+            if batch_status.batch_id in resources:
+                resources[batch_status.batch_id] = batch_status_resource(
+                    batch_status
+                )
+    return resources
+
+
+def unknown_batch(batch_id):
+    """The status resource of a batch the validator does not know."""
+    return {"id": batch_id, "status": "UNKNOWN", "invalid_transactions": []}
+
+
+@BATCHES_BP.middleware("response")
+async def accept_async_response(request, response):
+    """Turn the response of a request whose batches were submitted
+    asynchronously into a 202 Accepted carrying the batch ids."""
+    batch_ids = request.get("batch_ids")
+    if not batch_ids or response.status != 200:
+        return
+    response.status = 202
+    response.headers["Location"] = "/api/batches/{}".format(batch_ids[-1])
+    try:
+        body = json_lib.loads(response.body.decode("utf-8"))
+    except ValueError:
+        return
+    if isinstance(body, dict):
+        body["batch_ids"] = batch_ids
+        response.body = json_lib.dumps(body).encode("utf-8")
+
+
+@BATCHES_BP.get("api/batches/<batch_id>")
+@doc.summary("Get the status of a submitted batch.")
+@doc.description(
+    "Get the status of a batch submitted by an asynchronous write request."
+)
+@doc.produces(
+    {
+        "data": {
+            "id": str,
+            "status": str,
+            "invalid_transactions": [{"id": str, "message": str}],
+        }
+    },
+    content_type="application/json",
+    description="The batch's status: PENDING, COMMITTED or INVALID.",
+)
+@doc.response(
+    401,
+    {"message": str, "code": int},
+    description="Unauthorized: The request lacks valid authentication credentials.",
+)
+@doc.response(
+    404, {"message": str, "code": int}, description="Batch could not be found."
+)
+@authorized()
+async def get_batch_status(request, batch_id):
+    """Get the status of a submitted batch."""
+    utils.log_request(request)
+    resource = await fetch_batch_status(request, batch_id)
+    if resource["status"] == "UNKNOWN":
+        raise ApiNotFound("Batch {} could not be found".format(batch_id))
+    return json({"data": resource})
+
+
+# TODO: FIXME: sanic-openapi @doc.exclude(True) decorator does not currently work on
+#  non-HTTP method or static routes. When a viable option becomes available apply it
+# to this route so that it is excluded from swagger.
+
+
+@BATCHES_BP.websocket("api/batches/feed")
+async def batch_feed(request, web_socket):
+    """Socket feed of batch status changes. Each message names the batches
+    to follow, and carries a token unless the socket was opened with an
+    Authorization header."""
+    LOGGER.info(request)
+    while True:
+        recv = json_lib.loads(await web_socket.recv())
+        utils.validate_fields(["batch_ids"], recv)
+        if not await feed_authorized(request, recv):
+            await web_socket.send(
+                json_lib.dumps(
+                    {"code": 401, "message": "Unauthorized: Invalid bearer token"}
+                )
+            )
+            return
+        batch_ids = recv.get("batch_ids")
+        max_ids = request.app.config.BATCH_FEED_MAX_IDS
+        if not isinstance(batch_ids, list) or len(batch_ids) > max_ids:
+            await web_socket.send(
+                json_lib.dumps(
+                    {
+                        "code": 400,
+                        "message": "Bad Request: batch_ids must be a list of at "
+                        "most {} batch ids".format(max_ids),
+                    }
+                )
+            )
+            continue
+        await batch_status_feed(request, web_socket, batch_ids)
+
+
+async def feed_authorized(request, recv):
+    """True if a feed message, or the request opening its socket, carries a
+    valid token."""
+    token = recv.get("token") or request.token
+    if not token:
+        return False
+    try:
+        await verify_token(request.app.config.SECRET_KEY, token)
+    except (ApiNotFound, BadSignature):
+        return False
+    return True
+
+
+async def batch_status_feed(request, web_socket, batch_ids):
+    """Send the status of the given batches each time one changes, until
+    none of them is pending. Batches submitted through other workers are
+    looked up once with the validator and their status sent as it is then;
+    only this worker's tracked batches are followed."""
+    sent = {}
+    untracked = [batch_id for batch_id in batch_ids if TRACKER.get(batch_id) is None]
+    if untracked:
+        resources = await fetch_untracked_statuses(request, untracked)
+        for batch_id in untracked:
+            sent[batch_id] = resources[batch_id]
+            await web_socket.send(json_lib.dumps({"batch": resources[batch_id]}))
+    tracked = [batch_id for batch_id in batch_ids if batch_id not in sent]
+    while tracked:
+        # Wait on the tracker before reading it, so a change in between is
+        # not missed
+        changed = TRACKER.wait_for_change()
+        try:
+            pending = False
+            for batch_id in tracked:
+                resource = TRACKER.get(batch_id) or unknown_batch(batch_id)
+                pending = pending or resource["status"] == "PENDING"
+                if sent.get(batch_id) != resource:
+                    sent[batch_id] = resource
+                    await web_socket.send(json_lib.dumps({"batch": resource}))
+            if not pending:
+                return
+            await changed
+        finally:
+            changed.cancel()
@@ -150,9 +150,11 @@ async def handle_errors(request, exception):
 
 @ERRORS_BP.exception(ReqlDriverError)
 async def handle_reql_error(request, exception):
-    """Re-establish connection on driver error """
+    """Log driver errors; the connection pool replaces dead connections."""
     LOGGER.exception(exception)
-    request.app.config.DB_CONN.reconnect(noreply_wait=False)
+    return json(
+        {"code": 503, "message": "Internal Error: Database unavailable."}, status=503
+    )
 
 
 @ERRORS_BP.exception(Exception)
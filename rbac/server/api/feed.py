@@ -12,9 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ------------------------------------------------------------------------------
-"""Socket feed enabling real-time notifications of proposals."""
+"""Socket feed enabling real-time notifications of proposals.
+
+Each worker opens a single changefeed on the proposals table, shared by all
+of its sockets. Every change is compiled into a proposal resource once and
+queued to the sockets of the users it concerns: its approvers while it is
+open, and its opener. A socket whose queue fills up because it is not
+reading is dropped rather than allowed to hold up the others.
+"""
+import asyncio
 import json
 
+from rethinkdb import ReqlError
 from sanic import Blueprint
 
 from rbac.common.logs import get_default_logger
@@ -26,6 +35,127 @@ from rbac.server.db.db_utils import create_connection
 FEED_BP = Blueprint("feed")
 LOGGER = get_default_logger(__name__)
 
+FEED_RETRY_DELAY = 5
+SEND_QUEUE_SIZE = 100
+
+
+class Subscriber(object):
+    """A socket's subscription to the proposals of a user.
+
+    Args:
+        next_id:
+            str: the user's next_id
+        queue_size:
+            int: most messages held for the socket before it is dropped
+    """
+
+    def __init__(self, next_id, queue_size=SEND_QUEUE_SIZE):
+        self.next_id = next_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def offer(self, message):
+        """Queue a message for the socket, dropping the subscriber if its
+        queue is full. Returns False once the subscriber is dropped."""
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.drop()
+            return False
+
+    def drop(self):
+        """Discard pending messages and tell the socket to close."""
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class ProposalHub(object):
+    """Fans one proposals changefeed out to this worker's sockets."""
+
+    def __init__(self):
+        self.subscribers = {}
+        self._task = None
+
+    def subscribe(self, next_id):
+        """Register a socket for a user's proposals, opening the changefeed
+        if this is the first."""
+        subscriber = Subscriber(next_id)
+        self.subscribers.setdefault(next_id, set()).add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a socket, closing the changefeed after the last one."""
+        subscribers = self.subscribers.get(subscriber.next_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.next_id]
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, proposal_resource):
+        """Queue a compiled proposal to the sockets of its approvers, while
+        it is open, and of its opener."""
+        recipients = {}
+        if proposal_resource["status"] == "OPEN":
+            message = json.dumps({"open_proposal": proposal_resource})
+            for next_id in proposal_resource["approvers"]:
+                recipients[next_id] = message
+        opener = proposal_resource.get("opener")
+        if opener not in recipients:
+            recipients[opener] = json.dumps({"user_proposal": proposal_resource})
+        for next_id, message in recipients.items():
+            for subscriber in list(self.subscribers.get(next_id, ())):
+                if not subscriber.offer(message):
+                    LOGGER.warning("Dropping slow proposal feed of %s", next_id)
+                    self.unsubscribe(subscriber)
+
+    async def _run(self):
+        """Follow the proposals changefeed until cancelled, reopening it if
+        it fails."""
+        while True:
+            conn = None
+            try:
+                conn = await create_connection()
+                subscription = await proposals_query.subscribe_to_proposals(conn)
+                while await subscription.fetch_next():
+                    proposal = (await subscription.next()).get("new_val")
+                    if proposal and self._may_concern_subscriber(proposal):
+                        await self._compile_and_publish(proposal)
+            except (ReqlError, OSError) as err:
+                LOGGER.warning("Proposal changefeed failed: %s", err)
+            finally:
+                if conn is not None:
+                    conn.close()
+            await asyncio.sleep(FEED_RETRY_DELAY)
+
+    async def _compile_and_publish(self, proposal):
+        try:
+            conn = await create_connection()
+            self.publish(await compile_proposal_resource(conn, proposal))
+        except (ReqlError, OSError):
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.warning("Could not publish proposal %s: %s", proposal.get("id"), err)
+
+    def _may_concern_subscriber(self, proposal):
+        """False if no subscriber can be sent this proposal. Approvers are
+        only known once compiled, so any open proposal may concern one."""
+        if proposal.get("status") == "OPEN":
+            return True
+        return proposal.get("opener") in self.subscribers
+
+
+HUB = ProposalHub()
+
 
 # TODO: FIXME: sanic-openapi @doc.exclude(True) decorator does not currently work on
 #  non-HTTP method or static routes. When a viable option becomes available apply it
@@ -36,31 +166,38 @@ LOGGER = get_default_logger(__name__)
 async def feed(request, web_socket):
     """Socket feed enabling real-time notifications"""
     LOGGER.info(request)
-    while True:
-        required_fields = ["next_id"]
-        recv = json.loads(await web_socket.recv())
+    required_fields = ["next_id"]
+    recv = json.loads(await web_socket.recv())
 
-        utils.validate_fields(required_fields, recv)
-        await proposal_feed(web_socket, recv)
+    utils.validate_fields(required_fields, recv)
+    await proposal_feed(web_socket, recv)
 
 
 async def proposal_feed(web_socket, recv):
-    """Send open proposal updates to a given user"""
-
-    conn = await create_connection()
-    subscription = await proposals_query.subscribe_to_proposals(conn)
-    while await subscription.fetch_next():
-        proposal = await subscription.next()
-        proposal_resource = await compile_proposal_resource(
-            conn, proposal.get("new_val")
-        )
-
-        conn.close()
-
-        if (
-            proposal_resource["status"] == "OPEN"
-            and recv.get("next_id") in proposal_resource["approvers"]
-        ):
-            await web_socket.send(json.dumps({"open_proposal": proposal_resource}))
-        elif recv.get("next_id") == proposal_resource["opener"]:
-            await web_socket.send(json.dumps({"user_proposal": proposal_resource}))
+    """Send open proposal updates to a given user until the socket closes or
+    falls too far behind"""
+    subscriber = HUB.subscribe(recv.get("next_id"))
+    # Reading from the socket is how its closing is noticed
+    receiving = asyncio.ensure_future(web_socket.recv())
+    getting = None
+    try:
+        while True:
+            getting = asyncio.ensure_future(subscriber.queue.get())
+            await asyncio.wait(
+                [receiving, getting], return_when=asyncio.FIRST_COMPLETED
+            )
+            if receiving.done():
+                receiving.result()
+                receiving = asyncio.ensure_future(web_socket.recv())
+            if getting.done():
+                message = getting.result()
+                if message is None:
+                    return
+                await web_socket.send(message)
+            else:
+                getting.cancel()
+    finally:
+        receiving.cancel()
+        if getting is not None:
+            getting.cancel()
+        HUB.unsubscribe(subscriber)
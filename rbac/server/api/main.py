@@ -13,6 +13,7 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 """RBAC API Server"""
+import asyncio
 
 import aiohttp
 from sanic import Blueprint
@@ -25,6 +26,8 @@ from rbac.common.crypto.keys import Key
 from rbac.common.logs import get_default_logger
 from rbac.common.sawtooth.messaging import Connection
 from rbac.server.api.auth import AUTH_BP
+from rbac.server.api import batches
+from rbac.server.api.batches import BATCHES_BP
 from rbac.server.api.chatbot import CHATBOT_BP
 from rbac.server.api.blocks import BLOCKS_BP
 from rbac.server.api.errors import ERRORS_BP
@@ -34,9 +37,14 @@ from rbac.server.api.proposals import PROPOSALS_BP
 from rbac.server.api.roles import ROLES_BP
 from rbac.server.api.search import SEARCH_BP
 from rbac.server.api.tasks import TASKS_BP
+from rbac.server.api import signer_cache
+from rbac.server.api import token_cache
 from rbac.server.api.users import USERS_BP
 from rbac.server.api.webhooks import WEBHOOKS_BP
-from rbac.server.db.db_utils import create_connection
+from rbac.server.blockchain_transactions.role_transaction import (
+    shutdown_signing_pool,
+)
+from rbac.server.db.db_utils import close_pool, create_pool
 
 APP_BP = Blueprint("utils")
 
@@ -45,18 +53,42 @@ LOGGER = get_default_logger(__name__)
 
 async def init(app, loop):
     """Initialize API Server."""
-    app.config.DB_CONN = await create_connection()
+    app.config.DB_POOL = await create_pool(
+        app.config.DB_HOST,
+        app.config.DB_PORT,
+        app.config.DB_NAME,
+        min_size=app.config.DB_POOL_MIN_SIZE,
+        max_size=app.config.DB_POOL_MAX_SIZE,
+        acquire_timeout=app.config.DB_POOL_ACQUIRE_TIMEOUT,
+        health_check_interval=app.config.DB_POOL_HEALTH_CHECK_INTERVAL,
+    )
     app.config.VAL_CONN = Connection(app.config.VALIDATOR)
     app.config.VAL_CONN.open()
     conn = aiohttp.TCPConnector(
         limit=app.config.AIOHTTP_CONN_LIMIT, ttl_dns_cache=app.config.AIOHTTP_DNS_TTL
     )
     app.config.HTTP_SESSION = aiohttp.ClientSession(connector=conn, loop=loop)
+    token_cache.configure(app.config.AUTH_CACHE_SIZE, app.config.AUTH_CACHE_TTL)
+    signer_cache.configure(app.config.SIGNER_CACHE_SIZE, app.config.SIGNER_CACHE_TTL)
+    app.config.AUTH_FEED = asyncio.ensure_future(token_cache.watch_auth_changes())
+    batches.configure(app.config.BATCH_STATUS_RETENTION)
+    app.config.BATCH_POLLER = asyncio.ensure_future(
+        batches.poll_batches(
+            app.config.VAL_CONN, app.config.BATCH_POLL_INTERVAL, app.config.TIMEOUT
+        )
+    )
 
 
 async def finish(app, loop):
     """Close connections."""
-    app.config.DB_CONN.close()
+    app.config.AUTH_FEED.cancel()
+    app.config.BATCH_POLLER.cancel()
+    LOGGER.info("Token cache metrics: %s", token_cache.TOKEN_CACHE.metrics())
+    LOGGER.info("Signer cache metrics: %s", signer_cache.SIGNER_CACHE.metrics())
+    signer_cache.clear()
+    shutdown_signing_pool()
+    LOGGER.info("RethinkDB connection pool metrics: %s", app.config.DB_POOL.metrics())
+    await close_pool()
     app.config.VAL_CONN.close()
     LOGGER.info(loop)
     await app.config.HTTP_SESSION.close()
@@ -87,6 +119,11 @@ def load_config(app):
             "description": "Paste your auth token.",
         }
     }
+    app.config.AUTH_CACHE_SIZE = int(get_config("AUTH_CACHE_SIZE"))
+    app.config.AUTH_CACHE_TTL = float(get_config("AUTH_CACHE_TTL"))
+    app.config.BATCH_FEED_MAX_IDS = int(get_config("BATCH_FEED_MAX_IDS"))
+    app.config.BATCH_POLL_INTERVAL = float(get_config("BATCH_POLL_INTERVAL"))
+    app.config.BATCH_STATUS_RETENTION = float(get_config("BATCH_STATUS_RETENTION"))
     app.config.BATCHER_KEY_PAIR = Key()
     app.config.CHATBOT_HOST = get_config("CHATBOT_HOST")
     app.config.CHATBOT_PORT = get_config("CHATBOT_PORT")
@@ -94,10 +131,19 @@ def load_config(app):
     app.config.CLIENT_PORT = get_config("CLIENT_PORT")
     app.config.DB_HOST = get_config("DB_HOST")
     app.config.DB_NAME = get_config("DB_NAME")
+    app.config.DB_POOL_ACQUIRE_TIMEOUT = float(get_config("DB_POOL_ACQUIRE_TIMEOUT"))
+    app.config.DB_POOL_HEALTH_CHECK_INTERVAL = float(
+        get_config("DB_POOL_HEALTH_CHECK_INTERVAL")
+    )
+    app.config.DB_POOL_MAX_SIZE = int(get_config("DB_POOL_MAX_SIZE"))
+    app.config.DB_POOL_MIN_SIZE = int(get_config("DB_POOL_MIN_SIZE"))
     app.config.DB_PORT = get_config("DB_PORT")
     app.config.DEBUG = bool(get_config("DEBUG"))
+    app.config.DELETE_BATCH_SIZE = int(get_config("DELETE_BATCH_SIZE"))
     app.config.LOGGING_LEVEL = get_config("LOGGING_LEVEL")
     app.config.SECRET_KEY = get_config("SECRET_KEY")
+    app.config.SIGNER_CACHE_SIZE = int(get_config("SIGNER_CACHE_SIZE"))
+    app.config.SIGNER_CACHE_TTL = float(get_config("SIGNER_CACHE_TTL"))
     app.config.PORT = int(get_config("SERVER_PORT"))
     app.config.TIMEOUT = int(get_config("TIMEOUT"))
     app.config.VALIDATOR = get_config("VALIDATOR")
@@ -110,6 +156,7 @@ def main():
     app = Sanic(__name__)
     app.blueprint(APP_BP)
     app.blueprint(AUTH_BP)
+    app.blueprint(BATCHES_BP)
     app.blueprint(BLOCKS_BP)
     app.blueprint(CHATBOT_BP)
     app.blueprint(ERRORS_BP)
@@ -22,7 +22,7 @@ from sanic_openapi import doc
 from rbac.common.logs import get_default_logger
 from rbac.server.api.auth import authorized
 from rbac.server.api.errors import ApiBadRequest, ApiForbidden
-from rbac.server.api.roles import add_role_member
+from rbac.server.api.roles import propose_role_members
 from rbac.server.api.utils import (
     check_admin_status,
     create_response,
@@ -239,8 +239,7 @@ async def add_pack_member(request, pack_id):
     conn.close()
     request.json["metadata"] = ""
     request.json["pack_id"] = pack_id
-    for role_id in pack_resource.get("roles"):
-        await add_role_member(request, role_id)
+    await propose_role_members(request, pack_resource.get("roles"))
     return json({"pack_id": pack_id})
 
 
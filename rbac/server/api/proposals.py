@@ -22,42 +22,29 @@ from rbac.common.role import Role
 from rbac.common.task import Task
 from rbac.common.user import User
 from rbac.server.api.auth import authorized
-from rbac.server.api.errors import ApiBadRequest, ApiUnauthorized
+from rbac.server.api.batches import submit
+from rbac.server.api.errors import ApiBadRequest, ApiNotFound, ApiUnauthorized
 from rbac.server.api.utils import (
     create_response,
     get_request_block,
     get_request_paging_info,
     get_transactor_key,
     log_request,
-    send,
     send_notification,
     validate_fields,
 )
 from rbac.server.db import proposals_query
-from rbac.server.db.relationships_query import fetch_relationships
+from rbac.server.db.relationships_query import fetch_relationships_of
 from rbac.server.db.db_utils import create_connection
-from rbac.server.db.users_query import fetch_manager_chain, get_next_admins
+from rbac.server.db.org_hierarchy_query import fetch_manager_chains
+from rbac.server.db.users_query import get_next_admins
 
 LOGGER = get_default_logger(__name__)
 
 PROPOSALS_BP = Blueprint("proposals")
 
 
-TABLES = {
-    "ADD_ROLE_TASK": "task_owners",
-    "ADD_ROLE_MEMBER": "role_owners",
-    "ADD_ROLE_OWNER": "role_owners",
-    "ADD_ROLE_ADMIN": "role_owners",
-    "REMOVE_ROLE_TASK": "task_owners",
-    "REMOVE_ROLE_MEMBER": "role_owners",
-    "REMOVE_ROLE_OWNER": "role_owners",
-    "REMOVE_ROLE_ADMIN": "role_owners",
-    "ADD_TASK_OWNER": "task_admins",
-    "ADD_TASK_ADMIN": "task_admins",
-    "REMOVE_TASK_OWNER": "task_admins",
-    "REMOVE_TASK_ADMIN": "task_admins",
-    "UPDATE_USER_MANAGER": "users",
-}
+TABLES = proposals_query.APPROVER_TABLES
 
 
 PROPOSAL_TRANSACTION = {
@@ -144,10 +131,7 @@ async def get_all_proposals(request):
     start, limit = get_request_paging_info(request)
     conn = await create_connection()
     proposals = await proposals_query.fetch_all_proposal_resources(conn, start, limit)
-    proposal_resources = []
-    for proposal in proposals:
-        proposal_resource = await compile_proposal_resource(conn, proposal)
-        proposal_resources.append(proposal_resource)
+    proposal_resources = await compile_proposal_resources(conn, proposals)
     conn.close()
     return await create_response(
         conn, request.url, proposal_resources, head_block, start=start, limit=limit
@@ -232,10 +216,26 @@ async def get_proposal(request, proposal_id):
 async def batch_update_proposals(request):
     """Update multiple proposals"""
     log_request(request)
-    required_fields = ["ids"]
+    required_fields = ["ids", "reason", "status"]
     validate_fields(required_fields, request.json)
-    for proposal_id in request.json["ids"]:
-        await update_proposal(request, proposal_id)
+    validate_proposal_status(request.json["status"])
+    txn_key, txn_user_id = await get_transactor_key(request=request)
+
+    conn = await create_connection()
+    batch_list, proposal_resources = await make_proposal_updates(
+        conn,
+        request.json["ids"],
+        request.json["status"],
+        request.json.get("reason"),
+        txn_key,
+        txn_user_id,
+    )
+    if batch_list is not None:
+        await submit(request, batch_list)
+    for proposal_resource in proposal_resources:
+        await send_notification(
+            proposal_resource.get("target"), proposal_resource["id"]
+        )
     return json({"proposal_ids": request.json["ids"]})
 
 
@@ -271,75 +271,154 @@ async def update_proposal(request, proposal_id):
     LOGGER.debug("update proposal %s\n%s", proposal_id, request.json)
     required_fields = ["reason", "status"]
     validate_fields(required_fields, request.json)
-    if request.json["status"] not in ("REJECTED", "APPROVED"):
-        raise ApiBadRequest(
-            "Bad Request: status must be either 'REJECTED' or 'APPROVED'"
-        )
+    validate_proposal_status(request.json["status"])
     txn_key, txn_user_id = await get_transactor_key(request=request)
 
     conn = await create_connection()
-    proposal_resource = await proposals_query.fetch_proposal_resource(
-        conn, proposal_id=proposal_id
+    batch_list, proposal_resources = await make_proposal_updates(
+        conn,
+        [proposal_id],
+        request.json["status"],
+        request.json.get("reason"),
+        txn_key,
+        txn_user_id,
     )
-    approvers_list = await compile_proposal_resource(conn, proposal_resource)
-    conn.close()
-    if txn_user_id not in approvers_list["approvers"]:
-        raise ApiUnauthorized(
-            "Bad Request: You don't have the authorization to APPROVE or REJECT the proposal"
+    await submit(request, batch_list)
+    await send_notification(proposal_resources[0].get("target"), proposal_id)
+    return json({"proposal_id": proposal_id})
+
+
+def validate_proposal_status(status):
+    """Raises ApiBadRequest unless status is a valid proposal update."""
+    if status not in ("REJECTED", "APPROVED"):
+        raise ApiBadRequest(
+            "Bad Request: status must be either 'REJECTED' or 'APPROVED'"
         )
-    batch_list = PROPOSAL_TRANSACTION[proposal_resource.get("type")][
-        request.json["status"]
-    ].batch_list(
-        signer_keypair=txn_key,
-        signer_user_id=txn_user_id,
-        proposal_id=proposal_id,
-        object_id=proposal_resource.get("object"),
-        related_id=proposal_resource.get("target"),
-        reason=request.json.get("reason"),
+
+
+async def make_proposal_updates(
+    conn, proposal_ids, status, reason, txn_key, txn_user_id, batch_list=None
+):
+    """Build the transactions that approve or reject several proposals, one
+    batch per proposal, in a single batch list so they can be submitted and
+    waited on together.
+
+    Args:
+        conn:
+            obj: a connection to rethinkdb, closed on return or error
+        proposal_ids:
+            list: ids of the proposals to update
+        status:
+            str: APPROVED or REJECTED
+        reason:
+            str: the reason given for the update
+        txn_key:
+            obj: Key of the user updating the proposals
+        txn_user_id:
+            str: next_id of the user updating the proposals
+        batch_list:
+            obj: an existing BatchList to add the batches to
+    Returns:
+        tuple: the BatchList and the updated proposals' resources
+    Raises:
+        ApiNotFound:
+            one of the proposals does not exist
+        ApiUnauthorized:
+            the user may not approve or reject one of the proposals
+    """
+    resources = await proposals_query.fetch_proposal_resources_by_ids(
+        conn, proposal_ids
     )
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
-    await send_notification(proposal_resource.get("target"), proposal_id)
-    return json({"proposal_id": proposal_id})
+    missing = [
+        proposal_id for proposal_id in proposal_ids if proposal_id not in resources
+    ]
+    if missing:
+        conn.close()
+        raise ApiNotFound(
+            "Not Found: No proposal with the id {} exists".format(missing[0])
+        )
+    proposal_resources = [resources[proposal_id] for proposal_id in proposal_ids]
+    # Closes conn
+    await compile_proposal_resources(conn, proposal_resources)
+    for proposal_resource in proposal_resources:
+        if txn_user_id not in proposal_resource["approvers"]:
+            raise ApiUnauthorized(
+                "Bad Request: You don't have the authorization to APPROVE or REJECT the proposal"
+            )
+        batch_list = PROPOSAL_TRANSACTION[proposal_resource.get("type")][
+            status
+        ].batch_list(
+            signer_keypair=txn_key,
+            signer_user_id=txn_user_id,
+            proposal_id=proposal_resource["id"],
+            object_id=proposal_resource.get("object"),
+            related_id=proposal_resource.get("target"),
+            reason=reason,
+            batch_list=batch_list,
+        )
+    return batch_list, proposal_resources
 
 
 async def compile_proposal_resource(conn, proposal_resource):
     """ Prepare proposal resource to be returned."""
+    return (await compile_proposal_resources(conn, [proposal_resource]))[0]
+
+
+async def compile_proposal_resources(conn, proposal_resources):
+    """ Prepare a page of proposal resources to be returned.
+
+    The approvers of every proposal are the owners (or admins) of the
+    proposal's object plus their manager chains, except for user manager
+    proposals, which NextAdmins approve. These are fetched for the whole
+    page at once: one query per relationship table, one for NextAdmins and
+    one for all the manager chains.
+    """
     conn.reconnect(noreply_wait=False)
-    table = TABLES[proposal_resource["type"]]
-    if "role" in table:
-        proposal_resource["approvers"] = await fetch_relationships(
-            table, "role_id", proposal_resource.get("object")
-        ).run(conn)
+    object_ids = {}
+    for proposal_resource in proposal_resources:
+        table = TABLES[proposal_resource["type"]]
+        if table != "users" and proposal_resource.get("object"):
+            object_ids.setdefault(table, set()).add(proposal_resource["object"])
 
-    elif "task" in table:
-        proposal_resource["approvers"] = await fetch_relationships(
-            table, "task_id", proposal_resource.get("object")
-        ).run(conn)
-    elif "users" in table:
-        proposal_resource["approvers"] = await get_next_admins(conn)
-        return proposal_resource
+    relationships = {}
+    for table, identifiers in object_ids.items():
+        index = "role_id" if "role" in table else "task_id"
+        rows = await fetch_relationships_of(table, index, list(identifiers)).run(conn)
+        for row in rows:
+            relationships.setdefault((table, row[index]), []).extend(
+                row["identifiers"]
+            )
 
-    # Fetch manager chain for each user in approvers list for proposals
-    # that are not UpdateUserManager proposals
-    i = 0
-    approvers_count = len(proposal_resource["approvers"])
-    final_list_of_manager_ids = []
-    while i < approvers_count:
-        list_of_manager_ids = await fetch_manager_chain(
-            conn, proposal_resource["approvers"][i]
-        )
-        final_list_of_manager_ids = final_list_of_manager_ids + list_of_manager_ids
-        i += 1
-    proposal_resource["approvers"] = (
-        final_list_of_manager_ids + proposal_resource["approvers"]
-    )
-    i = 0
-    duplicate_approvers_count = len(proposal_resource["approvers"])
-    unique_approver_ids = []
-    while i < duplicate_approvers_count:
-        if proposal_resource["approvers"][i] not in unique_approver_ids:
-            unique_approver_ids.append(proposal_resource["approvers"][i])
-        i += 1
-    proposal_resource["approvers"] = unique_approver_ids
+    next_admins = None
+    approver_ids = set()
+    for proposal_resource in proposal_resources:
+        table = TABLES[proposal_resource["type"]]
+        if table == "users":
+            if next_admins is None:
+                next_admins = await get_next_admins(conn)
+            proposal_resource["approvers"] = list(next_admins)
+        else:
+            proposal_resource["approvers"] = list(
+                relationships.get((table, proposal_resource.get("object")), [])
+            )
+            approver_ids.update(proposal_resource["approvers"])
+
+    # Managers up the chain of each approver may also approve, except for
+    # UpdateUserManager proposals
+    manager_chains = await fetch_manager_chains(conn, list(approver_ids))
+    for proposal_resource in proposal_resources:
+        if TABLES[proposal_resource["type"]] == "users":
+            continue
+        approvers = []
+        for approver in proposal_resource["approvers"]:
+            approvers.extend(manager_chains.get(approver, []))
+        approvers.extend(proposal_resource["approvers"])
+        unique_approver_ids = []
+        seen = set()
+        for approver in approvers:
+            if approver not in seen:
+                seen.add(approver)
+                unique_approver_ids.append(approver)
+        proposal_resource["approvers"] = unique_approver_ids
     conn.close()
-    return proposal_resource
+    return proposal_resources
@@ -34,14 +34,13 @@ from rbac.server.api.errors import (
     handle_errors,
 )
 from rbac.server.api.auth import authorized
+from rbac.server.api.batches import submit
 from rbac.server.blockchain_transactions.role_transaction import (
+    create_del_relationship_txns,
     create_del_role_txns,
-    create_del_ownr_by_role_txns,
-    create_del_admin_by_role_txns,
-    create_del_mmbr_by_role_txns,
     create_rjct_ppsls_role_txns,
 )
-from rbac.server.api.proposals import PROPOSAL_TRANSACTION, update_proposal
+from rbac.server.api.proposals import PROPOSAL_TRANSACTION, make_proposal_updates
 from rbac.server.api.utils import (
     check_admin_status,
     check_role_owner_status,
@@ -214,9 +213,7 @@ async def create_new_role(request):
             owners=request.json.get("owners"),
             description=request.json.get("description"),
         )
-        sawtooth_response = await send(
-            request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT
-        )
+        sawtooth_response = await submit(request, batch_list)
 
         if not sawtooth_response:
             LOGGER.warning("There was an error submitting the sawtooth transaction.")
@@ -348,7 +345,7 @@ async def update_role(request, role_id):
         role_id=role_id,
         description=role_description,
     )
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    await submit(request, batch_list)
     return json({"id": role_id, "description": role_description})
 
 
@@ -443,9 +440,9 @@ async def delete_role(request, role_id):
     txn_list = await create_rjct_ppsls_role_txns(
         txn_key, role_id, txn_user_id, txn_list
     )
-    txn_list = await create_del_admin_by_role_txns(txn_key, role_id, txn_list)
-    txn_list = await create_del_mmbr_by_role_txns(txn_key, role_id, txn_list)
-    txn_list = await create_del_ownr_by_role_txns(txn_key, role_id, txn_list)
+    txn_list = await create_del_relationship_txns(
+        txn_key, "role_id", role_id, txn_list
+    )
     txn_list = create_del_role_txns(txn_key, role_id, txn_list)
 
     # validate transaction list
@@ -461,9 +458,10 @@ async def delete_role(request, role_id):
             ),
         )
 
-    batch = batcher.make_batch_from_txns(transactions=txn_list, signer_keypair=txn_key)
-    batch_list = batcher.batch_to_list(batch=batch)
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    batch_list = batcher.make_batch_list_from_txns(
+        txn_list, txn_key, request.app.config.DELETE_BATCH_SIZE
+    )
+    await submit(request, batch_list)
     return json(
         {"message": "Role {} successfully deleted".format(role_id), "deleted": 1}
     )
@@ -530,7 +528,7 @@ async def add_role_admin(request, role_id):
         metadata=request.json.get("metadata"),
         assigned_approver=approver,
     )
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    await submit(request, batch_list)
     return json({"proposal_id": proposal_id})
 
 
@@ -576,50 +574,11 @@ async def add_role_member(request, role_id):
     log_request(request)
     required_fields = ["id"]
     validate_fields(required_fields, request.json)
-    txn_key, txn_user_id = await get_transactor_key(request)
-    proposal_id = str(uuid4())
-    conn = await create_connection()
-    approver = await fetch_relationships("role_owners", "role_id", role_id).run(conn)
-    batch_list = Role().member.propose.batch_list(
-        signer_keypair=txn_key,
-        signer_user_id=txn_user_id,
-        proposal_id=proposal_id,
-        role_id=role_id,
-        pack_id=request.json.get("pack_id"),
-        next_id=request.json.get("id"),
-        reason=request.json.get("reason"),
-        metadata=request.json.get("metadata"),
-        assigned_approver=approver,
-    )
-    batch_status = await send(
-        request.app.config.VAL_CONN,
-        batch_list,
-        request.app.config.TIMEOUT,
-        request.json.get("tracker") and True,
+    batch_status, proposal_ids, approved_ids = await propose_role_members(
+        request, [role_id]
     )
-    role_resource = await roles_query.fetch_role_resource(conn, role_id)
-    conn.close()
-    owners = role_resource.get("owners")
-    requester_id = request.json.get("id")
-    if requester_id in owners:
-        is_proposal_ready = await wait_for_resource_in_db(
-            "proposals", "proposal_id", proposal_id, max_attempts=30
-        )
-        if not is_proposal_ready:
-            LOGGER.warning(
-                "Max attempts exceeded. Proposal %s not found in RethinkDB.",
-                proposal_id,
-            )
-            return await handle_errors(
-                request,
-                ApiInternalError(
-                    "Max attempts exceeded. Proposal %s not found in RethinkDB."
-                    % proposal_id
-                ),
-            )
-        request.json["status"] = "APPROVED"
-        request.json["reason"] = "I am the owner of this role"
-        await update_proposal(request, proposal_id)
+    proposal_id = proposal_ids[0]
+    if approved_ids:
         if request.json.get("tracker"):
             events = {"batch_status": batch_status, "member_status": "MEMBER"}
             return create_tracker_response(events)
@@ -629,17 +588,6 @@ async def add_role_member(request, role_id):
                 "proposal_id": proposal_id,
             }
         )
-
-    LOGGER.info(
-        "Sending notification to queue for user %s for proposal %s",
-        request.json.get("id"),
-        proposal_id,
-    )
-    if isinstance(approver, list):
-        for user in approver:
-            await send_notification(user, proposal_id)
-    else:
-        await send_notification(approver, proposal_id)
     if request.json.get("tracker"):
         events = {"batch_status": batch_status}
         if batch_status == 1:
@@ -648,6 +596,104 @@ async def add_role_member(request, role_id):
     return json({"proposal_id": proposal_id})
 
 
+async def propose_role_members(request, role_ids):
+    """Propose adding a user to several roles, submitting every proposal in
+    one batch list and waiting on them together.
+
+    Proposals to roles the user owns are approved straight away, again with
+    a single batch list, once all of them have reached RethinkDB. The
+    approvers of the other proposals are notified.
+
+    Args:
+        request:
+            obj: the request; its json holds the user's id and the reason,
+                metadata, pack_id and tracker of the proposals
+        role_ids:
+            list: ids of the roles to add the user to
+    Returns:
+        tuple: the status of the proposal batches, the proposal ids in the
+            order of role_ids, and the ids of the proposals auto approved
+    """
+    if not role_ids:
+        return None, [], []
+    txn_key, txn_user_id = await get_transactor_key(request)
+    requester_id = request.json.get("id")
+    conn = await create_connection()
+    batch_list = None
+    proposals = []
+    for role_id in role_ids:
+        proposal_id = str(uuid4())
+        approver = await fetch_relationships("role_owners", "role_id", role_id).run(
+            conn
+        )
+        batch_list = Role().member.propose.batch_list(
+            signer_keypair=txn_key,
+            signer_user_id=txn_user_id,
+            proposal_id=proposal_id,
+            role_id=role_id,
+            pack_id=request.json.get("pack_id"),
+            next_id=requester_id,
+            reason=request.json.get("reason"),
+            metadata=request.json.get("metadata"),
+            assigned_approver=approver,
+            batch_list=batch_list,
+        )
+        proposals.append((proposal_id, approver))
+    conn.close()
+    batch_status = await send(
+        request.app.config.VAL_CONN,
+        batch_list,
+        request.app.config.TIMEOUT,
+        request.json.get("tracker") and True,
+    )
+
+    approved_ids = [
+        proposal_id for proposal_id, approver in proposals if requester_id in approver
+    ]
+    if approved_ids:
+        # Proposals submitted together are synced together, so the last one
+        # reaching RethinkDB means they all have
+        is_proposal_ready = await wait_for_resource_in_db(
+            "proposals", "proposal_id", approved_ids[-1], max_attempts=30
+        )
+        if not is_proposal_ready:
+            LOGGER.warning(
+                "Max attempts exceeded. Proposal %s not found in RethinkDB.",
+                approved_ids[-1],
+            )
+            raise ApiInternalError(
+                "Max attempts exceeded. Proposal %s not found in RethinkDB."
+                % approved_ids[-1]
+            )
+        conn = await create_connection()
+        approvals, _ = await make_proposal_updates(
+            conn,
+            approved_ids,
+            "APPROVED",
+            "I am the owner of this role",
+            txn_key,
+            txn_user_id,
+        )
+        await submit(request, approvals)
+        for proposal_id in approved_ids:
+            await send_notification(requester_id, proposal_id)
+
+    for proposal_id, approver in proposals:
+        if proposal_id in approved_ids:
+            continue
+        LOGGER.info(
+            "Sending notification to queue for user %s for proposal %s",
+            requester_id,
+            proposal_id,
+        )
+        if isinstance(approver, list):
+            for user in approver:
+                await send_notification(user, proposal_id)
+        else:
+            await send_notification(approver, proposal_id)
+    return batch_status, [proposal_id for proposal_id, _ in proposals], approved_ids
+
+
 @ROLES_BP.post("api/roles/<role_id>/owners")
 @doc.summary("Creates a proposal to add an owner to a role.")
 @doc.description("Creates a proposal to add an owner to a role.")
@@ -709,7 +755,7 @@ async def add_role_owner(request, role_id):
         metadata=request.json.get("metadata"),
         assigned_approver=approver,
     )
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    await submit(request, batch_list)
     if isinstance(approver, list):
         for user in approver:
             await send_notification(user, proposal_id)
@@ -772,7 +818,7 @@ async def add_role_task(request, role_id):
         metadata=request.json.get("metadata"),
         assigned_approver=approver,
     )
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    await submit(request, batch_list)
     return json({"proposal_id": proposal_id})
 
 
@@ -0,0 +1,172 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Per-worker cache of users' decrypted transactor keys.
+
+Write endpoints sign with the requesting user's private key, which is
+stored AES encrypted in the auth table. A user making several writes in a
+row would pay for the decryption and key parsing on each one, so the
+resulting signer is kept, by next_id, for a short TTL. An entry is only
+used while the user's encrypted key is unchanged, and the decrypted key
+bytes are overwritten when the entry is dropped.
+"""
+import time
+from collections import OrderedDict
+
+from sawtooth_signing.secp256k1 import Secp256k1PrivateKey
+
+from rbac.common.crypto.keys import Key
+from rbac.common.crypto.secrets import decrypt_private_key
+from rbac.common.logs import get_default_logger
+
+LOGGER = get_default_logger(__name__)
+
+
+class _Signer(object):
+    """A cached signer and the secret it was built from."""
+
+    __slots__ = ("expires_at", "encrypted_private_key", "secret", "key")
+
+    def __init__(self, expires_at, encrypted_private_key, secret):
+        self.expires_at = expires_at
+        self.encrypted_private_key = encrypted_private_key
+        self.secret = bytearray(secret)
+        self.key = Key(Secp256k1PrivateKey.from_bytes(bytes(self.secret)))
+
+    def wipe(self):
+        """Overwrite the decrypted key bytes and drop the signer."""
+        for index in range(len(self.secret)):
+            self.secret[index] = 0
+        self.key = None
+
+
+class SignerCache(object):
+    """A bounded LRU cache of transactor keys with a fixed TTL.
+
+    Args:
+        max_size:
+            int: most signers held before the least recently used is dropped
+        ttl:
+            float: seconds a decrypted key is kept
+        clock:
+            function: returns the current monotonic time, for tests
+    """
+
+    def __init__(self, max_size=1000, ttl=300.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, next_id, encrypted_private_key):
+        """Return the cached signer of a user, or None if there is none for
+        this encrypted key or it has expired."""
+        entry = self._entries.get(next_id)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if (
+            entry.expires_at <= self._clock()
+            or entry.encrypted_private_key != encrypted_private_key
+        ):
+            self._remove(next_id)
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(next_id)
+        self._stats["hits"] += 1
+        return entry.key
+
+    def put(self, next_id, encrypted_private_key, private_key):
+        """Cache the signer for a user's decrypted private key.
+
+        Args:
+            next_id:
+                str: the user's next_id
+            encrypted_private_key:
+                str: the user's key as stored in the auth table
+            private_key:
+                bytes: the decrypted 32 byte private key
+        Returns:
+            key:
+                obj: the cached Key
+        """
+        if next_id in self._entries:
+            self._remove(next_id)
+        entry = _Signer(self._clock() + self.ttl, encrypted_private_key, private_key)
+        self._entries[next_id] = entry
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self._stats["evictions"] += 1
+        return entry.key
+
+    def invalidate(self, next_id):
+        """Drop a user's signer."""
+        if next_id in self._entries:
+            self._remove(next_id)
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Drop every signer."""
+        for next_id in list(self._entries):
+            self._remove(next_id)
+
+    def metrics(self):
+        """Snapshot of cache size and hit statistics."""
+        stats = dict(self._stats)
+        stats["size"] = len(self._entries)
+        return stats
+
+    def _remove(self, next_id):
+        self._entries.pop(next_id).wipe()
+
+
+SIGNER_CACHE = SignerCache()
+
+
+def configure(max_size, ttl):
+    """Size this worker's signer cache, dropping anything already cached."""
+    global SIGNER_CACHE  # pylint: disable=global-statement
+    SIGNER_CACHE.clear()
+    SIGNER_CACHE = SignerCache(max_size=max_size, ttl=ttl)
+    return SIGNER_CACHE
+
+
+def invalidate(next_id):
+    """Drop a user's signer from this worker's cache."""
+    SIGNER_CACHE.invalidate(next_id)
+
+
+def clear():
+    """Drop every signer from this worker's cache."""
+    SIGNER_CACHE.clear()
+
+
+def get_signer(aes_key, next_id, encrypted_private_key):
+    """Get the Key a user signs transactions with, decrypting it only when
+    it is not already cached.
+
+    Args:
+        aes_key:
+            str: the API's AES key
+        next_id:
+            str: the user's next_id
+        encrypted_private_key:
+            str: the user's key as stored in the auth table
+    """
+    key = SIGNER_CACHE.get(next_id, encrypted_private_key)
+    if key is None:
+        private_key = decrypt_private_key(aes_key, next_id, encrypted_private_key)
+        key = SIGNER_CACHE.put(next_id, encrypted_private_key, private_key)
+    return key
@@ -21,13 +21,13 @@ from sanic_openapi import doc
 
 from rbac.common.task import Task
 from rbac.server.api.auth import authorized
+from rbac.server.api.batches import submit
 from rbac.server.api.utils import (
     create_response,
     get_request_block,
     get_request_paging_info,
     get_transactor_key,
     log_request,
-    send,
     validate_fields,
 )
 from rbac.server.db import tasks_query
@@ -142,7 +142,7 @@ async def create_new_task(request):
         owners=request.json.get("owners"),
         metdata=request.json.get("metadata"),
     )
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    await submit(request, batch_list)
     return create_task_response(request, task_id)
 
 
@@ -243,7 +243,7 @@ async def add_task_admin(request, task_id):
         metadata=request.json.get("metadata"),
         assigned_approver=approver,
     )
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    await submit(request, batch_list)
     return json({"proposal_id": proposal_id})
 
 
@@ -299,7 +299,7 @@ async def add_task_owner(request, task_id):
         metadata=request.json.get("metadata"),
         assigned_approver=approver,
     )
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    await submit(request, batch_list)
     return json({"proposal_id": proposal_id})
 
 
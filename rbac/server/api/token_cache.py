@@ -0,0 +1,201 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Per-worker cache of verified API tokens.
+
+Checking a bearer token costs a signature verification and an auth table
+lookup on every authenticated request. Once a token has been verified its
+payload and the user's auth record are kept, keyed by a digest of the
+token, until the earlier of the token's own expiry and the cache TTL. A
+changefeed on the auth table drops the entries, and the cached signer, of
+any user whose auth record changes; writes made by this worker drop them
+immediately.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
+import rethinkdb as r
+from rethinkdb import ReqlError
+
+from rbac.common.crypto.secrets import deserialize_api_key
+from rbac.common.logs import get_default_logger
+from rbac.server.api import signer_cache
+from rbac.server.db.auth_query import get_auth_by_next_id
+from rbac.server.db.db_utils import create_connection
+
+LOGGER = get_default_logger(__name__)
+
+FEED_RETRY_DELAY = 5
+
+
+class TokenCache(object):
+    """A bounded LRU cache of verified tokens with per-entry expiry.
+
+    Args:
+        max_size:
+            int: most tokens held before the least recently used is dropped
+        ttl:
+            float: seconds an entry is trusted, if the token expires later
+        clock:
+            function: returns the current unix time, for tests
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._digests = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def digest(token):
+        """The key a token is cached under; raw tokens are never stored."""
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token):
+        """Return the cached (payload, auth) of a token, or None."""
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        expires_at, payload, auth = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return payload, auth
+
+    def put(self, token, payload, auth, token_expires_at=None):
+        """Cache a verified token until it or the TTL expires.
+
+        Args:
+            token:
+                str: the bearer token
+            payload:
+                dict: the token's verified payload
+            auth:
+                dict: the user's auth record
+            token_expires_at:
+                int: unix time the token itself expires, if known
+        """
+        expires_at = self._clock() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        key = self.digest(token)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, payload, auth)
+        self._digests.setdefault(auth.get("next_id"), set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self._stats["evictions"] += 1
+
+    def invalidate(self, next_id):
+        """Drop every cached token of a user."""
+        for key in self._digests.pop(next_id, ()):
+            self._entries.pop(key, None)
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        """Drop every cached token."""
+        self._entries.clear()
+        self._digests.clear()
+
+    def metrics(self):
+        """Snapshot of cache size and hit statistics."""
+        stats = dict(self._stats)
+        stats["size"] = len(self._entries)
+        return stats
+
+    def _remove(self, key):
+        _, _, auth = self._entries.pop(key)
+        digests = self._digests.get(auth.get("next_id"))
+        if digests is not None:
+            digests.discard(key)
+            if not digests:
+                del self._digests[auth.get("next_id")]
+
+
+TOKEN_CACHE = TokenCache()
+
+
+def configure(max_size, ttl):
+    """Size this worker's token cache, dropping anything already cached."""
+    global TOKEN_CACHE  # pylint: disable=global-statement
+    TOKEN_CACHE = TokenCache(max_size=max_size, ttl=ttl)
+    return TOKEN_CACHE
+
+
+def invalidate(next_id):
+    """Drop every cached token and the signer of a user from this worker's
+    caches."""
+    TOKEN_CACHE.invalidate(next_id)
+    signer_cache.invalidate(next_id)
+
+
+async def verify_token(secret_key, token):
+    """Verify a bearer token, using the cache when it has been seen before.
+
+    Args:
+        secret_key:
+            str: the API's token signing key
+        token:
+            str: the bearer token
+    Returns:
+        tuple: the token's payload and the user's auth record
+    Raises:
+        BadSignature:
+            the token is invalid or has expired
+        ApiNotFound:
+            the token's user has no auth record
+    """
+    cached = TOKEN_CACHE.get(token)
+    if cached is not None:
+        return cached
+    payload, header = deserialize_api_key(secret_key, token, return_header=True)
+    auth = await get_auth_by_next_id(payload.get("id"))
+    TOKEN_CACHE.put(token, payload, auth, header.get("exp"))
+    return payload, auth
+
+
+async def watch_auth_changes():
+    """Invalidate cached tokens whenever a user's auth record changes.
+
+    Runs until cancelled. If the changefeed drops, every cached token is
+    discarded, since changes may have been missed, and the feed reopened.
+    """
+    while True:
+        conn = None
+        try:
+            conn = await create_connection()
+            feed = await r.table("auth").changes().run(conn)
+            while await feed.fetch_next():
+                change = await feed.next()
+                for value in (change.get("old_val"), change.get("new_val")):
+                    if value:
+                        invalidate(value.get("next_id"))
+        except (ReqlError, OSError) as err:
+            LOGGER.warning("Auth changefeed failed, clearing token cache: %s", err)
+        finally:
+            if conn is not None:
+                conn.close()
+        TOKEN_CACHE.clear()
+        signer_cache.clear()
+        await asyncio.sleep(FEED_RETRY_DELAY)
@@ -29,6 +29,7 @@ from rbac.common.logs import get_default_logger
 from rbac.common.sawtooth import batcher
 from rbac.common.user import User
 from rbac.server.api.auth import authorized
+from rbac.server.api.batches import submit
 from rbac.server.api.errors import (
     ApiBadRequest,
     ApiDisabled,
@@ -38,7 +39,8 @@ from rbac.server.api.errors import (
     ApiUnauthorized,
     handle_errors,
 )
-from rbac.server.api.proposals import compile_proposal_resource, PROPOSAL_TRANSACTION
+from rbac.server.api import token_cache
+from rbac.server.api.proposals import compile_proposal_resources, PROPOSAL_TRANSACTION
 from rbac.server.api.utils import (
     check_admin_status,
     create_authorization_response,
@@ -58,9 +60,7 @@ from rbac.server.db import users_query
 from rbac.server.db.db_utils import create_connection
 from rbac.server.blockchain_transactions.user_transaction import create_delete_user_txns
 from rbac.server.blockchain_transactions.role_transaction import (
-    create_del_ownr_by_user_txns,
-    create_del_admin_by_user_txns,
-    create_del_mmbr_by_user_txns,
+    create_del_relationship_txns,
 )
 
 
@@ -423,6 +423,7 @@ async def update_user_details(request):
         "email": request.json.get("email"),
     }
     await auth_query.update_auth(request.json.get("next_id"), auth_updates)
+    token_cache.invalidate(request.json.get("next_id"))
 
     # Send back success response
     return json({"message": "User information was successfully updated."})
@@ -491,17 +492,15 @@ async def delete_user(request, next_id):
         raise ApiDisabled("Not a valid action. Source not enabled.")
     txn_list = []
     txn_key, _ = await get_transactor_key(request)
-    txn_list = await create_del_ownr_by_user_txns(txn_key, next_id, txn_list)
-    txn_list = await create_del_admin_by_user_txns(txn_key, next_id, txn_list)
-    txn_list = await create_del_mmbr_by_user_txns(txn_key, next_id, txn_list)
+    txn_list = await create_del_relationship_txns(
+        txn_key, "related_id", next_id, txn_list
+    )
     txn_list = create_delete_user_txns(txn_key, next_id, txn_list)
 
-    if txn_list:
-        batch = batcher.make_batch_from_txns(
-            transactions=txn_list, signer_keypair=txn_key
-        )
-    batch_list = batcher.batch_to_list(batch=batch)
-    await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+    batch_list = batcher.make_batch_list_from_txns(
+        txn_list, txn_key, request.app.config.DELETE_BATCH_SIZE
+    )
+    await submit(request, batch_list)
 
     await reject_users_proposals(next_id, request)
 
@@ -654,7 +653,7 @@ async def update_manager(request, next_id):
             metadata=request.json.get("metadata"),
             assigned_approver=next_admins_list,
         )
-        await send(request.app.config.VAL_CONN, batch_list, request.app.config.TIMEOUT)
+        await submit(request, batch_list)
         await send_notification(request.json.get("id"), proposal_id)
     else:
         raise ApiBadRequest("Proposal opener is not a Next Admin.")
@@ -725,6 +724,7 @@ async def update_password(request):
         conn, request.json.get("next_id"), hashed_password=hashed_password, salt=salt
     )
     conn.close()
+    token_cache.invalidate(request.json.get("next_id"))
     return json({"message": "Password successfully updated"})
 
 
@@ -787,22 +787,20 @@ async def fetch_open_proposals(request, next_id):
     head_block = await get_request_block(request)
     start, limit = get_request_paging_info(request)
     conn = await create_connection()
-    proposals = await proposals_query.fetch_all_proposal_resources(conn, start, limit)
-    proposal_resources = []
-    for proposal in proposals:
-        proposal_resource = await compile_proposal_resource(conn, proposal)
-        proposal_resources.append(proposal_resource)
+    page = await proposals_query.fetch_proposal_resources_by_assigned_approver(
+        conn, next_id, "OPEN", start, limit
+    )
+    open_proposals = await compile_proposal_resources(conn, page["data"])
     conn.close()
-    open_proposals = []
-    for proposal_resource in proposal_resources:
-        if (
-            proposal_resource["status"] == "OPEN"
-            and next_id in proposal_resource["assigned_approver"]
-        ):
-            open_proposals.append(proposal_resource)
 
     return await create_response(
-        conn, request.url, open_proposals, head_block, start=start, limit=limit
+        conn,
+        request.url,
+        open_proposals,
+        head_block,
+        start=start,
+        limit=limit,
+        total=page["total"],
     )
 
 
@@ -860,23 +858,20 @@ async def fetch_confirmed_proposals(request, next_id):
     head_block = await get_request_block(request)
     start, limit = get_request_paging_info(request)
     conn = await create_connection()
-    proposals = await proposals_query.fetch_all_proposal_resources(conn, start, limit)
-    proposal_resources = []
-    for proposal in proposals:
-        proposal_resource = await compile_proposal_resource(conn, proposal)
-        proposal_resources.append(proposal_resource)
+    page = await proposals_query.fetch_proposal_resources_by_approver(
+        conn, next_id, "CONFIRMED", start, limit
+    )
+    confirmed_proposals = await compile_proposal_resources(conn, page["data"])
     conn.close()
 
-    confirmed_proposals = []
-    for proposal_resource in proposal_resources:
-        if (
-            proposal_resource["status"] == "CONFIRMED"
-            and next_id in proposal_resource["approvers"]
-        ):
-            confirmed_proposals.append(proposal_resource)
-
     return await create_response(
-        conn, request.url, confirmed_proposals, head_block, start=start, limit=limit
+        conn,
+        request.url,
+        confirmed_proposals,
+        head_block,
+        start=start,
+        limit=limit,
+        total=page["total"],
     )
 
 
@@ -934,23 +929,20 @@ async def fetch_rejected_proposals(request, next_id):
     head_block = await get_request_block(request)
     start, limit = get_request_paging_info(request)
     conn = await create_connection()
-    proposals = await proposals_query.fetch_all_proposal_resources(conn, start, limit)
-    proposal_resources = []
-    for proposal in proposals:
-        proposal_resource = await compile_proposal_resource(conn, proposal)
-        proposal_resources.append(proposal_resource)
+    page = await proposals_query.fetch_proposal_resources_by_approver(
+        conn, next_id, "REJECTED", start, limit
+    )
+    rejected_proposals = await compile_proposal_resources(conn, page["data"])
     conn.close()
 
-    rejected_proposals = []
-    for proposal_resource in proposal_resources:
-        if (
-            proposal_resource["status"] == "REJECTED"
-            and next_id in proposal_resource["approvers"]
-        ):
-            rejected_proposals.append(proposal_resource)
-
     return await create_response(
-        conn, request.url, rejected_proposals, head_block, start=start, limit=limit
+        conn,
+        request.url,
+        rejected_proposals,
+        head_block,
+        start=start,
+        limit=limit,
+        total=page["total"],
     )
 
 
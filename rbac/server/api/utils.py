@@ -13,7 +13,6 @@
 # limitations under the License.
 # -----------------------------------------------------------------------------
 """Utility functions to support APIs."""
-import binascii
 import datetime as dt
 import rethinkdb as r
 
@@ -21,18 +20,18 @@ from sanic.response import json
 from sawtooth_sdk.protobuf import client_batch_submit_pb2
 from sawtooth_sdk.protobuf import validator_pb2
 
-from rbac.common.crypto.keys import Key
-from rbac.common.crypto.secrets import decrypt_private_key, deserialize_api_key
 from rbac.common.logs import get_default_logger
 from rbac.server.api.errors import ApiBadRequest, ApiInternalError, ApiUnauthorized
+from rbac.server.api.signer_cache import get_signer
+from rbac.server.api.token_cache import verify_token
 from rbac.server.db import blocks_query
-from rbac.server.db.auth_query import get_auth_by_next_id
 from rbac.server.db.db_utils import create_connection
 from rbac.server.db.roles_query import (
     get_role_by_name,
     get_role_membership,
     fetch_role_owners,
 )
+from rbac.server.db.table_counts_query import fetch_table_count
 
 
 LOGGER = get_default_logger(__name__)
@@ -69,8 +68,11 @@ def extract_request_token(request):
     raise ApiUnauthorized("Unauthorized: No authentication token provided")
 
 
-async def create_response(conn, request_url, data, head_block, start=None, limit=None):
-    """Creates json response."""
+async def create_response(
+    conn, request_url, data, head_block, start=None, limit=None, total=None
+):
+    """Creates json response. The paging total is the row count of the
+    table named in the URL, unless a total is given."""
     conn.reconnect(noreply_wait=False)
 
     base_url = request_url.split("?")[0]
@@ -83,7 +85,7 @@ async def create_response(conn, request_url, data, head_block, start=None, limit
     }
     if start is not None and limit is not None:
         response["paging"] = await get_response_paging_info(
-            conn, table, url, start, limit, head_block.get("num")
+            conn, table, url, start, limit, head_block.get("num"), total=total
         )
     conn.close()
     return json(response)
@@ -97,11 +99,14 @@ def create_tracker_response(events):
     return json(response)
 
 
-async def get_response_paging_info(conn, table, url, start, limit, head_block_num):
+async def get_response_paging_info(
+    conn, table, url, start, limit, head_block_num, total=None
+):
     """Get paging info for paged responses."""
     conn.reconnect(noreply_wait=False)
 
-    total = await get_table_count(conn, table, head_block_num)
+    if total is None:
+        total = await get_table_count(conn, table, head_block_num)
 
     prev_start = start - limit
     if prev_start < 0:
@@ -125,19 +130,9 @@ async def get_response_paging_info(conn, table, url, start, limit, head_block_nu
 
 
 async def get_table_count(conn, table, head_block_num):
-    """Get count of items in table."""
+    """Get count of items in table, from the paging total cache if fresh."""
     conn.reconnect(noreply_wait=False)
-
-    if table == "blocks":
-        table_count = await (
-            r.table(table)
-            .between(r.minval, head_block_num, right_bound="closed")
-            .count()
-            .run(conn)
-        )
-        conn.close()
-        return table_count
-    table_count = await r.table(table).count().run(conn)
+    table_count = await fetch_table_count(conn, table, head_block_num)
     conn.close()
     return table_count
 
@@ -171,22 +166,20 @@ async def get_request_block(request):
 
 async def get_transactor_key(request):
     """Get transactor key out of request."""
-    id_dict = deserialize_api_key(
+    id_dict, auth_data = await verify_token(
         request.app.config.SECRET_KEY, extract_request_token(request)
     )
     next_id = id_dict.get("id")
 
-    auth_data = await get_auth_by_next_id(next_id)
-    encrypted_private_key = auth_data.get("encrypted_private_key")
-    private_key = decrypt_private_key(
-        request.app.config.AES_KEY, next_id, encrypted_private_key
+    key = get_signer(
+        request.app.config.AES_KEY, next_id, auth_data.get("encrypted_private_key")
     )
-    hex_private_key = binascii.hexlify(private_key)
-    return Key(hex_private_key), next_id
+    return key, next_id
 
 
-async def send(conn, batch_list, timeout, webhook=False):
-    """Send batch_list to sawtooth."""
+async def submit_batches(conn, batch_list, timeout, webhook=False):
+    """Submit batch_list to sawtooth without waiting for it to commit.
+    Returns the submit status, or None for a failed webhook submission."""
     batch_request = client_batch_submit_pb2.ClientBatchSubmitRequest()
     batch_request.batches.extend(list(batch_list.batches))
     validator_response = await conn.send(
@@ -207,13 +200,31 @@ async def send(conn, batch_list, timeout, webhook=False):
             raise ApiInternalError("Queue Full")
     elif status != client_batch_submit_pb2.ClientBatchSubmitResponse.OK:
         return None
+    return status
+
 
+async def fetch_batch_statuses(conn, batch_ids, timeout, wait=False):
+    """Ask sawtooth for the status of several batches in one request.
+
+    Args:
+        conn:
+            obj: validator connection
+        batch_ids:
+            list: header signatures of the batches
+        timeout:
+            int: seconds to wait for the validator to answer
+        wait:
+            bool: have the validator hold the answer until the batches
+                commit or timeout passes
+    Returns:
+        status_response:
+            obj: ClientBatchStatusResponse
+    """
     status_request = client_batch_submit_pb2.ClientBatchStatusRequest()
-    status_request.batch_ids.extend(
-        list(b.header_signature for b in batch_list.batches)
-    )
-    status_request.wait = True
-    status_request.timeout = timeout
+    status_request.batch_ids.extend(list(batch_ids))
+    status_request.wait = wait
+    if wait:
+        status_request.timeout = timeout
     validator_response = await conn.send(
         validator_pb2.Message.CLIENT_BATCH_STATUS_REQUEST,
         status_request.SerializeToString(),
@@ -221,6 +232,17 @@ async def send(conn, batch_list, timeout, webhook=False):
     )
     status_response = client_batch_submit_pb2.ClientBatchStatusResponse()
     status_response.ParseFromString(validator_response.content)
+    return status_response
+
+
+async def send(conn, batch_list, timeout, webhook=False):
+    """Send batch_list to sawtooth and wait for it to commit."""
+    if await submit_batches(conn, batch_list, timeout, webhook) is None:
+        return None
+
+    status_response = await fetch_batch_statuses(
+        conn, [batch.header_signature for batch in batch_list.batches], timeout, True
+    )
     status = status_response.status
 
     if not webhook:
@@ -229,7 +251,15 @@ async def send(conn, batch_list, timeout, webhook=False):
     elif status != client_batch_submit_pb2.ClientBatchStatusResponse.OK:
         return None
 
-    response = status_response.batch_statuses[0]
+    # Report the first batch that did not commit, if any
+    response = next(
+        (
+            response
+            for response in status_response.batch_statuses
+            if response.status != client_batch_submit_pb2.ClientBatchStatus.COMMITTED
+        ),
+        status_response.batch_statuses[0],
+    )
     status = response.status
 
     if not webhook:
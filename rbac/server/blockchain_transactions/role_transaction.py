@@ -13,11 +13,22 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 """ Common Transaction Creation
+
+Deleting a user or role deletes each of its owner, admin and member
+relationships with a transaction of its own, which may be thousands of
+transactions. Their rows are fetched with one query, and the transactions
+are built and signed in chunks in a pool of worker processes, so the work
+is spread over the available CPUs and the event loop stays free.
 """
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import rethinkdb as r
 from rbac.server.api.proposals import PROPOSAL_TRANSACTION
 from rbac.server.db.db_utils import create_connection
 from rbac.server.db.proposals_query import fetch_open_proposals_by_role
+from rbac.common.crypto.keys import Key
 from rbac.common.logs import get_default_logger
 from rbac.common.role.delete_role import DeleteRole
 from rbac.common.role.delete_role_admin import DeleteRoleAdmin
@@ -27,6 +38,18 @@ from rbac.common.sawtooth import batcher
 
 LOGGER = get_default_logger(__name__)
 
+# Relationship tables, in the order their delete transactions are made
+RELATIONSHIP_DELETES = (
+    ("role_owners", DeleteRoleOwner),
+    ("role_admins", DeleteRoleAdmin),
+    ("role_members", DeleteRoleMember),
+)
+
+# Transactions built per task handed to the signing pool
+SIGNING_CHUNK_SIZE = 250
+
+_SIGNING_POOL = None
+
 
 def create_del_role_txns(key_pair, role_id, txn_list):
     """Create the delete transactions for a role object.
@@ -109,34 +132,9 @@ async def create_del_mmbr_by_role_txns(key_pair, role_id, txn_list):
         txn_list:
             list: extended list of transactions for batch submission
     """
-    conn = await create_connection()
-    role_members = (
-        await r.table("role_members")
-        .filter({"role_id": role_id})
-        .coerce_to("array")
-        .run(conn)
+    return await _create_del_txns(
+        key_pair, "role_members", "role_id", role_id, txn_list
     )
-    conn.close()
-    if role_members:
-        member_delete = DeleteRoleMember()
-        for member in role_members:
-            admin_delete_message = member_delete.make(
-                signer_keypair=key_pair,
-                related_id=member["related_id"],
-                role_id=member["role_id"],
-            )
-            payload = member_delete.make_payload(
-                message=admin_delete_message,
-                signer_keypair=key_pair,
-                signer_user_id=key_pair.public_key,
-            )
-            transaction = batcher.make_transaction(
-                payload=payload, signer_keypair=key_pair
-            )
-            txn_list.extend([transaction])
-    else:
-        LOGGER.info("No role_members found for role: %s", role_id)
-    return txn_list
 
 
 async def create_del_mmbr_by_user_txns(key_pair, next_id, txn_list):
@@ -153,32 +151,9 @@ async def create_del_mmbr_by_user_txns(key_pair, next_id, txn_list):
         txn_list:
             list: extended list of transactions for batch submission
     """
-    conn = await create_connection()
-    roles = (
-        await r.table("role_members")
-        .filter({"related_id": next_id})
-        .coerce_to("array")
-        .run(conn)
+    return await _create_del_txns(
+        key_pair, "role_members", "related_id", next_id, txn_list
     )
-    conn.close()
-    if roles:
-        member_delete = DeleteRoleMember()
-        for role in roles:
-            admin_delete_message = member_delete.make(
-                signer_keypair=key_pair, related_id=next_id, role_id=role["role_id"]
-            )
-            payload = member_delete.make_payload(
-                message=admin_delete_message,
-                signer_keypair=key_pair,
-                signer_user_id=key_pair.public_key,
-            )
-            transaction = batcher.make_transaction(
-                payload=payload, signer_keypair=key_pair
-            )
-            txn_list.extend([transaction])
-    else:
-        LOGGER.info("No role_members found for user: %s", next_id)
-    return txn_list
 
 
 async def create_del_ownr_by_role_txns(key_pair, role_id, txn_list):
@@ -195,34 +170,7 @@ async def create_del_ownr_by_role_txns(key_pair, role_id, txn_list):
         txn_list:
             list: extended list of transactions for batch submission
     """
-    conn = await create_connection()
-    role_owners = (
-        await r.table("role_owners")
-        .filter({"role_id": role_id})
-        .coerce_to("array")
-        .run(conn)
-    )
-    conn.close()
-    if role_owners:
-        owner_delete = DeleteRoleOwner()
-        for owner in role_owners:
-            owner_delete_message = owner_delete.make(
-                signer_keypair=key_pair,
-                related_id=owner["related_id"],
-                role_id=owner["role_id"],
-            )
-            payload = owner_delete.make_payload(
-                message=owner_delete_message,
-                signer_keypair=key_pair,
-                signer_user_id=key_pair.public_key,
-            )
-            transaction = batcher.make_transaction(
-                payload=payload, signer_keypair=key_pair
-            )
-            txn_list.extend([transaction])
-    else:
-        LOGGER.info("No role_owners found for role: %s", role_id)
-    return txn_list
+    return await _create_del_txns(key_pair, "role_owners", "role_id", role_id, txn_list)
 
 
 async def create_del_ownr_by_user_txns(key_pair, next_id, txn_list):
@@ -238,32 +186,9 @@ async def create_del_ownr_by_user_txns(key_pair, next_id, txn_list):
         txn_list:
             list: extended list of transactions for batch submission
     """
-    conn = await create_connection()
-    roles = (
-        await r.table("role_owners")
-        .filter({"related_id": next_id})
-        .coerce_to("array")
-        .run(conn)
+    return await _create_del_txns(
+        key_pair, "role_owners", "related_id", next_id, txn_list
     )
-    conn.close()
-    if roles:
-        owner_delete = DeleteRoleOwner()
-        for role in roles:
-            owner_delete_message = owner_delete.make(
-                signer_keypair=key_pair, related_id=next_id, role_id=role["role_id"]
-            )
-            payload = owner_delete.make_payload(
-                message=owner_delete_message,
-                signer_keypair=key_pair,
-                signer_user_id=key_pair.public_key,
-            )
-            transaction = batcher.make_transaction(
-                payload=payload, signer_keypair=key_pair
-            )
-            txn_list.extend([transaction])
-    else:
-        LOGGER.info("No role_owners found for user: %s", next_id)
-    return txn_list
 
 
 async def create_del_admin_by_role_txns(key_pair, role_id, txn_list):
@@ -279,34 +204,7 @@ async def create_del_admin_by_role_txns(key_pair, role_id, txn_list):
         txn_list:
             list: extended list of transactions for batch submission
     """
-    conn = await create_connection()
-    role_admins = (
-        await r.table("role_admins")
-        .filter({"role_id": role_id})
-        .coerce_to("array")
-        .run(conn)
-    )
-    conn.close()
-    if role_admins:
-        admin_delete = DeleteRoleAdmin()
-        for admin in role_admins:
-            admin_delete_message = admin_delete.make(
-                signer_keypair=key_pair,
-                related_id=admin["related_id"],
-                role_id=admin["role_id"],
-            )
-            payload = admin_delete.make_payload(
-                message=admin_delete_message,
-                signer_keypair=key_pair,
-                signer_user_id=key_pair.public_key,
-            )
-            transaction = batcher.make_transaction(
-                payload=payload, signer_keypair=key_pair
-            )
-            txn_list.extend([transaction])
-    else:
-        LOGGER.info("No role_admins found for role: %s", role_id)
-    return txn_list
+    return await _create_del_txns(key_pair, "role_admins", "role_id", role_id, txn_list)
 
 
 async def create_del_admin_by_user_txns(key_pair, next_id, txn_list):
@@ -322,29 +220,140 @@ async def create_del_admin_by_user_txns(key_pair, next_id, txn_list):
         txn_list:
             list: extended list of transactions for batch submission
     """
+    return await _create_del_txns(
+        key_pair, "role_admins", "related_id", next_id, txn_list
+    )
+
+
+async def create_del_relationship_txns(key_pair, index, identifier, txn_list):
+    """Create the delete transactions for every owner, admin and member
+    relationship of a role or user, fetching them with a single query.
+    Args:
+        key_pair:
+            obj: public and private keys for user
+        index:
+            str: role_id to delete a role's relationships, or related_id to
+                delete a user's
+        identifier:
+            str: the role_id or next_id
+        txn_list:
+            list: transactions for batch submission
+    Returns:
+        txn_list:
+            list: extended list of transactions for batch submission
+    """
+    conn = await create_connection()
+    relationships = await fetch_relationship_rows(index, identifier).run(conn)
+    conn.close()
+    rows = [
+        (table, row["role_id"], row["related_id"])
+        for table, _ in RELATIONSHIP_DELETES
+        for row in relationships[table]
+    ]
+    if not rows:
+        LOGGER.info("No relationships found for %s: %s", index, identifier)
+    txn_list.extend(await make_delete_txns(key_pair, rows))
+    return txn_list
+
+
+def fetch_relationship_rows(index, identifier):
+    """Query for the role_id and related_id of the relationships of a role
+    or user, as a document of relationship table -> rows."""
+    return r.expr(
+        {
+            table: r.table(table)
+            .get_all(identifier, index=index)
+            .pluck("role_id", "related_id")
+            .coerce_to("array")
+            for table, _ in RELATIONSHIP_DELETES
+        }
+    )
+
+
+async def make_delete_txns(key_pair, rows):
+    """Build and sign the delete transactions of relationship rows in the
+    signing pool, a chunk of rows per task.
+    Args:
+        key_pair:
+            obj: public and private keys for user
+        rows:
+            list: (table, role_id, related_id) of each relationship
+    Returns:
+        transactions:
+            list: the delete transactions, in the order of rows
+    """
+    if not rows:
+        return []
+    loop = asyncio.get_event_loop()
+    chunks = await asyncio.gather(
+        *[
+            loop.run_in_executor(
+                _signing_pool(),
+                _make_delete_txns,
+                key_pair.private_key,
+                rows[start : start + SIGNING_CHUNK_SIZE],
+            )
+            for start in range(0, len(rows), SIGNING_CHUNK_SIZE)
+        ]
+    )
+    return [transaction for chunk in chunks for transaction in chunk]
+
+
+def _signing_pool():
+    """This process's signing pool, started on first use."""
+    global _SIGNING_POOL  # pylint: disable=global-statement
+    if _SIGNING_POOL is None:
+        workers = os.cpu_count() or 1
+        if workers > 1:
+            _SIGNING_POOL = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _SIGNING_POOL = ThreadPoolExecutor(max_workers=1)
+    return _SIGNING_POOL
+
+
+def shutdown_signing_pool():
+    """Shut down this process's signing pool, if it was started."""
+    global _SIGNING_POOL  # pylint: disable=global-statement
+    if _SIGNING_POOL is not None:
+        _SIGNING_POOL.shutdown()
+        _SIGNING_POOL = None
+
+
+def _make_delete_txns(private_key, rows):
+    """Build the delete transactions of a chunk of relationship rows. Runs in
+    the signing pool, so the key is passed in its hex form."""
+    key_pair = Key(private_key)
+    deletes = {table: message_type() for table, message_type in RELATIONSHIP_DELETES}
+    transactions = []
+    for table, role_id, related_id in rows:
+        delete = deletes[table]
+        message = delete.make(
+            signer_keypair=key_pair, related_id=related_id, role_id=role_id
+        )
+        payload = delete.make_payload(
+            message=message, signer_keypair=key_pair, signer_user_id=key_pair.public_key
+        )
+        transactions.append(
+            batcher.make_transaction(payload=payload, signer_keypair=key_pair)
+        )
+    return transactions
+
+
+async def _create_del_txns(key_pair, table, index, identifier, txn_list):
     conn = await create_connection()
-    role_admins = (
-        await r.table("role_admins")
-        .filter({"related_id": next_id})
+    rows = (
+        await r.table(table)
+        .get_all(identifier, index=index)
+        .pluck("role_id", "related_id")
         .coerce_to("array")
         .run(conn)
     )
     conn.close()
-    if role_admins:
-        admin_delete = DeleteRoleAdmin()
-        for admin in role_admins:
-            admin_delete_message = admin_delete.make(
-                signer_keypair=key_pair, related_id=next_id, role_id=admin["role_id"]
-            )
-            payload = admin_delete.make_payload(
-                message=admin_delete_message,
-                signer_keypair=key_pair,
-                signer_user_id=key_pair.public_key,
-            )
-            transaction = batcher.make_transaction(
-                payload=payload, signer_keypair=key_pair
-            )
-            txn_list.extend([transaction])
-    else:
-        LOGGER.info("No role_admins found for user: %s", next_id)
+    if not rows:
+        LOGGER.info("No %s found for %s: %s", table, index, identifier)
+    txn_list.extend(
+        await make_delete_txns(
+            key_pair, [(table, row["role_id"], row["related_id"]) for row in rows]
+        )
+    )
     return txn_list
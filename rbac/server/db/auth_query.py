@@ -37,23 +37,21 @@ async def update_auth(next_id, auth_entry):
             dict: dictionary containing the fields to be updated
     """
     conn = await create_connection()
-    resource = (
-        await r.table("auth").filter({"next_id": next_id}).update(auth_entry).run(conn)
-    )
+    resource = await r.table("auth").get(next_id).update(auth_entry).run(conn)
     conn.close()
     return resource
 
 
 async def get_auth_by_next_id(next_id):
     """Get user record from auth table using next_id."""
+    if next_id is None:
+        raise ApiNotFound("No user with id '{}' exists".format(next_id))
     conn = await create_connection()
-    user_auth = (
-        await r.table("auth").filter({"next_id": next_id}).coerce_to("array").run(conn)
-    )
+    user_auth = await r.table("auth").get(next_id).run(conn)
     conn.close()
     if not user_auth:
         raise ApiNotFound("No user with id '{}' exists".format(next_id))
-    return user_auth[0]
+    return user_auth
 
 
 async def get_user_by_username(request):
@@ -83,7 +81,7 @@ async def get_user_map_by_next_id(next_id):
     conn = await create_connection()
     user_map = (
         await r.table("user_mapping")
-        .filter({"next_id": next_id})
+        .get_all(next_id)
         .coerce_to("array")
         .run(conn)
     )
@@ -93,4 +91,4 @@ async def get_user_map_by_next_id(next_id):
 
 async def delete_auth_entry_by_next_id(conn, next_id):
     """Delete auth_entry from auth table."""
-    return await r.table("auth").filter({"next_id": next_id}).delete().run(conn)
+    return await r.table("auth").get(next_id).delete().run(conn)
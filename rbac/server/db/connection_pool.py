@@ -0,0 +1,306 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Per-worker pool of long-lived asyncio RethinkDB connections.
+
+The asyncio RethinkDB driver multiplexes queries over a single socket by
+query token, so a pooled connection can safely be shared by several
+coroutines at once. The pool hands out an idle healthy connection, opens
+new connections up to max_size while every connection is busy, and only
+then starts sharing the least busy connection. A lease that is never
+closed is returned when it is garbage collected, and until then it only
+skews load balancing; it can never exhaust the pool.
+"""
+import asyncio
+import time
+
+import rethinkdb as r
+from rethinkdb import ReqlDriverError
+
+from rbac.common.logs import get_default_logger
+
+LOGGER = get_default_logger(__name__)
+
+
+class PooledConnection(object):
+    """A lease on a pooled connection that behaves like a RethinkDB connection.
+
+    close() returns the lease to the pool instead of closing the socket, and
+    reconnect() re-leases the same connection, so existing code written
+    against single-use connections keeps working unchanged.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+        self._released = False
+
+    @property
+    def raw(self):
+        """The underlying RethinkDB connection."""
+        return self._entry.conn
+
+    def close(self, *args, **kwargs):  # pylint: disable=unused-argument
+        """Return the lease to the pool. Safe to call more than once."""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._entry)
+
+    def reconnect(self, *args, **kwargs):  # pylint: disable=unused-argument
+        """Re-lease the underlying connection after close()."""
+        if self._released:
+            self._released = False
+            self._pool.lease(self._entry)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        if not self.__dict__.get("_released", True):
+            self.close()
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get("_entry")
+        if entry is None:
+            raise AttributeError(name)
+        return getattr(entry.conn, name)
+
+
+class _PoolEntry(object):
+    """Book-keeping for one pooled connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+    def is_open(self):
+        """True if the underlying socket is still usable."""
+        return self.conn.is_open()
+
+
+class ConnectionPool(object):
+    """A bounded pool of asyncio RethinkDB connections for one Sanic worker.
+
+    Args:
+        host:
+            str: RethinkDB host
+        port:
+            str: RethinkDB client driver port
+        db:
+            str: default database for queries
+        min_size:
+            int: connections opened up front and kept open
+        max_size:
+            int: upper bound on open connections
+        acquire_timeout:
+            float: seconds to wait for a healthy connection before giving up
+        health_check_interval:
+            float: seconds between background liveness checks (0 disables)
+    """
+
+    def __init__(
+        self,
+        host,
+        port,
+        db,
+        min_size=2,
+        max_size=10,
+        acquire_timeout=5.0,
+        health_check_interval=30.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                "Invalid pool size: min_size={}, max_size={}".format(
+                    min_size, max_size
+                )
+            )
+        self.host = host
+        self.port = port
+        self.db = db
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._entries = []
+        self._opening = 0
+        self._health_task = None
+        self._closed = False
+        self._stats = {
+            "acquired": 0,
+            "shared": 0,
+            "opened": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "health_checks_failed": 0,
+            "acquire_wait_total": 0.0,
+            "acquire_wait_max": 0.0,
+        }
+
+    async def open(self):
+        """Open min_size connections and start the health check task."""
+        for _ in range(self.min_size):
+            self._entries.append(await self._connect())
+        if self.health_check_interval:
+            self._health_task = asyncio.ensure_future(self._health_check_loop())
+        LOGGER.info(
+            "Opened RethinkDB connection pool (min=%s, max=%s) to %s:%s",
+            self.min_size,
+            self.max_size,
+            self.host,
+            self.port,
+        )
+        return self
+
+    async def close(self):
+        """Stop the health checker and close every pooled connection."""
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        entries, self._entries = self._entries, []
+        for entry in entries:
+            await self._close_entry(entry)
+
+    async def acquire(self):
+        """Lease a connection, opening a new one if all are busy.
+
+        Raises:
+            ReqlDriverError: no healthy connection within acquire_timeout
+        """
+        if self._closed:
+            raise ReqlDriverError("Connection pool is closed.")
+        started = time.monotonic()
+        try:
+            entry = await asyncio.wait_for(self._get_entry(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise ReqlDriverError(
+                "Timed out after {}s acquiring a RethinkDB connection.".format(
+                    self.acquire_timeout
+                )
+            )
+        waited = time.monotonic() - started
+        self._stats["acquired"] += 1
+        self._stats["acquire_wait_total"] += waited
+        self._stats["acquire_wait_max"] = max(self._stats["acquire_wait_max"], waited)
+        self.lease(entry)
+        return PooledConnection(self, entry)
+
+    def lease(self, entry):
+        """Record a new lease on a pooled connection."""
+        entry.leases += 1
+        entry.last_used = time.monotonic()
+
+    def release(self, entry):
+        """Return a lease; discard the connection if it has died."""
+        entry.leases = max(entry.leases - 1, 0)
+        if not entry.is_open() and entry in self._entries:
+            self._discard(entry)
+
+    def metrics(self):
+        """Snapshot of pool size, utilisation and acquire statistics."""
+        busy = [entry for entry in self._entries if entry.leases]
+        stats = dict(self._stats)
+        stats.update(
+            {
+                "size": len(self._entries),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "busy": len(busy),
+                "idle": len(self._entries) - len(busy),
+                "leases": sum(entry.leases for entry in self._entries),
+                "acquire_wait_avg": (
+                    stats["acquire_wait_total"] / stats["acquired"]
+                    if stats["acquired"]
+                    else 0.0
+                ),
+            }
+        )
+        return stats
+
+    async def _get_entry(self):
+        """Pick an idle healthy connection, growing the pool if none is idle."""
+        while True:
+            for entry in list(self._entries):
+                if not entry.is_open():
+                    self._discard(entry)
+            idle = [entry for entry in self._entries if not entry.leases]
+            if idle:
+                return idle[0]
+            if len(self._entries) + self._opening < self.max_size:
+                self._opening += 1
+                try:
+                    entry = await self._connect()
+                except ReqlDriverError as err:
+                    LOGGER.warning("Could not open pooled RethinkDB connection: %s", err)
+                    await asyncio.sleep(0.1)
+                    continue
+                finally:
+                    self._opening -= 1
+                self._entries.append(entry)
+                return entry
+            if self._entries:
+                # Pool is at max_size and every connection is busy; share one
+                self._stats["shared"] += 1
+                return min(self._entries, key=lambda entry: entry.leases)
+            # Every connection the pool may hold is still being opened
+            await asyncio.sleep(0.01)
+
+    async def _connect(self):
+        r.set_loop_type("asyncio")
+        conn = await r.connect(host=self.host, port=self.port, db=self.db)
+        self._stats["opened"] += 1
+        return _PoolEntry(conn)
+
+    def _discard(self, entry):
+        self._stats["discarded"] += 1
+        self._entries.remove(entry)
+        asyncio.ensure_future(self._close_entry(entry))
+
+    @staticmethod
+    async def _close_entry(entry):
+        try:
+            await entry.conn.close(noreply_wait=False)
+        except (ReqlDriverError, OSError) as err:
+            LOGGER.debug("Error closing pooled RethinkDB connection: %s", err)
+
+    async def _health_check_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            await self.check_health()
+
+    async def check_health(self):
+        """Ping idle connections, replace dead ones and top up to min_size."""
+        for entry in list(self._entries):
+            if entry.leases:
+                continue
+            try:
+                await asyncio.wait_for(r.expr(1).run(entry.conn), self.acquire_timeout)
+            except (ReqlDriverError, asyncio.TimeoutError, OSError) as err:
+                self._stats["health_checks_failed"] += 1
+                LOGGER.warning("Pooled RethinkDB connection failed check: %s", err)
+                if entry in self._entries:
+                    self._discard(entry)
+        while len(self._entries) + self._opening < self.min_size:
+            try:
+                self._entries.append(await self._connect())
+            except ReqlDriverError as err:
+                LOGGER.warning("Could not refill RethinkDB connection pool: %s", err)
+                break
+        LOGGER.debug("RethinkDB connection pool metrics: %s", self.metrics())
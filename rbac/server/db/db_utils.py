@@ -13,63 +13,226 @@
 # limitations under the License.
 # ------------------------------------------------------------------------------
 """Utility functions for Rethink and Sanic."""
+import asyncio
+import os
 import re
-import time
 
-from environs import Env
 import rethinkdb as r
+from rethinkdb import ReqlError
+
+from rbac.common.logs import get_default_logger
+from rbac.server.db.connection_pool import ConnectionPool
+
+LOGGER = get_default_logger(__name__)
+
+DB_HOST = os.getenv("DB_HOST", "rethink")
+DB_PORT = os.getenv("DB_PORT", "28015")
+DB_NAME = os.getenv("DB_NAME", "rbac")
+
+_POOL = None
+
+# Shortest interval between polls when waiting without a changefeed
+POLL_MIN_DELAY = 0.05
+
+# (table, index) -> the _ResourceFeed waiters on that table share
+_FEEDS = {}
+
+
+async def create_pool(host, port, db, **kwargs):
+    """Open this worker's connection pool and use it for create_connection.
+
+    Args:
+        host:
+            str: RethinkDB host
+        port:
+            str: RethinkDB client driver port
+        db:
+            str: default database for queries
+        kwargs:
+            Sizing, timeout and health check options for ConnectionPool.
+    Returns:
+        pool:
+            obj: the opened ConnectionPool
+    """
+    global _POOL  # pylint: disable=global-statement
+    _POOL = await ConnectionPool(host, port, db, **kwargs).open()
+    return _POOL
+
+
+async def close_pool():
+    """Close this worker's connection pool, if one is open."""
+    global _POOL  # pylint: disable=global-statement
+    if _POOL is not None:
+        pool, _POOL = _POOL, None
+        await pool.close()
+
+
+def get_pool():
+    """Return this worker's connection pool, or None outside the API server."""
+    return _POOL
 
 
 async def create_connection():
-    """Create a new connection to RethinkDB for async interactions."""
-    env = Env()
+    """Get a connection to RethinkDB for async interactions.
+
+    Inside the API server this leases a connection from the worker's pool;
+    closing it returns the lease. Elsewhere a dedicated connection is opened.
+    """
+    if _POOL is not None:
+        return await _POOL.acquire()
     r.set_loop_type("asyncio")
-    connection = await r.connect(
-        host=env("DB_HOST"), port=env("DB_PORT"), db=env("DB_NAME")
-    )
+    connection = await r.connect(host=DB_HOST, port=DB_PORT, db=DB_NAME)
     return connection
 
 
-async def wait_for_resource_in_db(table, index, identifier, max_attempts=10, delay=0.5):
-    """Polls rethinkdb for the requested resource until it has been removed.
-    Useful when commiting a delete transaction in sawtooth and waiting for the
-    resource to be removed from rethink for dependent chained transactions.
+class _ResourceFeed(object):
+    """A changefeed on one field of a table, shared by every waiter in this
+    worker that is waiting on a resource of that table.
+
+    The feed runs while anyone is waiting on it. Waiters register a future
+    for the identifier they want, which is resolved with True when a row
+    with that identifier is written, or with False if the feed fails.
+    """
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+        self.waiters = {}
+        self.ready = asyncio.get_event_loop().create_future()
+        self.task = asyncio.ensure_future(self._run())
+
+    @property
+    def live(self):
+        """True while the changefeed is open."""
+        return self.ready.done() and self.ready.result() and not self.task.done()
+
+    def add(self, identifier):
+        """Return a future resolved when identifier is written."""
+        future = asyncio.get_event_loop().create_future()
+        self.waiters.setdefault(identifier, set()).add(future)
+        return future
+
+    def discard(self, identifier, future):
+        """Stop waiting; the feed is closed once nobody is waiting on it."""
+        futures = self.waiters.get(identifier)
+        if futures is not None:
+            futures.discard(future)
+            if not futures:
+                del self.waiters[identifier]
+        if not self.waiters:
+            self.task.cancel()
+            if _FEEDS.get((self.table, self.index)) is self:
+                del _FEEDS[(self.table, self.index)]
+
+    def _resolve(self, identifier, found):
+        for future in self.waiters.pop(identifier, ()):
+            if not future.done():
+                future.set_result(found)
+
+    async def _run(self):
+        conn = None
+        try:
+            conn = await create_connection()
+            feed = (
+                await r.table(self.table)
+                .changes()
+                .pluck({"new_val": [self.index]})
+                .run(conn)
+            )
+            self.ready.set_result(True)
+            while await feed.fetch_next():
+                change = await feed.next()
+                new_val = change.get("new_val")
+                if new_val:
+                    self._resolve(new_val.get(self.index), True)
+        except (ReqlError, OSError) as err:
+            LOGGER.warning(
+                "Changefeed on %s failed, waiting by polling: %s", self.table, err
+            )
+        finally:
+            if not self.ready.done():
+                self.ready.set_result(False)
+            for identifier in list(self.waiters):
+                self._resolve(identifier, False)
+            if conn is not None:
+                conn.close()
+            if _FEEDS.get((self.table, self.index)) is self:
+                del _FEEDS[(self.table, self.index)]
+
+
+async def _resource_exists(table, index, identifier):
+    conn = await create_connection()
+    try:
+        return await (
+            r.table(table).get_all(identifier, index=index).is_empty().not_().run(conn)
+        )
+    finally:
+        conn.close()
+
+
+async def wait_for_resource_in_db(
+    table, index, identifier, max_attempts=10, delay=0.5, timeout=None
+):
+    """Waits without blocking for a resource to be written to rethinkdb.
+    Useful when commiting a transaction in sawtooth and waiting for ledger
+    sync to write the resulting resource for dependent chained transactions.
+
+    Waiters are woken by a changefeed on the table, shared by every waiter
+    of this worker. If the feed cannot be opened the resource is polled
+    for with exponential backoff instead.
 
     Args:
         table:
             str:    the name of a table to query for the resource in.
         index:
             str:    the name of the index of the identifier to query for.
+                    Must be the primary key or a secondary index of table.
         identifier:
             str:    A id for a given resource to wait for.
         max_attempts:
-            int:    The number of times to attempt to find the given role before
-                    giving up and returning False.
+            int:    With delay, the default timeout.
                         Default value: 10
         delay:
-            float:  The number of seconds to wait between query attempts.
+            float:  The longest interval in seconds between polls.
                         Default value: 0.5
+        timeout:
+            float:  Seconds to wait before giving up.
+                        Default value: max_attempts * delay
     Returns:
-        resource_removed:
+        resource_found:
             bool:
-                True:   If the role is successfully found within the given
-                        number of attempts.
+                True:   If the resource is found before the timeout.
             bool:
-                False:  If the role is not found after the given number of
-                        attempts.
+                False:  If the resource is not found before the timeout.
     """
-    resource_found = False
-    count = 0
-    with await create_connection() as conn:
-        while not resource_found and count < max_attempts:
-            resource = (
-                r.table(table).filter({index: identifier}).coerce_to("array").run(conn)
-            )
-            if resource:
-                resource_found = True
-            count += 1
-            time.sleep(delay)
-    return resource_found
+    if timeout is None:
+        timeout = max_attempts * delay
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+
+    feed = _FEEDS.get((table, index))
+    if feed is None:
+        feed = _FEEDS[(table, index)] = _ResourceFeed(table, index)
+    found = feed.add(identifier)
+    try:
+        # Check only once the feed is open, so a write in between is seen
+        await asyncio.wait([feed.ready], timeout=timeout)
+        backoff = POLL_MIN_DELAY
+        while True:
+            if found.done() and found.result():
+                return True
+            if await _resource_exists(table, index, identifier):
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            if feed.live and not found.done():
+                await asyncio.wait([found], timeout=remaining)
+            else:
+                await asyncio.sleep(min(backoff, remaining))
+                backoff = min(backoff * 2, delay)
+    finally:
+        feed.discard(identifier, found)
 
 
 def sanitize_query(query):
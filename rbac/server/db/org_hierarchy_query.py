@@ -0,0 +1,270 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Queries for the org_hierarchy table of precomputed manager chains.
+
+Ledger sync keeps one document per user holding the next_ids of the
+user's managers, nearest first, up to MAX_DEPTH levels up. The API reads
+the chains of many users in one query instead of walking the users table
+one manager at a time for every user.
+"""
+
+import rethinkdb as r
+from rethinkdb import ReqlOpFailedError
+
+from rbac.common.logs import get_default_logger
+
+LOGGER = get_default_logger(__name__)
+
+# How many managers up a chain is followed (matches users_query.fetch_manager_chain)
+MAX_DEPTH = 5
+# The users fields that place a user in the hierarchy
+HIERARCHY_FIELDS = ("manager_id", "remote_id")
+# Primary key of the document written once every user has a chain; it has
+# no ancestors, so it stays out of the ancestors index
+COMPLETE_MARKER = "__complete__"
+
+
+def manager_of(next_id):
+    """Query for a one element list with the next_id of a user's manager,
+    or an empty list if the user has no (known) manager. A user's
+    manager_id may hold either the manager's remote_id or next_id."""
+    return (
+        r.table("users")
+        .get_all(next_id, index="next_id")
+        .filter(lambda user: user["manager_id"].default("") != "")
+        .concat_map(
+            lambda user: r.table("users")
+            .get_all(user["manager_id"], index="remote_id")
+            .union(r.table("users").get_all(user["manager_id"], index="next_id"))
+        )
+        .get_field("next_id")
+        .limit(1)
+        .coerce_to("array")
+    )
+
+
+def manager_chain(next_id, depth=MAX_DEPTH):
+    """Query for the next_ids of a user's managers, nearest first."""
+    if depth == 0:
+        return r.expr([])
+    return manager_of(next_id).do(
+        lambda manager: r.branch(
+            manager.is_empty(),
+            manager,
+            manager.add(manager_chain(manager.nth(0), depth - 1)),
+        )
+    )
+
+
+def _direct_reports(next_id):
+    """Query for the next_ids of the users who report to a user."""
+    return (
+        r.table("users")
+        .get_all(next_id, index="next_id")
+        .concat_map(
+            lambda user: r.table("users").get_all(
+                r.args(
+                    r.branch(
+                        user["remote_id"].default("") == "",
+                        [next_id],
+                        [next_id, user["remote_id"]],
+                    )
+                ),
+                index="manager_id",
+            )
+        )
+        .get_field("next_id")
+        .coerce_to("array")
+    )
+
+
+def _descendants(next_id):
+    """Query for the next_ids of every user with a user in their chain."""
+    return (
+        r.table("org_hierarchy")
+        .get_all(next_id, index="ancestors")
+        .get_field("next_id")
+        .coerce_to("array")
+    )
+
+
+def refresh_org_hierarchy(next_ids):
+    """Query to recompute the manager chains of users that were created,
+    updated or deleted, of the users reporting to them, and of everyone
+    below those users in the hierarchy.
+
+    Args:
+        next_ids:
+            list: next_ids of the users whose records changed
+    """
+    return (
+        r.expr(next_ids)
+        .do(lambda changed: changed.union(changed.concat_map(_direct_reports)))
+        .do(lambda changed: changed.union(changed.concat_map(_descendants)))
+        .distinct()
+        .for_each(
+            lambda next_id: r.branch(
+                r.table("users").get_all(next_id, index="next_id").is_empty(),
+                r.table("org_hierarchy").get(next_id).delete(),
+                r.table("org_hierarchy").insert(
+                    {"next_id": next_id, "ancestors": manager_chain(next_id)},
+                    conflict="replace",
+                ),
+            )
+        )
+    )
+
+
+def moved_users(changes):
+    """The next_ids of users whose place in the hierarchy may have changed,
+    from the return_changes of a write to the users table."""
+    next_ids = []
+    for change in changes:
+        old_val = change.get("old_val")
+        new_val = change.get("new_val")
+        if old_val is None or new_val is None:
+            moved = True
+        else:
+            moved = any(
+                old_val.get(field) != new_val.get(field) for field in HIERARCHY_FIELDS
+            )
+        user = new_val or old_val
+        if moved and user and user.get("next_id"):
+            next_ids.append(user["next_id"])
+    return next_ids
+
+
+def sync_org_hierarchy(conn, changes):
+    """Refresh the chains affected by a write to the users table, given its
+    return_changes. Runs on a synchronous connection (ledger sync)."""
+    next_ids = moved_users(changes)
+    if not next_ids:
+        return
+    try:
+        refresh_org_hierarchy(next_ids).run(conn)
+    except ReqlOpFailedError as err:
+        LOGGER.warning("Could not refresh the org hierarchy: %s", err)
+
+
+def hierarchy_complete():
+    """Query for whether the table holds a chain for every user."""
+    return r.table("org_hierarchy").get(COMPLETE_MARKER).ne(None)
+
+
+def rebuild_org_hierarchy(conn):
+    """Recompute the manager chain of every user, e.g. after a fork is
+    resolved or on a database set up before the table existed. The table is
+    marked incomplete until the rebuild finishes, and readers walk the users
+    table meanwhile. Runs on a synchronous connection (ledger sync)."""
+    r.table("org_hierarchy").get(COMPLETE_MARKER).delete().run(conn)
+    r.table("org_hierarchy").filter(
+        lambda doc: r.table("users").get_all(doc["next_id"], index="next_id").is_empty()
+    ).delete().run(conn)
+    r.table("users").has_fields("next_id").get_field("next_id").for_each(
+        lambda next_id: r.table("org_hierarchy").insert(
+            {"next_id": next_id, "ancestors": manager_chain(next_id)},
+            conflict="replace",
+        )
+    ).run(conn)
+    r.table("org_hierarchy").insert(
+        {"next_id": COMPLETE_MARKER}, conflict="replace"
+    ).run(conn)
+    LOGGER.info("Rebuilt the org hierarchy")
+
+
+def ensure_org_hierarchy(conn):
+    """Rebuild the org hierarchy unless a rebuild has already completed,
+    e.g. on the first start after the table was added. Runs on a
+    synchronous connection (ledger sync)."""
+    try:
+        if not hierarchy_complete().run(conn):
+            rebuild_org_hierarchy(conn)
+    except ReqlOpFailedError as err:
+        LOGGER.warning("Could not rebuild the org hierarchy: %s", err)
+
+
+def reports_below(next_id):
+    """Query for the next_ids of everyone below a user in the hierarchy.
+    Reads the precomputed chains once the table is complete, and walks the
+    users table a level at a time until then."""
+    return r.branch(
+        hierarchy_complete(),
+        _descendants(next_id),
+        _reports_within(r.expr([next_id]), MAX_DEPTH),
+    )
+
+
+def _reports_within(level, depth):
+    """Query for the users up to depth levels below any user in level."""
+    if depth == 0:
+        return r.expr([])
+    return (
+        level.concat_map(_direct_reports)
+        .distinct()
+        .do(
+            lambda reports: r.branch(
+                reports.is_empty(),
+                reports,
+                reports.union(_reports_within(reports, depth - 1)),
+            )
+        )
+    )
+
+
+def fetch_ancestors(next_ids):
+    """Query for the manager chains of several users as a list of
+    {"next_id", "ancestors"} documents, using the precomputed chain where
+    there is one and walking the users table otherwise."""
+    return r.expr(next_ids).map(
+        lambda next_id: {
+            "next_id": next_id,
+            "ancestors": r.table("org_hierarchy")
+            .get(next_id)
+            .do(
+                lambda doc: r.branch(
+                    # pylint: disable=singleton-comparison
+                    (doc == None),  # noqa
+                    manager_chain(next_id),
+                    doc["ancestors"],
+                )
+            ),
+        }
+    )
+
+
+async def fetch_manager_chains(conn, next_ids):
+    """Get the manager chains of several users in one round trip.
+
+    Args:
+        conn:
+            obj: RethinkDB connection
+        next_ids:
+            list: next_ids of the users
+    Returns:
+        dict: next_id -> list of the next_ids of the user's managers
+    """
+    next_ids = list(set(next_ids))
+    if not next_ids:
+        return {}
+    try:
+        rows = await fetch_ancestors(next_ids).run(conn)
+    except ReqlOpFailedError as err:
+        # Databases set up before the org_hierarchy table existed
+        LOGGER.warning("Falling back to walking manager chains: %s", err)
+        chains = {}
+        for next_id in next_ids:
+            chains[next_id] = await manager_chain(next_id).run(conn)
+        return chains
+    return {row["next_id"]: row["ancestors"] for row in rows}
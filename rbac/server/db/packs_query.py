@@ -24,6 +24,7 @@ from rbac.server.db.relationships_query import (
     fetch_relationships_by_id,
     fetch_relationships,
 )
+from rbac.server.db.table_counts_query import adjust_table_count
 
 LOGGER = get_default_logger(__name__)
 
@@ -64,6 +65,7 @@ async def create_pack_resource(conn, pack_id, owners, name, description):
         .insert({"pack_id": pack_id, "identifiers": owners})
         .run(conn),
     )
+    await adjust_table_count("packs", resource[0]["inserted"]).run(conn)
     return resource
 
 
@@ -184,7 +186,7 @@ async def delete_pack_owner_by_next_id(conn, next_id):
     """Delete pack owner using next_id"""
     return (
         await r.table("pack_owners")
-        .filter(lambda doc: doc["identifiers"].contains(next_id))
+        .get_all(next_id, index="identifiers")
         .delete()
         .run(conn)
     )
@@ -199,13 +201,17 @@ async def delete_pack_by_id(conn, pack_id):
             str: ID of pack to be deleted
     """
     resource = (
-        await r.table("packs").filter({"pack_id": pack_id}).delete().run(conn),
-        await r.table("pack_owners").filter({"pack_id": pack_id}).delete().run(conn),
+        await r.table("packs").get_all(pack_id, index="pack_id").delete().run(conn),
+        await r.table("pack_owners")
+        .get_all(pack_id, index="pack_id")
+        .delete()
+        .run(conn),
         await r.table("role_packs")
-        .filter({"identifiers": [pack_id]})
+        .get_all(pack_id, index="identifiers")
         .delete()
         .run(conn),
     )
+    await adjust_table_count("packs", -resource[0]["deleted"]).run(conn)
     return resource
 
 
@@ -218,7 +224,10 @@ async def get_pack_by_pack_id(conn, pack_id):
             str: ID of pack to be queried
     """
     pack = (
-        await r.table("packs").filter({"pack_id": pack_id}).coerce_to("array").run(conn)
+        await r.table("packs")
+        .get_all(pack_id, index="pack_id")
+        .coerce_to("array")
+        .run(conn)
     )
     return pack
 
@@ -18,9 +18,28 @@ import rethinkdb as r
 
 from rbac.common.logs import get_default_logger
 from rbac.server.api.errors import ApiNotFound
+from rbac.server.db.org_hierarchy_query import reports_below
 
 LOGGER = get_default_logger(__name__)
 
+# The relationship table whose members (and their managers) approve each
+# proposal type; NextAdmins approve user manager proposals
+APPROVER_TABLES = {
+    "ADD_ROLE_TASK": "task_owners",
+    "ADD_ROLE_MEMBER": "role_owners",
+    "ADD_ROLE_OWNER": "role_owners",
+    "ADD_ROLE_ADMIN": "role_owners",
+    "REMOVE_ROLE_TASK": "task_owners",
+    "REMOVE_ROLE_MEMBER": "role_owners",
+    "REMOVE_ROLE_OWNER": "role_owners",
+    "REMOVE_ROLE_ADMIN": "role_owners",
+    "ADD_TASK_OWNER": "task_admins",
+    "ADD_TASK_ADMIN": "task_admins",
+    "REMOVE_TASK_OWNER": "task_admins",
+    "REMOVE_TASK_ADMIN": "task_admins",
+    "UPDATE_USER_MANAGER": "users",
+}
+
 
 async def fetch_all_proposal_resources(conn, start, limit):
     """Get all proposal resources."""
@@ -95,6 +114,21 @@ async def fetch_proposal_resource(conn, proposal_id):
         )
 
 
+async def fetch_proposal_resources_by_ids(conn, proposal_ids):
+    """Get the resources of several proposals with one query, by proposal
+    id. Proposals that do not exist are left out."""
+    if not proposal_ids:
+        return {}
+    resources = (
+        await format_proposal_resources(
+            r.table("proposals").get_all(*proposal_ids, index="proposal_id")
+        )
+        .coerce_to("array")
+        .run(conn)
+    )
+    return {resource["id"]: resource for resource in resources}
+
+
 async def subscribe_to_proposals(conn):
     """Returns a RethinkDB changefeed of changes to proposals."""
     return (
@@ -184,7 +218,8 @@ def fetch_open_proposals_by_opener(next_id):
     """
     resource = (
         r.table("proposals")
-        .filter({"opener": next_id, "status": "OPEN"})
+        .get_all(next_id, index="opener")
+        .filter({"status": "OPEN"})
         .coerce_to("array")
     )
 
@@ -199,7 +234,7 @@ def fetch_open_proposals_by_role(conn, role_id):
     """
     resource = (
         r.table("proposals")
-        .filter({"object_id": role_id, "status": "OPEN"})
+        .get_all([role_id, "OPEN"], index="object_status")
         .coerce_to("array")
         .run(conn)
     )
@@ -215,8 +250,172 @@ def get_open_proposals_by_approver(next_id):
     """
     resource = (
         r.table("proposals")
-        .filter({"assigned_approver": [next_id], "status": "OPEN"})
+        .between(
+            [next_id, "OPEN", r.minval],
+            [next_id, "OPEN", r.maxval],
+            index="assigned_approver_status",
+        )
+        .filter({"assigned_approver": [next_id]})
         .coerce_to("array")
     )
 
     return resource
+
+
+def format_proposal_resources(proposals):
+    """Query to shape proposal documents into API proposal resources."""
+    return (
+        proposals.map(
+            lambda proposal: proposal.merge(
+                {
+                    "id": proposal["proposal_id"],
+                    "type": proposal["proposal_type"],
+                    "object": proposal["object_id"],
+                    "target": proposal["related_id"],
+                }
+            )
+        )
+        .map(
+            lambda proposal: (proposal["metadata"] == "").branch(
+                proposal.without("metadata"), proposal
+            )
+        )
+        .without(
+            "start_block_num",
+            "end_block_num",
+            "proposal_id",
+            "proposal_type",
+            "object_id",
+            "related_id",
+        )
+    )
+
+
+async def fetch_proposal_resources_by_assigned_approver(
+    conn, next_id, status, start, limit
+):
+    """Get a page of the proposals with a given status that are assigned to
+    a user, and the total number of such proposals.
+
+    Args:
+        conn:
+            obj: a connection to rethinkdb
+        next_id:
+            str: a user's next ID
+        status:
+            str: OPEN, CONFIRMED or REJECTED
+        start:
+            int: paging start
+        limit:
+            int: paging limit
+    Returns:
+        dict: {"total": int, "data": [proposal resources]}
+    """
+    proposals = (
+        r.table("proposals")
+        .between(
+            [next_id, status, r.minval],
+            [next_id, status, r.maxval],
+            index="assigned_approver_status",
+        )
+        .order_by(index="assigned_approver_status")
+    )
+    return await r.expr(
+        {
+            "total": proposals.count(),
+            "data": format_proposal_resources(
+                proposals.slice(start, start + limit)
+            ).coerce_to("array"),
+        }
+    ).run(conn)
+
+
+def _approver_proposals(next_id, status):
+    """Query for the proposals with a given status that a user may approve:
+    those on objects owned (or administered) by the user or by anyone
+    below the user in the org hierarchy, and, for NextAdmins members,
+    user manager proposals."""
+    people = r.expr([next_id]).union(reports_below(next_id))
+    proposals = []
+    for table in sorted(set(APPROVER_TABLES.values()) - {"users"}):
+        types = [kind for kind, name in APPROVER_TABLES.items() if name == table]
+        index = "role_id" if "role" in table else "task_id"
+        object_keys = (
+            r.table(table)
+            .get_all(r.args(people), index="identifiers")
+            .get_field(index)
+            .distinct()
+            .map(lambda object_id: [object_id, status])
+        )
+        proposals.append(
+            r.table("proposals")
+            .get_all(r.args(object_keys), index="object_status")
+            .filter(lambda proposal: r.expr(types).contains(proposal["proposal_type"]))
+            .coerce_to("array")
+        )
+    is_next_admin = (
+        r.table("roles")
+        .get_all("NextAdmins", index="name")
+        .get_field("role_id")
+        .coerce_to("array")
+        .do(
+            lambda role_ids: r.table("role_members")
+            .get_all(
+                r.args(role_ids.map(lambda role_id: [role_id, next_id])),
+                index="role_related",
+            )
+            .is_empty()
+            .not_()
+        )
+    )
+    proposals.append(
+        r.branch(
+            is_next_admin,
+            r.table("proposals")
+            .get_all(["UPDATE_USER_MANAGER", status], index="type_status")
+            .coerce_to("array"),
+            [],
+        )
+    )
+    return r.expr(proposals).concat_map(lambda sequence: sequence)
+
+
+async def fetch_proposal_resources_by_approver(conn, next_id, status, start, limit):
+    """Get a page of the proposals with a given status that a user is (or
+    was) entitled to approve, and the total number of such proposals.
+
+    The page is not read on its own: every proposal with the status on the
+    objects of the user and those below the user, and for NextAdmins members
+    every user manager proposal with the status, is read, de-duplicated and
+    sorted in rethinkdb before the page is sliced and formatted. The cost
+    grows with that history, not with the page size; only the formatting
+    is limited to the page.
+
+    Args:
+        conn:
+            obj: a connection to rethinkdb
+        next_id:
+            str: a user's next ID
+        status:
+            str: OPEN, CONFIRMED or REJECTED
+        start:
+            int: paging start
+        limit:
+            int: paging limit
+    Returns:
+        dict: {"total": int, "data": [proposal resources]}
+    """
+    return await (
+        _approver_proposals(next_id, status)
+        .distinct()
+        .order_by("proposal_id")
+        .do(
+            lambda proposals: {
+                "total": proposals.count(),
+                "data": format_proposal_resources(
+                    proposals.slice(start, start + limit)
+                ),
+            }
+        )
+        .run(conn)
+    )
@@ -32,6 +32,17 @@ def fetch_relationships(table, index, identifier):
     )
 
 
+def fetch_relationships_of(table, index, identifiers):
+    """Query for the relationships of several objects at once, as a list of
+    {index: identifier, "identifiers": [...]} documents, one per row."""
+    return (
+        r.table(table)
+        .get_all(r.args(identifiers), index=index)
+        .pluck(index, "identifiers")
+        .coerce_to("array")
+    )
+
+
 def fetch_remote_id_relationships(table, index, identifier):
     """"Returns a query to fetch a role's relationships. The
     fetched data will return a list of remote_ids.
@@ -93,7 +104,7 @@ def fetch_relationship_query(relationship, role_id):
     relationship_table = "role_" + relationship
     return (
         r.table(relationship_table)
-        .filter({"role_id": role_id})
+        .get_all(role_id, index="role_id")
         .get_field("related_id")
         .coerce_to("array")
     )
@@ -87,7 +87,7 @@ async def does_role_exist(conn, role_id):
         bool:
             False: if the tole was not found in rethink.
     """
-    role = await r.table("roles").filter({"role_id": role_id}).count().run(conn)
+    role = await r.table("roles").get_all(role_id, index="role_id").count().run(conn)
     return bool(role > 0)
 
 
@@ -105,7 +105,7 @@ async def fetch_role_owners(conn, role_id):
     """
     role_owners = (
         await r.table("role_owners")
-        .filter({"role_id": role_id})
+        .get_all(role_id, index="role_id")
         .get_field("related_id")
         .coerce_to("array")
         .run(conn)
@@ -149,7 +149,9 @@ async def get_role_by_name(conn, name):
         name:
             str: name of role
     """
-    return await r.table("roles").filter({"name": name}).coerce_to("array").run(conn)
+    return (
+        await r.table("roles").get_all(name, index="name").coerce_to("array").run(conn)
+    )
 
 
 async def get_role_membership(conn, next_id, role_id):
@@ -164,7 +166,7 @@ async def get_role_membership(conn, next_id, role_id):
     """
     return (
         await r.table("role_members")
-        .filter({"role_id": role_id, "related_id": next_id})
+        .get_all([role_id, next_id], index="role_related")
         .coerce_to("array")
         .run(conn)
     )
@@ -185,10 +187,8 @@ def fetch_expired_roles(next_id):
     """Fetch expired role memberships of given user"""
     return (
         r.table("role_members")
-        .filter(
-            lambda doc: (doc["identifiers"].contains(next_id))
-            & (doc["expiration_date"] <= r.now())
-        )
+        .get_all(next_id, index="related_id")
+        .filter(lambda doc: doc["expiration_date"] <= r.now())
         .get_field("role_id")
         .coerce_to("array")
     )
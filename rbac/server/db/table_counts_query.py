@@ -0,0 +1,115 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Queries for the table_counts paging total cache.
+
+Ledger sync keeps one document per paged table holding the row count and the
+block_num it was last brought up to date at. Paged API responses read the
+total from that document instead of counting the table on every request.
+"""
+
+import rethinkdb as r
+from rethinkdb import ReqlOpFailedError
+
+from rbac.common.logs import get_default_logger
+
+LOGGER = get_default_logger(__name__)
+
+PAGED_TABLES = ("blocks", "packs", "proposals", "roles", "tasks", "users")
+
+
+def update_table_counts(block_num, deltas):
+    """Query to apply one block's row count deltas and advance every paged
+    table's cached count to block_num. Missing (or invalidated) counts are
+    seeded with an exact count.
+
+    Args:
+        block_num:
+            int: the block the deltas were applied at
+        deltas:
+            dict: table name -> change in row count for this block
+    """
+    deltas = r.expr(deltas)
+    return r.expr(PAGED_TABLES).for_each(
+        lambda table: r.table("table_counts")
+        .get(table)
+        .replace(
+            lambda doc: r.branch(
+                # pylint: disable=singleton-comparison
+                (doc == None),  # noqa
+                {"table": table, "count": r.table(table).count(), "block_num": block_num},
+                doc.merge(
+                    {
+                        "count": doc["count"] + deltas[table].default(0),
+                        "block_num": block_num,
+                    }
+                ),
+            ),
+            non_atomic=True,
+        )
+    )
+
+
+def adjust_table_count(table, delta):
+    """Query to adjust a cached count for rows written outside ledger sync
+    (e.g. packs, which the API server creates directly)."""
+    return (
+        r.table("table_counts")
+        .get(table)
+        .update({"count": r.row["count"] + delta})
+    )
+
+
+def invalidate_table_counts():
+    """Query to drop every cached count, e.g. after a fork is resolved."""
+    return r.table("table_counts").delete()
+
+
+def count_table(table, head_block_num):
+    """Query for the exact number of rows in a paged table at a head block."""
+    if table == "blocks":
+        return (
+            r.table(table)
+            .between(r.minval, head_block_num, right_bound="closed")
+            .count()
+        )
+    return r.table(table).count()
+
+
+def is_count_fresh(cached, table, head_block_num):
+    """True if a cached count document can answer for head_block_num.
+
+    The block count depends on the head block, so it must match exactly.
+    Other tables are not versioned by block, so any count at least as new
+    as the head block is good.
+    """
+    if not cached or head_block_num is None:
+        return False
+    if table == "blocks":
+        return cached["block_num"] == head_block_num
+    return cached["block_num"] >= head_block_num
+
+
+async def fetch_table_count(conn, table, head_block_num):
+    """Get the number of rows in a paged table, from the cache when it is
+    fresh for head_block_num and with an exact count otherwise."""
+    if table in PAGED_TABLES:
+        try:
+            cached = await r.table("table_counts").get(table).run(conn)
+        except ReqlOpFailedError:
+            cached = None
+        if is_count_fresh(cached, table, head_block_num):
+            return cached["count"]
+        LOGGER.debug("Stale count cache for %s at block %s", table, head_block_num)
+    return await count_table(table, head_block_num).run(conn)
@@ -84,7 +84,7 @@ async def delete_user_resource(conn, next_id):
     """Database query to delete an individual user."""
     resource = (
         await r.table("users")
-        .filter({"next_id": next_id})
+        .get_all(next_id, index="next_id")
         .delete(return_changes=True)
         .run(conn)
     )
@@ -98,7 +98,7 @@ async def fetch_user_resource_summary(conn, next_id):
     """Database query to get summary data on an individual user."""
     resource = (
         await r.table("users")
-        .filter(lambda user: (user["next_id"] == next_id))
+        .get_all(next_id, index="next_id")
         .merge({"id": r.row["next_id"], "name": r.row["name"], "email": r.row["email"]})
         .without("next_id", "manager_id", "start_block_num", "end_block_num")
         .coerce_to("array")
@@ -160,7 +160,7 @@ def fetch_user_ids_by_manager(next_id):
     if next_id != "":
         direct_reports = (
             r.table("users")
-            .filter(lambda user: (next_id == user["manager_id"]))
+            .get_all(next_id, index="manager_id")
             .get_field("next_id")
             .coerce_to("array")
         )
@@ -170,9 +170,8 @@ def fetch_user_ids_by_manager(next_id):
 async def fetch_peers(conn, next_id):
     """Fetch a user's peers."""
     user_object = await (
-        r.db("rbac")
-        .table("users")
-        .filter({"next_id": next_id})
+        r.table("users")
+        .get_all(next_id, index="next_id")
         .coerce_to("array")
         .run(conn)
     )
@@ -181,9 +180,8 @@ async def fetch_peers(conn, next_id):
             if user_object[0]["manager_id"]:
                 manager_id = user_object[0]["manager_id"]
                 peers = await (
-                    r.db("rbac")
-                    .table("users")
-                    .filter({"manager_id": manager_id})
+                    r.table("users")
+                    .get_all(manager_id, index="manager_id")
                     .coerce_to("array")
                     .run(conn)
                 )
@@ -200,9 +198,8 @@ async def fetch_manager_chain(conn, next_id):
     manager_chain = []
     for _ in range(5):
         user_object = await (
-            r.db("rbac")
-            .table("users")
-            .filter({"next_id": next_id})
+            r.table("users")
+            .get_all(next_id, index="next_id")
             .coerce_to("array")
             .run(conn)
         )
@@ -210,12 +207,9 @@ async def fetch_manager_chain(conn, next_id):
             manager_id = user_object[0]["manager_id"]
             if manager_id != "":
                 manager_object = await (
-                    r.db("rbac")
-                    .table("users")
-                    .filter(
-                        (r.row["remote_id"] == manager_id)
-                        | (r.row["next_id"] == manager_id)
-                    )
+                    r.table("users")
+                    .get_all(manager_id, index="remote_id")
+                    .union(r.table("users").get_all(manager_id, index="next_id"))
                     .coerce_to("array")
                     .run(conn)
                 )
@@ -284,7 +278,7 @@ async def create_user_map_entry(conn, data):
 
 async def delete_user_mapping_by_next_id(conn, next_id):
     """Delete user_mapping from user_mapping table."""
-    return await r.table("user_mapping").filter({"next_id": next_id}).delete().run(conn)
+    return await r.table("user_mapping").get(next_id).delete().run(conn)
 
 
 async def delete_metadata_by_next_id(conn, next_id):
@@ -390,7 +384,7 @@ async def update_user_password(conn, next_id, hashed_password, salt):
     """
     resource = (
         await r.table("auth")
-        .filter({"next_id": next_id})
+        .get(next_id)
         .update({"hashed_password": hashed_password, "salt": salt})
         .coerce_to("array")
         .run(conn)
@@ -410,14 +404,14 @@ async def get_next_admins(conn):
     """
     next_admins_role_id = (
         await r.table("roles")
-        .filter({"name": "NextAdmins"})
+        .get_all("NextAdmins", index="name")
         .coerce_to("array")
         .get_field("role_id")
         .run(conn)
     )
     return (
         await r.table("role_members")
-        .filter({"role_id": next_admins_role_id[0]})
+        .get_all(next_admins_role_id[0], index="role_id")
         .get_field("related_id")
         .coerce_to("array")
         .run(conn)
@@ -51,7 +51,7 @@ def connect_to_db(max_attempts=500):
             try:
                 tables_status = r.db("rbac").wait().coerce_to("object").run(conn)
                 ready_tables_count = tables_status["ready"]
-                if ready_tables_count == 25:
+                if ready_tables_count == 27:
                     tables_initialized = True
             except r.ReqlOpFailedError:
                 LOGGER.debug(
@@ -0,0 +1,79 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Micro-benchmark of addresser dispatch against a linear pattern scan
+
+Run with: python -m tests.benchmarks.addresser_bench
+"""
+import pytest
+
+from rbac.common import addresser
+from rbac.common.addresser.addressers import ADDRESSERS
+from tests.benchmarks.timing import best_of, report
+
+
+def linear_get_address_type(address):
+    """The address type lookup as it was before the dispatch table:
+    try each registered addresser's pattern in turn"""
+    for _, registered in ADDRESSERS.items():
+        result = registered.get_address_type(address=address)
+        if result:
+            return result
+    raise ValueError("no addresser found for address {}".format(address))
+
+
+def sample_addresses():
+    """One address of every registered address type"""
+    return [
+        registered.address(
+            object_id=registered.unique_id(), related_id=registered.unique_id()
+        )
+        for registered in ADDRESSERS.values()
+    ]
+
+
+def lookup_all(lookup, addresses, **kwargs):
+    """Look up the address type of every address"""
+    for address in addresses:
+        lookup(address, **kwargs)
+
+
+def run_benchmark(number=200):
+    """Time the lookup of every address type; returns the speedups of the
+    validated and unvalidated dispatch over the linear scan"""
+    addresses = sample_addresses()
+    linear = best_of(lambda: lookup_all(linear_get_address_type, addresses), number)
+    validated = best_of(
+        lambda: lookup_all(addresser.get_address_type, addresses), number
+    )
+    unvalidated = best_of(
+        lambda: lookup_all(addresser.get_address_type, addresses, validate=False),
+        number,
+    )
+    return (
+        report("get_address_type (validate)", linear, validated),
+        report("get_address_type (no validate)", linear, unvalidated),
+    )
+
+
+@pytest.mark.benchmark
+def test_dispatch_faster_than_linear_scan():
+    """Dispatch must beat the linear scan over all registered addressers"""
+    validated, unvalidated = run_benchmark(number=50)
+    assert validated > 1
+    assert unvalidated > 1
+
+
+if __name__ == "__main__":
+    print("speedup (validate, no validate): {:.1f}x, {:.1f}x".format(*run_benchmark()))
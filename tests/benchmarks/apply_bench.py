@@ -0,0 +1,67 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Benchmark of BaseMessage.apply with and without the per class caches of
+the reflective protobuf lookups in StateBase and BaseMessage
+
+Run with: python -m tests.benchmarks.apply_bench
+"""
+import pytest
+
+from rbac.common.user import User
+from rbac.common.base.base_state import clear_per_class_caches
+from rbac.common.crypto.hash import unique_id
+from rbac.common.crypto.keys import Key
+from tests.benchmarks.state_context import Header, InMemoryContext
+from tests.benchmarks.timing import best_of, report
+
+
+def create_user_transaction():
+    """A CREATE_USER payload, its header and the message handler"""
+    keypair = Key()
+    handler = User()
+    message = handler.make(
+        next_id=unique_id(), name="Benchmark User", key=keypair.public_key
+    )
+    payload = handler.make_payload(
+        message=message, signer_user_id=message.next_id, signer_keypair=keypair
+    )
+    return handler, Header(keypair.public_key), payload
+
+
+def run_benchmark(number=500):
+    """Time apply() on an empty state; returns the speedup of the warm
+    per class caches over resolving every lookup on each call"""
+    handler, header, payload = create_user_transaction()
+
+    def apply():
+        handler.apply(header=header, payload=payload, context=InMemoryContext())
+
+    def apply_uncached():
+        clear_per_class_caches()
+        apply()
+
+    uncached = best_of(apply_uncached, number)
+    cached = best_of(apply, number)
+    return report("apply CREATE_USER", uncached, cached)
+
+
+@pytest.mark.benchmark
+def test_cached_lookups_speed_up_apply():
+    """apply() with warm caches must beat resolving the lookups every call"""
+    assert run_benchmark(number=100) > 1
+
+
+if __name__ == "__main__":
+    print("speedup: {:.1f}x".format(run_benchmark()))
@@ -0,0 +1,81 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Micro-benchmark of per-request token checks with and without the cache
+
+The auth table lookup is replaced by a coroutine that sleeps for
+DB_LATENCY, standing in for a round trip to RethinkDB.
+
+Run with: python -m tests.benchmarks.auth_bench
+"""
+import asyncio
+from unittest import mock
+
+import pytest
+
+from rbac.common.crypto.secrets import deserialize_api_key, generate_api_key
+from rbac.server.api import token_cache
+from rbac.server.api.token_cache import TokenCache
+from tests.benchmarks.timing import best_of, report
+
+SECRET_KEY = "ABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890"
+DB_LATENCY = 0.0005
+
+
+async def get_auth_by_next_id(next_id):
+    """A stand-in auth lookup with a fixed round trip time"""
+    await asyncio.sleep(DB_LATENCY)
+    return {"next_id": next_id}
+
+
+async def uncached_check(token):
+    """The token check as it was before the cache"""
+    id_dict = deserialize_api_key(SECRET_KEY, token)
+    await get_auth_by_next_id(id_dict.get("id"))
+
+
+async def cached_check(token):
+    """The token check through the warm cache"""
+    await token_cache.verify_token(SECRET_KEY, token)
+
+
+def run_benchmark(number=200):
+    """Time one authenticated request's token check; returns the speedup of
+    the warm cache over verifying and looking up every time"""
+    token = generate_api_key(SECRET_KEY, "bench")
+    loop = asyncio.new_event_loop()
+    try:
+        with mock.patch.object(token_cache, "TOKEN_CACHE", TokenCache()), mock.patch(
+            "rbac.server.api.token_cache.get_auth_by_next_id", get_auth_by_next_id
+        ):
+            loop.run_until_complete(cached_check(token))
+            uncached = best_of(
+                lambda: loop.run_until_complete(uncached_check(token)), number
+            )
+            cached = best_of(
+                lambda: loop.run_until_complete(cached_check(token)), number
+            )
+    finally:
+        loop.close()
+    return report("authorized token check", uncached, cached)
+
+
+@pytest.mark.benchmark
+def test_warm_cache_faster_than_verify_and_lookup():
+    """A warm token must be checked faster than a verify and lookup"""
+    assert run_benchmark(number=20) > 1
+
+
+if __name__ == "__main__":
+    print("speedup: {:.1f}x".format(run_benchmark()))
@@ -0,0 +1,173 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Benchmark of building the transactions that delete a user with 5000
+role memberships, serially on the event loop as before, and with one
+relationship query and the signing pool
+
+Run with: python -m tests.benchmarks.delete_cascade_bench
+"""
+import asyncio
+import time
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+
+from rbac.common.crypto.keys import Key
+from rbac.common.role.delete_role_member import DeleteRoleMember
+from rbac.common.sawtooth import batcher
+from rbac.server.blockchain_transactions import role_transaction
+from tests.benchmarks.timing import LOGGER
+
+# Round trip time of the stand-in database
+QUERY_LATENCY = 0.002
+
+
+class FakeConnection:
+    """Stands in for a RethinkDB connection."""
+
+    def close(self):
+        """Nothing to close."""
+
+
+class FakeQuery:
+    """Stands in for a query, answering after QUERY_LATENCY."""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def run(self, conn):  # pylint: disable=unused-argument
+        """Return the canned result."""
+        await asyncio.sleep(QUERY_LATENCY)
+        return self.result
+
+
+async def create_connection():
+    """Stands in for db_utils.create_connection."""
+    return FakeConnection()
+
+
+async def serial_delete_txns(key_pair, next_id, relationships):
+    """The user deletion cascade as it was: a query per relationship table,
+    then every transaction built one at a time on the event loop"""
+    txn_list = []
+    for table in ("role_owners", "role_admins", "role_members"):
+        rows = await FakeQuery(relationships[table]).run(None)
+        delete = DeleteRoleMember()
+        for row in rows:
+            message = delete.make(
+                signer_keypair=key_pair, related_id=next_id, role_id=row["role_id"]
+            )
+            payload = delete.make_payload(
+                message=message,
+                signer_keypair=key_pair,
+                signer_user_id=key_pair.public_key,
+            )
+            txn_list.append(
+                batcher.make_transaction(payload=payload, signer_keypair=key_pair)
+            )
+    return txn_list
+
+
+async def pooled_delete_txns(key_pair, next_id, relationships):
+    """The user deletion cascade with one query and the signing pool"""
+    with mock.patch.object(
+        role_transaction, "create_connection", create_connection
+    ), mock.patch.object(
+        role_transaction,
+        "fetch_relationship_rows",
+        lambda index, identifier: FakeQuery(relationships),
+    ):
+        return await role_transaction.create_del_relationship_txns(
+            key_pair, "related_id", next_id, []
+        )
+
+
+async def timed(build):
+    """Run build, returning its wall time and the longest time the event
+    loop was kept from running anything else"""
+    stalls = []
+
+    async def ticker():
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.monotonic()
+            stalls.append(now - last)
+            last = now
+
+    tick = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    start = time.monotonic()
+    transactions = await build()
+    elapsed = time.monotonic() - start
+    # Let the ticker see the end of any stall before stopping it
+    await asyncio.sleep(0.01)
+    tick.cancel()
+    return elapsed, max(stalls or [elapsed]), len(transactions)
+
+
+def run_benchmark(memberships=5000):
+    """Time building the deletion of a user with the given number of role
+    memberships; returns (serial, pooled) (wall time, longest stall) pairs"""
+    key_pair = Key()
+    next_id = str(uuid4())
+    relationships = {
+        "role_owners": [],
+        "role_admins": [],
+        "role_members": [
+            {"role_id": str(uuid4()), "related_id": next_id}
+            for _ in range(memberships)
+        ],
+    }
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        serial = loop.run_until_complete(
+            timed(lambda: serial_delete_txns(key_pair, next_id, relationships))
+        )
+        pooled = loop.run_until_complete(
+            timed(lambda: pooled_delete_txns(key_pair, next_id, relationships))
+        )
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+    assert serial[2] == pooled[2] == memberships
+    for name, (elapsed, stall, _) in (("serial", serial), ("pooled", pooled)):
+        LOGGER.info(
+            "delete user with %s memberships, %s: %.2fs, longest stall %.3fs",
+            memberships,
+            name,
+            elapsed,
+            stall,
+        )
+    return serial[:2], pooled[:2]
+
+
+@pytest.mark.benchmark
+def test_pooled_cascade_keeps_event_loop_free():
+    """Building a large deletion cascade must not stall the event loop the
+    way building it serially does"""
+    serial, pooled = run_benchmark(memberships=1000)
+    assert pooled[1] < serial[1]
+
+
+if __name__ == "__main__":
+    SERIAL, POOLED = run_benchmark()
+    print(
+        "serial: {:.2f}s (stall {:.3f}s), pooled: {:.2f}s (stall {:.3f}s)".format(
+            SERIAL[0], SERIAL[1], POOLED[0], POOLED[1]
+        )
+    )
@@ -0,0 +1,108 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Benchmark of inbound user imports with key pairs generated inline, and
+taken from a key pool filled by a worker process
+
+Each synthetic user goes through add_transaction, which builds and signs its
+import batch; the user_mapping lookup is stubbed out so no database is needed.
+
+Run with: python -m tests.benchmarks.key_pool_bench
+"""
+import time
+from unittest import mock
+
+import pytest
+
+from rbac.common.crypto.secrets import generate_aes_key
+from rbac.ledger_sync.inbound import rbac_transactions
+from rbac.ledger_sync.inbound.key_pool import KeyPool
+from tests.benchmarks.timing import LOGGER
+
+
+def user_record(index):
+    """An inbound_queue record of a new user."""
+    return {
+        "data_type": "user",
+        "provider_id": "example.com",
+        "data": {
+            "remote_id": "CN=user{},OU=Users,DC=example,DC=com".format(index),
+            "name": "User {}".format(index),
+            "username": "user{}".format(index),
+            "email": "user{}@example.com".format(index),
+        },
+    }
+
+
+def timed_imports(users, pool_size):
+    """Time add_transaction over the given number of new users; returns the
+    wall time and the pool's counts of pooled and inline key pairs"""
+    pool = KeyPool(size=pool_size, aes_key=generate_aes_key())
+    pool.start()
+    try:
+        if pool_size:
+            # Let the pool fill, as it does while the listener starts up
+            deadline = time.monotonic() + 30
+            # pylint: disable=protected-access
+            while pool._chunks.qsize() < pool_size // pool.chunk_size:
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.1)
+        records = [user_record(index) for index in range(users)]
+        with mock.patch.object(
+            rbac_transactions, "KEY_POOL", pool
+        ), mock.patch.object(rbac_transactions, "get_next_object", return_value=[]):
+            start = time.perf_counter()
+            for record in records:
+                rbac_transactions.add_transaction(record)
+            elapsed = time.perf_counter() - start
+        assert all(record.get("batch") for record in records)
+        return elapsed, pool.stats()
+    finally:
+        pool.close()
+
+
+def run_benchmark(users, pool_size=1000):
+    """Time imports of the given number of users without and with a key
+    pool; returns the (inline, pooled) throughputs in users per second"""
+    results = []
+    for name, size in (("inline", 0), ("pooled", pool_size)):
+        elapsed, stats = timed_imports(users, size)
+        LOGGER.info(
+            "%s user imports, %s keys: %.2fs, %.0f users/sec, %s",
+            users,
+            name,
+            elapsed,
+            users / elapsed,
+            stats,
+        )
+        results.append(users / elapsed)
+    return tuple(results)
+
+
+@pytest.mark.benchmark
+def test_key_pool_serves_imports():
+    """Every import gets a key pair, from the pool or inline; throughput is
+    compared only when run as a module, as wall times vary from run to run"""
+    _, stats = timed_imports(users=500, pool_size=1000)
+    assert stats["pooled"] + stats["inline"] == 500
+
+
+if __name__ == "__main__":
+    INLINE, POOLED = run_benchmark(users=50000)
+    print(
+        "50000 users, inline: {:.0f} users/sec, pooled: {:.0f} users/sec".format(
+            INLINE, POOLED
+        )
+    )
@@ -0,0 +1,215 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Benchmark of LDAP delta sync deletion detection, removing each user found
+in LDAP from a list of known users as before, and with sets
+
+Pages of the directory are read from an ldap3 MOCK_SYNC directory up to
+MOCK_DIRECTORY_LIMIT users. Larger directories do not fit in memory with the
+mock strategy, so their pages are synthesized on the fly instead.
+
+Run with: python -m tests.benchmarks.ldap_deletions_bench
+"""
+import random
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import ldap3
+import pytest
+
+from rbac.providers.ldap import delta_inbound_sync
+from tests.benchmarks.timing import LOGGER
+from tests.unit.providers.ldap.fakes import DeltaSyncRethink
+
+USER_BASE_DN = "OU=Users,DC=example,DC=com"
+PAGE_SIZE = 500
+MOCK_DIRECTORY_LIMIT = 100000
+# Share of known users deleted from LDAP
+DELETED_SHARE = 0.01
+PAGED_RESULTS = "1.2.840.113556.1.4.319"
+
+
+def user_dn(index):
+    """The distinguished name of a synthetic user."""
+    return "CN=user{},{}".format(index, USER_BASE_DN)
+
+
+def mock_directory_pages(users):
+    """Pages of user entries read from an ldap3 MOCK_SYNC directory."""
+    server = ldap3.Server("fake_server", get_info=None)
+    connection = ldap3.Connection(
+        server, user="CN=admin", password="password", client_strategy=ldap3.MOCK_SYNC
+    )
+    connection.strategy.add_entry("CN=admin", {"userPassword": "password"})
+    for index in range(users):
+        dn = user_dn(index)
+        connection.strategy.add_entry(
+            dn, {"objectClass": "person", "distinguishedName": dn}
+        )
+    connection.bind()
+    search_parameters = {
+        "search_base": USER_BASE_DN,
+        "search_filter": "(objectClass=person)",
+        "attributes": ["distinguishedName"],
+        "paged_size": PAGE_SIZE,
+    }
+    pages = []
+    while True:
+        connection.search(**search_parameters)
+        pages.append(list(connection.entries))
+        cookie = connection.result["controls"][PAGED_RESULTS]["value"]["cookie"]
+        if not cookie:
+            return pages
+        search_parameters["paged_cookie"] = cookie
+
+
+def synthetic_pages(users):
+    """Pages of stand-ins for ldap3 entries, built as they are read."""
+    for start in range(0, users, PAGE_SIZE):
+        yield [
+            SimpleNamespace(distinguishedName=SimpleNamespace(value=user_dn(index)))
+            for index in range(start, min(start + PAGE_SIZE, users))
+        ]
+
+
+class ReplayConnection:
+    """Stands in for an LDAP connection, serving pre-read pages of users to
+    user searches and nothing to group searches."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.remaining = None
+        self.entries = []
+        self.result = None
+
+    def search(self, search_filter, paged_cookie=None, **kwargs):
+        # pylint: disable=unused-argument
+        """Serve the next page."""
+        if search_filter != "(objectClass=person)":
+            self.entries = []
+        else:
+            if paged_cookie is None:
+                self.remaining = iter(self.pages)
+            self.entries = next(self.remaining, [])
+        cookie = b"more" if self.entries else b""
+        self.result = {"controls": {PAGED_RESULTS: {"value": {"cookie": cookie}}}}
+
+
+def fetch_ldap_deletions_with_lists():
+    """Deletion detection as it was, for users only: every user found in
+    LDAP is removed from a list of the known users, and each remaining user
+    is inserted on its own."""
+    conn = delta_inbound_sync.connect_to_db()
+    existing_records = list(
+        delta_inbound_sync.r.table("user_mapping")
+        .filter({"provider_id": delta_inbound_sync.LDAP_DC})
+        .get_field("remote_id")
+        .run(conn)
+    )
+    ldap_connection = delta_inbound_sync.ldap_connector.await_connection(
+        None, None, None
+    )
+    search_parameters = {
+        "search_base": USER_BASE_DN,
+        "search_filter": "(objectClass=person)",
+        "attributes": ["distinguishedName"],
+        "paged_size": PAGE_SIZE,
+    }
+    while True:
+        ldap_connection.search(**search_parameters)
+        for entry in ldap_connection.entries:
+            if entry.distinguishedName.value in existing_records:
+                existing_records.remove(entry.distinguishedName.value)
+        cookie = ldap_connection.result["controls"][PAGED_RESULTS]["value"]["cookie"]
+        if cookie:
+            search_parameters["paged_cookie"] = cookie
+        else:
+            break
+    for remote_id in existing_records:
+        delta_inbound_sync.r.table("inbound_queue").insert(
+            {"data": {"remote_id": remote_id}, "data_type": "user_deleted"}
+        ).run(conn)
+
+
+def timed_deletions(fetch_ldap_deletions, users):
+    """Time fetch_ldap_deletions over a directory of the given size, in
+    which DELETED_SHARE of the known users no longer exist; returns the wall
+    time and the stand-in database"""
+    if users <= MOCK_DIRECTORY_LIMIT:
+        pages = mock_directory_pages(users)
+    else:
+        pages = synthetic_pages(users)
+    deleted = int(users * DELETED_SHARE)
+    remote_ids = [user_dn(index) for index in range(users + deleted)]
+    # Known users come back from RethinkDB in no particular order
+    random.Random(users).shuffle(remote_ids)
+    rethink = DeltaSyncRethink(remote_ids)
+    with mock.patch.object(delta_inbound_sync, "r", rethink), mock.patch.object(
+        delta_inbound_sync.ldap_connector,
+        "await_connection",
+        return_value=ReplayConnection(pages),
+    ), mock.patch.object(
+        delta_inbound_sync, "connect_to_db"
+    ), mock.patch.multiple(
+        delta_inbound_sync,
+        USER_BASE_DN=USER_BASE_DN,
+        GROUP_BASE_DN=USER_BASE_DN,
+        LDAP_SEARCH_PAGE_SIZE=PAGE_SIZE,
+    ):
+        start = time.perf_counter()
+        fetch_ldap_deletions()
+        elapsed = time.perf_counter() - start
+    assert rethink.inserted() == deleted
+    return elapsed, rethink
+
+
+def run_benchmark(users, with_lists=True):
+    """Time deletion detection over a directory of the given size; returns
+    the (lists, sets) wall times, lists being None if not run"""
+    results = []
+    for name, fetch_ldap_deletions in (
+        ("lists", fetch_ldap_deletions_with_lists if with_lists else None),
+        ("sets", delta_inbound_sync.fetch_ldap_deletions),
+    ):
+        if fetch_ldap_deletions is None:
+            results.append(None)
+            continue
+        elapsed, rethink = timed_deletions(fetch_ldap_deletions, users)
+        LOGGER.info(
+            "deletion detection over %s users, %s: %.2fs, %s inserts",
+            users,
+            name,
+            elapsed,
+            len(rethink.inserts),
+        )
+        results.append(elapsed)
+    return tuple(results)
+
+
+@pytest.mark.benchmark
+def test_set_deletions_beat_lists():
+    """Detecting deletions with sets must beat removing from a list"""
+    with_lists, with_sets = run_benchmark(users=10000)
+    assert with_sets < with_lists
+
+
+if __name__ == "__main__":
+    for USERS, WITH_LISTS in ((20000, True), (100000, True), (1000000, False)):
+        LISTS, SETS = run_benchmark(USERS, with_lists=WITH_LISTS)
+        print(
+            "{} users, lists: {}, sets: {:.2f}s".format(
+                USERS, "{:.2f}s".format(LISTS) if LISTS else "not run", SETS
+            )
+        )
@@ -0,0 +1,124 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Benchmark of the LDAP initial user sync against a synthetic directory,
+inserting each entry into the inbound queue on its own as before, and a
+page at a time
+
+Run with: python -m tests.benchmarks.ldap_sync_bench
+"""
+import time
+from unittest import mock
+
+import ldap3
+import pytest
+
+from rbac.providers.ldap import initial_inbound_sync
+from tests.benchmarks.timing import LOGGER
+from tests.unit.providers.ldap.fakes import InitialSyncRethink
+
+USER_BASE_DN = "OU=Users,DC=example,DC=com"
+
+# Round trip time of the stand-in database
+QUERY_LATENCY = 0.001
+
+
+def make_directory(users):
+    """A mock LDAP connection to a synthetic directory of users."""
+    server = ldap3.Server("fake_server", get_info=None)
+    connection = ldap3.Connection(
+        server, user="CN=admin", password="password", client_strategy=ldap3.MOCK_SYNC
+    )
+    connection.strategy.add_entry("CN=admin", {"userPassword": "password"})
+    for index in range(users):
+        dn = "CN=user{},{}".format(index, USER_BASE_DN)
+        connection.strategy.add_entry(
+            dn,
+            {
+                "objectClass": "person",
+                "cn": "user{}".format(index),
+                "distinguishedName": dn,
+                "displayName": "User {}".format(index),
+                "mail": "user{}@example.com".format(index),
+                "objectGUID": "{:032x}".format(index),
+            },
+        )
+    connection.bind()
+    return connection
+
+
+def insert_each(entries, data_type, conn):
+    """The inbound queue insert as it was: one query per entry"""
+    for entry in entries:
+        initial_inbound_sync.r.table("inbound_queue").insert(
+            initial_inbound_sync.make_inbound_entry(entry, data_type)
+        ).run(conn)
+    return len(entries)
+
+
+def timed_sync(connection, insert_page):
+    """Run the initial user sync with the given page insert, returning its
+    wall time and the stand-in database"""
+    rethink = InitialSyncRethink(latency=QUERY_LATENCY)
+    with mock.patch.object(initial_inbound_sync, "r", rethink), mock.patch.object(
+        initial_inbound_sync.ldap_connector,
+        "await_connection",
+        return_value=connection,
+    ), mock.patch.object(
+        initial_inbound_sync, "connect_to_db"
+    ), mock.patch.object(
+        initial_inbound_sync, "save_sync_time"
+    ), mock.patch.object(
+        initial_inbound_sync, "insert_page", insert_page
+    ), mock.patch.object(
+        initial_inbound_sync, "USER_BASE_DN", USER_BASE_DN
+    ):
+        start = time.perf_counter()
+        initial_inbound_sync.fetch_ldap_data(data_type="user")
+        elapsed = time.perf_counter() - start
+    return elapsed, rethink
+
+
+def run_benchmark(users=5000):
+    """Time the initial sync of a directory with the given number of users;
+    returns the (per entry, per page) wall times"""
+    connection = make_directory(users)
+    results = []
+    for name, insert_page in (
+        ("per entry", insert_each),
+        ("per page", initial_inbound_sync.insert_page),
+    ):
+        elapsed, rethink = timed_sync(connection, insert_page)
+        assert rethink.inserted() == users
+        LOGGER.info(
+            "initial sync of %s users, %s: %.2fs, %s queries",
+            users,
+            name,
+            elapsed,
+            len(rethink.inserts),
+        )
+        results.append(elapsed)
+    return tuple(results)
+
+
+@pytest.mark.benchmark
+def test_initial_sync_inserts_pages():
+    """Inserting a page at a time must beat a round trip per entry"""
+    per_entry, per_page = run_benchmark(users=1000)
+    assert per_page < per_entry
+
+
+if __name__ == "__main__":
+    PER_ENTRY, PER_PAGE = run_benchmark()
+    print("per entry: {:.2f}s, per page: {:.2f}s".format(PER_ENTRY, PER_PAGE))
@@ -0,0 +1,350 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Transaction processor throughput benchmark
+
+Drives RBACTransactionHandler.apply with generated CREATE_USER,
+CREATE_ROLE, PROPOSE_ADD_ROLE_MEMBER and CONFIRM_ADD_ROLE_MEMBER
+transactions against an in-memory state context, so no validator is
+needed. Reports per message type latency percentiles and histograms,
+allocations (tracemalloc) and cProfile hot spots as JSON.
+
+CONFIRM_ADD_ROLE_MEMBER also writes the role's sync_direction straight to
+RethinkDB from the processor; that call is replaced with a no-op while
+benchmarking, so the numbers cover the processor's own work only.
+
+Run with: python -m tests.benchmarks.processor_bench --output results.json
+Compare:  python -m tests.benchmarks.processor_bench --compare results.json
+"""
+import argparse
+import cProfile
+import json
+import platform
+import pstats
+import subprocess
+import time
+import tracemalloc
+from unittest import mock
+
+import pytest
+
+from sawtooth_sdk.protobuf.processor_pb2 import TpProcessRequest
+from sawtooth_sdk.protobuf.transaction_pb2 import TransactionHeader
+
+from rbac.common.role import Role
+from rbac.common.user import User
+from rbac.common.crypto.hash import unique_id
+from rbac.common.crypto.keys import Key
+from rbac.processor.event_handler import RBACTransactionHandler
+from tests.benchmarks.state_context import InMemoryContext
+
+MESSAGE_TYPES = (
+    "CREATE_USER",
+    "CREATE_ROLE",
+    "PROPOSE_ADD_ROLE_MEMBER",
+    "CONFIRM_ADD_ROLE_MEMBER",
+)
+# Upper bounds (microseconds) of the latency histogram buckets
+HISTOGRAM_BUCKETS = (50, 100, 200, 400, 800, 1600, 3200, 6400, 12800)
+PROFILE_TOP = 20
+# Transactions traced for allocations; tracing is slow
+ALLOCATION_SAMPLE = 100
+
+
+def transaction(handler, message, signer_user_id, signer_keypair):
+    """Makes the processor request the validator would send for a message"""
+    payload = handler.make_payload(
+        message=message, signer_user_id=signer_user_id, signer_keypair=signer_keypair
+    )
+    return TpProcessRequest(
+        header=TransactionHeader(signer_public_key=signer_keypair.public_key),
+        payload=payload.SerializeToString(),
+    )
+
+
+def generate_scenario():
+    """Transactions that create a role owner, a role and a member, and add
+    the member to the role; as (message type name, transaction) pairs"""
+    owner_key = Key()
+    member_key = Key()
+    owner = User().make(
+        next_id=unique_id(), name="Role Owner", key=owner_key.public_key
+    )
+    member = User().make(
+        next_id=unique_id(), name="Role Member", key=member_key.public_key
+    )
+    role = Role().make(
+        role_id=unique_id(),
+        name="Benchmark Role",
+        owners=[owner.next_id],
+        admins=[owner.next_id],
+    )
+    propose = Role().member.propose.make(
+        proposal_id=unique_id(),
+        role_id=role.role_id,
+        next_id=member.next_id,
+        reason="benchmark",
+        metadata=None,
+    )
+    confirm = Role().member.confirm.make(
+        proposal_id=propose.proposal_id,
+        object_id=role.role_id,
+        related_id=member.next_id,
+        reason="benchmark",
+    )
+    return [
+        ("CREATE_USER", transaction(User(), owner, owner.next_id, owner_key)),
+        ("CREATE_USER", transaction(User(), member, member.next_id, member_key)),
+        ("CREATE_ROLE", transaction(Role(), role, owner.next_id, owner_key)),
+        (
+            "PROPOSE_ADD_ROLE_MEMBER",
+            transaction(Role().member.propose, propose, member.next_id, member_key),
+        ),
+        (
+            "CONFIRM_ADD_ROLE_MEMBER",
+            transaction(Role().member.confirm, confirm, owner.next_id, owner_key),
+        ),
+    ]
+
+
+def generate_transactions(scenarios):
+    """All transactions of the given number of scenarios, in apply order"""
+    transactions = []
+    for _ in range(scenarios):
+        transactions.extend(generate_scenario())
+    return transactions
+
+
+def offline():
+    """Disables the processor's direct RethinkDB writes"""
+    return mock.patch("rbac.common.role.confirm_member.set_sync_direction")
+
+
+def apply_all(transactions, handler=None, context=None):
+    """Applies every transaction; returns the per message type latencies
+    in seconds and the number of transactions the processor rejected"""
+    handler = handler or RBACTransactionHandler()
+    context = context or InMemoryContext()
+    latencies = {name: [] for name in MESSAGE_TYPES}
+    errors = 0
+    with offline():
+        for name, request in transactions:
+            started = time.perf_counter()
+            try:
+                handler.apply(request, context)
+            except Exception:  # pylint: disable=broad-except
+                errors += 1
+                continue
+            latencies[name].append(time.perf_counter() - started)
+    return latencies, errors
+
+
+def percentile(ordered, fraction):
+    """The value at the given fraction of an ordered list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples):
+    """Latency statistics (microseconds) and histogram of a list of seconds"""
+    ordered = sorted(sample * 1e6 for sample in samples)
+    histogram = {str(bound): 0 for bound in HISTOGRAM_BUCKETS}
+    histogram["inf"] = 0
+    for value in ordered:
+        for bound in HISTOGRAM_BUCKETS:
+            if value <= bound:
+                histogram[str(bound)] += 1
+                break
+        else:
+            histogram["inf"] += 1
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "mean_us": total / len(ordered) if ordered else None,
+        "p50_us": percentile(ordered, 0.50),
+        "p90_us": percentile(ordered, 0.90),
+        "p99_us": percentile(ordered, 0.99),
+        "max_us": ordered[-1] if ordered else None,
+        "tps": len(ordered) / (total / 1e6) if total else None,
+        "histogram_us": histogram,
+    }
+
+
+def measure_allocations(transactions):
+    """Memory blocks and bytes allocated (and still alive on return) and
+    peak traced memory per message type, measured with tracemalloc in a
+    separate pass so tracing does not skew the latencies"""
+    handler = RBACTransactionHandler()
+    context = InMemoryContext()
+    totals = {}
+    tracemalloc.start()
+    try:
+        with offline():
+            for name, request in transactions:
+                tracemalloc.clear_traces()
+                try:
+                    handler.apply(request, context)
+                except Exception:  # pylint: disable=broad-except
+                    continue
+                peak = tracemalloc.get_traced_memory()[1]
+                stats = tracemalloc.take_snapshot().statistics("filename")
+                total = totals.setdefault(
+                    name, {"count": 0, "blocks": 0, "bytes": 0, "peak_bytes": 0}
+                )
+                total["count"] += 1
+                total["blocks"] += sum(stat.count for stat in stats)
+                total["bytes"] += sum(stat.size for stat in stats)
+                total["peak_bytes"] = max(total["peak_bytes"], peak)
+    finally:
+        tracemalloc.stop()
+    return {
+        name: {
+            "blocks_per_tx": total["blocks"] / total["count"],
+            "bytes_per_tx": total["bytes"] / total["count"],
+            "peak_bytes": total["peak_bytes"],
+        }
+        for name, total in totals.items()
+    }
+
+
+def profile_hot_spots(transactions, top=PROFILE_TOP):
+    """The top functions by internal time while applying the transactions"""
+    handler = RBACTransactionHandler()
+    context = InMemoryContext()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    apply_all(transactions, handler=handler, context=context)
+    profiler.disable()
+    stats = pstats.Stats(profiler)
+    rows = []
+    # pylint: disable=no-member
+    for (filename, line, function), stat in stats.stats.items():
+        _, ncalls, tottime, cumtime, _ = stat
+        rows.append(
+            {
+                "function": "{}:{}({})".format(filename, line, function),
+                "ncalls": ncalls,
+                "tottime_s": tottime,
+                "cumtime_s": cumtime,
+            }
+        )
+    rows.sort(key=lambda row: row["tottime_s"], reverse=True)
+    return rows[:top]
+
+
+def git_commit():
+    """The commit being benchmarked, if run from a git checkout"""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(scenarios=200, profile=True, allocations=True):
+    """Runs the benchmark; returns the machine readable results"""
+    transactions = generate_transactions(scenarios)
+    # Warm up caches and imports before measuring
+    apply_all(generate_transactions(2))
+    started = time.perf_counter()
+    latencies, errors = apply_all(transactions)
+    elapsed = time.perf_counter() - started
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "transactions": len(transactions),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "tps": len(transactions) / elapsed if elapsed else None,
+        "latency": {name: summarize(latencies[name]) for name in MESSAGE_TYPES},
+    }
+    if allocations:
+        results["allocations"] = measure_allocations(transactions[:ALLOCATION_SAMPLE])
+    if profile:
+        results["hot_spots"] = profile_hot_spots(transactions)
+    return results
+
+
+def compare(baseline, current):
+    """Lines describing the change of each message type's p50, p99 and
+    throughput from baseline results to current results"""
+    lines = [
+        "overall tps: {:.0f} -> {:.0f} ({:+.1%})".format(
+            baseline["tps"], current["tps"], current["tps"] / baseline["tps"] - 1
+        )
+    ]
+    for name in MESSAGE_TYPES:
+        old = baseline["latency"].get(name, {})
+        new = current["latency"].get(name, {})
+        for key in ("p50_us", "p99_us", "tps"):
+            if old.get(key) and new.get(key):
+                lines.append(
+                    "{} {}: {:.1f} -> {:.1f} ({:+.1%})".format(
+                        name, key, old[key], new[key], new[key] / old[key] - 1
+                    )
+                )
+    return lines
+
+
+@pytest.mark.benchmark
+def test_processor_benchmark():
+    """The benchmark applies every generated transaction successfully"""
+    results = run_benchmark(scenarios=3, profile=True, allocations=True)
+    assert results["errors"] == 0
+    assert results["transactions"] == 15
+    assert results["latency"]["CREATE_USER"]["count"] == 6
+    for name in MESSAGE_TYPES:
+        assert results["latency"][name]["tps"] > 0
+        assert sum(results["latency"][name]["histogram_us"].values()) == (
+            results["latency"][name]["count"]
+        )
+    assert results["hot_spots"]
+    assert set(results["allocations"]) == set(MESSAGE_TYPES)
+    json.dumps(results)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", type=int, default=200)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    parser.add_argument("--no-profile", action="store_true")
+    parser.add_argument("--no-allocations", action="store_true")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        scenarios=args.scenarios,
+        profile=not args.no_profile,
+        allocations=not args.no_allocations,
+    )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    if args.compare:
+        with open(args.compare) as baseline:
+            for line in compare(json.load(baseline), results):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Micro-benchmark of loading a transactor key with and without the cache
+
+Run with: python -m tests.benchmarks.signer_bench
+"""
+import binascii
+from unittest import mock
+
+import pytest
+
+from rbac.common.crypto.keys import Key
+from rbac.common.crypto.secrets import decrypt_private_key, encrypt_private_key
+from rbac.server.api import signer_cache
+from rbac.server.api.signer_cache import SignerCache
+from tests.benchmarks.timing import best_of, report
+
+AES_KEY = "1111111111111111111111111111111111111111111111111111111111111111"
+
+
+def uncached_signer(next_id, encrypted_private_key):
+    """The transactor key load as it was before the cache"""
+    private_key = decrypt_private_key(AES_KEY, next_id, encrypted_private_key)
+    return Key(binascii.hexlify(private_key))
+
+
+def run_benchmark(number=500):
+    """Time loading one user's transactor key; returns the speedup of the
+    warm cache over decrypting every time"""
+    key = Key()
+    encrypted = encrypt_private_key(AES_KEY, key.public_key, key.private_key_bytes)
+    with mock.patch.object(signer_cache, "SIGNER_CACHE", SignerCache()):
+        uncached = best_of(lambda: uncached_signer("bench", encrypted), number)
+        cached = best_of(
+            lambda: signer_cache.get_signer(AES_KEY, "bench", encrypted), number
+        )
+    return report("transactor key load", uncached, cached)
+
+
+@pytest.mark.benchmark
+def test_warm_cache_faster_than_decrypt():
+    """A cached signer must load faster than decrypting the key"""
+    assert run_benchmark(number=50) > 1
+
+
+if __name__ == "__main__":
+    print("speedup: {:.1f}x".format(run_benchmark()))
@@ -0,0 +1,56 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""An in-memory stand-in for the transaction processor state context"""
+from sawtooth_sdk.protobuf.state_context_pb2 import TpStateEntry
+
+
+class InMemoryContext:
+    """Implements the get_state, set_state and delete_state calls of
+    sawtooth_sdk's processor Context against a dict"""
+
+    def __init__(self, state=None):
+        self.state = dict(state or {})
+        self.reads = 0
+        self.writes = 0
+
+    def get_state(self, addresses, timeout=None):  # pylint: disable=unused-argument
+        """Returns the entries of the given addresses that are set"""
+        self.reads += 1
+        return [
+            TpStateEntry(address=address, data=self.state[address])
+            for address in addresses
+            if address in self.state
+        ]
+
+    def set_state(self, entries, timeout=None):  # pylint: disable=unused-argument
+        """Sets the data of each address in entries"""
+        self.writes += 1
+        self.state.update(entries)
+        return list(entries.keys())
+
+    def delete_state(self, addresses, timeout=None):  # pylint: disable=unused-argument
+        """Removes the given addresses"""
+        self.writes += 1
+        removed = [address for address in addresses if address in self.state]
+        for address in removed:
+            del self.state[address]
+        return removed
+
+
+class Header:  # pylint: disable=too-few-public-methods
+    """The part of a TransactionHeader read by BaseMessage.apply"""
+
+    def __init__(self, signer_public_key):
+        self.signer_public_key = signer_public_key
@@ -0,0 +1,40 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Timing helpers shared by the micro-benchmarks"""
+import timeit
+
+from rbac.common.logs import get_default_logger
+
+LOGGER = get_default_logger(__name__)
+
+
+def best_of(func, number=1000, repeat=5):
+    """Returns the best average time in seconds of one call to func,
+    over repeat runs of number calls each"""
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(name, baseline, candidate):
+    """Logs and returns the speedup of candidate over baseline"""
+    speedup = baseline / candidate if candidate else float("inf")
+    LOGGER.info(
+        "%s: baseline %.2fus, candidate %.2fus, speedup %.1fx",
+        name,
+        baseline * 1e6,
+        candidate * 1e6,
+        speedup,
+    )
+    return speedup
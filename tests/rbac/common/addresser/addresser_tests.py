@@ -50,3 +50,35 @@ class TestAddresser(TestAssertions):
         self.assertIsIdentifier(hash1)
         self.assertIsIdentifier(hash2)
         self.assertNotEqual(hash1, hash2)
+
+    def test_dispatch_matches_every_registered_addresser(self):
+        """Test the dispatch table returns the same addresser as its pattern"""
+        for registered in addresser.addressers.ADDRESSERS.values():
+            address = registered.address(
+                object_id=registered.unique_id(), related_id=registered.unique_id()
+            )
+            found = addresser.find_addresser(address)
+            self.assertIs(found, registered)
+            self.assertEqual(
+                addresser.get_address_type(address), registered.address_type
+            )
+            self.assertEqual(
+                addresser.parse(address, validate=False).address_type,
+                registered.address_type,
+            )
+
+    def test_dispatch_validates_address(self):
+        """Test dispatch rejects malformed addresses unless validate is off"""
+        address = addresser.role.member.address(
+            addresser.role.unique_id(), addresser.user.unique_id()
+        )
+        foreign = "ffffff" + address[6:]
+        self.assertIsNone(addresser.find_addresser(foreign))
+        self.assertIs(
+            addresser.find_addresser(foreign, validate=False),
+            addresser.find_addresser(address),
+        )
+        self.assertIsNone(addresser.find_addresser(address[:-2]))
+        self.assertIsNone(addresser.find_addresser(address[:10] + "ffff" + address[14:]))
+        with self.assertRaises(ValueError):
+            addresser.parse(foreign)
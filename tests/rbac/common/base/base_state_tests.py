@@ -101,3 +101,19 @@ class BaseModelTest(TestAssertions):
                 protobuf.role_attributes_state_pb2.RoleAttributesContainer,
             )
         self.assertEqual(model._state_container_list_name, "role_attributes")
+
+    def test_lookups_cached_per_class(self):
+        """Test derived names and protobufs are resolved once per class"""
+        user_model = TestModelUser()
+        role_model = TestModelRole()
+        self.assertEqual(user_model._name_lower, "user")
+        self.assertEqual(role_model._name_lower, "role_attributes")
+        self.assertEqual(TestModelUser()._name_lower, "user")
+        self.assertIs(
+            TestModelUser()._state_container, protobuf.user_state_pb2.UserContainer
+        )
+        with self.assertRaises(AttributeError):
+            # Lookup failures are not cached
+            role_model._state_object  # pylint: disable=pointless-statement
+        with self.assertRaises(AttributeError):
+            role_model._state_object  # pylint: disable=pointless-statement
@@ -16,6 +16,7 @@
 
 # pylint: disable=no-member
 import pytest
+from sawtooth_sdk.protobuf import transaction_pb2
 
 from rbac.common import addresser
 from rbac.common.protobuf.rbac_payload_pb2 import RBACPayload
@@ -29,6 +30,7 @@ from rbac.common.sawtooth.batcher import (
     make_batch,
     batch_to_list,
     make_batch_list,
+    make_batch_list_from_txns,
     make_batch_request,
 )
 from rbac.common.crypto.keys import Key
@@ -249,6 +251,40 @@ class TestBatchClient(TestAssertions):
             batcher_public_key=signer.public_key,
         )
 
+    def test_make_batch_list_from_txns(self):
+        """Test splitting transactions into a batch list of sized batches"""
+        payload, signer = self.get_test_payload()
+        transactions = [
+            make_transaction(payload=payload, signer_keypair=signer) for _ in range(5)
+        ]
+
+        batch_list = make_batch_list_from_txns(transactions, signer, batch_size=2)
+        self.assertEqual(
+            [len(batch.transactions) for batch in batch_list.batches], [2, 2, 1]
+        )
+        batched = [txn for batch in batch_list.batches for txn in batch.transactions]
+        self.assertEqual(
+            [txn.payload for txn in batched], [txn.payload for txn in transactions]
+        )
+        # Each later batch depends on the last transaction of the one before
+        dependencies = []
+        for txn in batched:
+            header = transaction_pb2.TransactionHeader()
+            header.ParseFromString(txn.header)
+            self.assertTrue(
+                signer.verify(
+                    txn.header_signature, txn.header, header.signer_public_key
+                )
+            )
+            dependencies.append(list(header.dependencies))
+        self.assertEqual(
+            dependencies,
+            [[], [], [batched[1].header_signature], [], [batched[3].header_signature]],
+        )
+        self.assertEqual(batched[:2], transactions[:2])
+        batch_list = make_batch_list_from_txns(transactions, signer)
+        self.assertEqual(len(batch_list.batches), 1)
+
     def test_make_batch_request(self):
         """Test the make batch request batch function"""
         payload, signer = self.get_test_payload()
@@ -0,0 +1,195 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/ledger_sync/deltas/batching.py"""
+from unittest import mock
+
+import rethinkdb as r
+
+from rbac.ledger_sync.deltas import batching
+from rbac.ledger_sync.deltas.batching import split_segments
+
+
+def test_split_segments_unique_addresses():
+    """Changes to distinct addresses are applied as one segment."""
+    decoded = [("a", {}), ("b", None), ("c", {"x": 1})]
+    assert split_segments(decoded) == [decoded]
+
+
+def test_split_segments_repeated_address():
+    """A repeated address starts a new segment, preserving block order."""
+    decoded = [("a", {"v": 1}), ("b", {}), ("a", None), ("c", {}), ("a", {"v": 2})]
+    assert split_segments(decoded) == [
+        [("a", {"v": 1}), ("b", {})],
+        [("a", None), ("c", {})],
+        [("a", {"v": 2})],
+    ]
+
+
+def test_split_segments_empty():
+    """A block without RBAC changes has no segments."""
+    assert split_segments([]) == []
+
+
+class FakeReplace:
+    """Stands in for a for_each replace of rows, failing as a whole if any
+    row is bad."""
+
+    def __init__(self, rows, written):
+        self.rows = rows
+        self.written = written
+
+    def run(self, conn):  # pylint: disable=unused-argument
+        """Write the rows, or fail on a bad one."""
+        if any(row["key"] == "bad" for row in self.rows):
+            raise r.ReqlOpFailedError("cannot write row")
+        self.written.extend(row["key"] for row in self.rows)
+        return {
+            "inserted": len(self.rows),
+            "errors": 0,
+            "changes": [{"new_val": {"id": row["key"]}} for row in self.rows],
+        }
+
+
+def write_rows(keys):
+    """Write rows with the given keys; returns the write result and the
+    keys written, in order, and the number of queries run."""
+    written = []
+    queries = []
+
+    def replace_rows(table, rows, return_changes):  # pylint: disable=W0613
+        queries.append(rows)
+        return FakeReplace(rows, written)
+
+    with mock.patch.object(batching, "_replace_rows", replace_rows):
+        result = batching._write_rows(  # pylint: disable=protected-access
+            mock.Mock(), "users", [{"key": key} for key in keys], True
+        )
+    return result, written, len(queries)
+
+
+def test_write_rows_in_one_query():
+    """Rows are written with a single query when it succeeds."""
+    result, written, queries = write_rows(["a", "b", "c"])
+    assert written == ["a", "b", "c"]
+    assert queries == 1
+    assert result["inserted"] == 3
+
+
+def test_failed_batch_falls_back_to_row_writes():
+    """When the batched write fails, the other rows of the table are still
+    written one at a time, and only the bad row is skipped."""
+    result, written, queries = write_rows(["a", "bad", "c"])
+    assert written == ["a", "c"]
+    assert queries == 4
+    assert result["inserted"] == 2
+    assert [change["new_val"]["id"] for change in result["changes"]] == ["a", "c"]
+
+
+class FakeDelete:
+    """Stands in for a get_all delete of users, failing if told to."""
+
+    def __init__(self, fail):
+        self.fail = fail
+
+    def table(self, name):  # pylint: disable=unused-argument
+        """Chain the query."""
+        return self
+
+    def get_all(self, *keys):  # pylint: disable=unused-argument
+        """Chain the query."""
+        return self
+
+    def delete(self, return_changes=False):  # pylint: disable=unused-argument
+        """Chain the query."""
+        return self
+
+    def run(self, conn):  # pylint: disable=unused-argument
+        """Delete one user, or fail."""
+        if self.fail:
+            raise r.ReqlOpFailedError("cannot delete rows")
+        return {"deleted": 1, "changes": [{"old_val": {"next_id": "u1"}}]}
+
+
+def remove_users(fail_delete=False):
+    """Remove a user's legacy record while removing its off chain records
+    and syncing the org hierarchy fail; returns the count deltas and the
+    steps attempted."""
+    steps = []
+
+    def failing(name):
+        def step(*args):  # pylint: disable=unused-argument
+            steps.append(name)
+            raise r.ReqlOpFailedError("{} failed".format(name))
+
+        return step
+
+    count_deltas = {}
+    with mock.patch.multiple(
+        batching,
+        r=FakeDelete(fail_delete),
+        TABLE_NAMES={"user": "users"},
+        _remove_user_records=failing("remove_user_records"),
+        sync_org_hierarchy=failing("sync_org_hierarchy"),
+    ), mock.patch.object(
+        batching.addresser, "get_address_type", return_value="user"
+    ):
+        batching._remove_legacy(  # pylint: disable=protected-access
+            mock.Mock(), ["address"], count_deltas
+        )
+    return count_deltas, steps
+
+
+def test_failed_steps_do_not_stop_removal():
+    """When removing a user's off chain records fails, the org hierarchy is
+    still synced, and neither failure escapes."""
+    count_deltas, steps = remove_users()
+    assert count_deltas == {"users": -1}
+    assert steps == ["remove_user_records", "sync_org_hierarchy"]
+
+
+def test_failed_delete_is_skipped():
+    """A failed delete counts no rows and leaves no users to clean up."""
+    count_deltas, steps = remove_users(fail_delete=True)
+    assert count_deltas == {"users": 0}
+    assert steps == ["sync_org_hierarchy"]
+
+
+def test_failed_steps_do_not_stop_the_block():
+    """Every step of a block is attempted even when earlier ones fail."""
+    steps = []
+
+    def step(name, fail=False):
+        def call(*args):  # pylint: disable=unused-argument
+            steps.append(name)
+            if fail:
+                raise r.ReqlOpFailedError("{} failed".format(name))
+            return []
+
+        return call
+
+    with mock.patch.multiple(
+        batching,
+        _update_state=step("update_state", fail=True),
+        _insert_history=step("insert_history", fail=True),
+        _update_legacy=step("update_legacy"),
+        _update_providers=step("update_providers", fail=True),
+    ):
+        batching.apply_block_changes(mock.Mock(), 1, [("a", {})])
+    assert steps == [
+        "update_state",
+        "insert_history",
+        "update_legacy",
+        "update_providers",
+    ]
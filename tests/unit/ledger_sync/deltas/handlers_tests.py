@@ -0,0 +1,104 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/ledger_sync/deltas/handlers.py"""
+from types import SimpleNamespace
+from unittest import mock
+
+from rbac.ledger_sync.deltas import handlers
+
+
+class FakeQuery:
+    """A query whose run() returns a canned result."""
+
+    def __init__(self, result):
+        self.result = result
+
+    def get(self, *args):  # pylint: disable=unused-argument
+        """Chain the query."""
+        return self
+
+    def insert(self, *args):  # pylint: disable=unused-argument
+        """Chain the query."""
+        return FakeQuery({"inserted": 1})
+
+    def run(self, conn):  # pylint: disable=unused-argument
+        """Return the canned result."""
+        return self.result
+
+
+class FakeRethink:
+    """Stands in for the rethinkdb module, knowing one block."""
+
+    def __init__(self, block):
+        self.block = block
+
+    def table(self, name):  # pylint: disable=unused-argument
+        """Only the blocks table is read."""
+        return FakeQuery(self.block)
+
+    @staticmethod
+    def now():
+        """The current time."""
+        return None
+
+
+def handle_block(known_block_id):
+    """Handle block 7 while block 7 is known with known_block_id; returns
+    the names of the fork and hierarchy calls made, in order."""
+    calls = []
+    conn = mock.Mock()
+    state_change = SimpleNamespace(
+        block_num="7",
+        block_id="new",
+        previous_block_id="6",
+        state_root_hash="root",
+        state_changes=[],
+    )
+
+    def record(name, result=None):
+        def call(*args):
+            assert name == "invalidate_table_counts" or args[0] is conn
+            calls.append(name)
+            return result
+
+        return call
+
+    with mock.patch.multiple(
+        handlers,
+        r=FakeRethink({"block_num": 7, "block_id": known_block_id}),
+        drop_fork=record("drop_fork", {"deleted": 1}),
+        invalidate_table_counts=record("invalidate_table_counts", FakeQuery(None)),
+        rebuild_org_hierarchy=record("rebuild_org_hierarchy"),
+        update_database=record("update_database", {}),
+        update_table_counts=mock.Mock(return_value=FakeQuery(None)),
+    ):
+        handlers.get_delta_handler(conn)(state_change)
+    return calls
+
+
+def test_fork_rebuilds_org_hierarchy():
+    """A forked block is dropped and the org hierarchy rebuilt before the
+    new block's changes are applied."""
+    assert handle_block("old") == [
+        "drop_fork",
+        "invalidate_table_counts",
+        "rebuild_org_hierarchy",
+        "update_database",
+    ]
+
+
+def test_known_block_is_skipped():
+    """A block already applied is not applied again."""
+    assert handle_block("new") == []
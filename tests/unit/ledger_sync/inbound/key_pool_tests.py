@@ -0,0 +1,57 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Test Suite for the inbound key pool of Ledger Sync."""
+import time
+
+from rbac.common.crypto.secrets import decrypt_private_key, generate_aes_key
+from rbac.ledger_sync.inbound.key_pool import KeyPool
+
+
+def assert_usable(key_pair, encrypted_private_key, aes_key):
+    """The key pair signs, and its private key is the one encrypted."""
+    assert key_pair.verify(key_pair.sign(b"message"), b"message")
+    assert (
+        decrypt_private_key(aes_key, key_pair.public_key, encrypted_private_key)
+        == key_pair.private_key_bytes
+    )
+
+
+def test_unstarted_pool_generates_inline():
+    """Without a worker process, each key pair is generated when taken."""
+    aes_key = generate_aes_key()
+    pool = KeyPool(size=0, aes_key=aes_key)
+    pool.start()
+    key_pair, encrypted_private_key = pool.take()
+    assert_usable(key_pair, encrypted_private_key, aes_key)
+    assert pool.stats() == {"pooled": 0, "inline": 1}
+
+
+def test_key_pairs_are_taken_from_the_pool():
+    """Key pairs generated by the worker process are distinct and usable."""
+    aes_key = generate_aes_key()
+    pool = KeyPool(size=20, aes_key=aes_key, chunk_size=10)
+    pool.start()
+    try:
+        deadline = time.monotonic() + 30
+        # pylint: disable=protected-access
+        while pool._chunks.empty() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        taken = [pool.take() for _ in range(10)]
+    finally:
+        pool.close()
+    assert pool.stats() == {"pooled": 10, "inline": 0}
+    assert len({key_pair.public_key for key_pair, _ in taken}) == 10
+    for key_pair, encrypted_private_key in taken:
+        assert_usable(key_pair, encrypted_private_key, aes_key)
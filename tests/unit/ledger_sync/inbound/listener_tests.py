@@ -0,0 +1,94 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Test Suite for the concurrent inbound queue workers of Ledger Sync."""
+import random
+import threading
+import time
+from unittest import mock
+
+from rbac.ledger_sync.inbound import listener
+
+
+def record(rec_id, remote_id, data_type="user"):
+    """An inbound_queue record."""
+    return {"id": rec_id, "data_type": data_type, "data": {"remote_id": remote_id}}
+
+
+class FakeProcess:
+    """Stands in for process, recording the records it is given after a
+    random delay."""
+
+    def __init__(self):
+        self.processed = []
+        self.lock = threading.Lock()
+
+    def __call__(self, rec, conn, submitter):  # pylint: disable=unused-argument
+        time.sleep(random.random() / 1000)
+        with self.lock:
+            self.processed.append(rec)
+
+
+def run_workers(records, leased_elsewhere=()):
+    """Dispatch records to a pool of workers, returning the records
+    processed, in order."""
+    by_id = {rec["id"]: rec for rec in records}
+    fake_process = FakeProcess()
+
+    def fake_claim(rec_id, conn, lease_secs):  # pylint: disable=unused-argument
+        if rec_id in leased_elsewhere:
+            return None
+        return dict(by_id[rec_id], claimed_by="worker", lease_expires=0)
+
+    with mock.patch.object(listener, "connect_to_db"), mock.patch.object(
+        listener, "claim", fake_claim
+    ), mock.patch.object(listener, "process", fake_process):
+        workers = listener.InboundWorkers(size=4, submitter=mock.Mock())
+        for rec in records:
+            workers.dispatch(rec)
+        workers.join()
+    return fake_process.processed
+
+
+def test_records_of_an_object_stay_in_order():
+    """Records with the same remote_id are processed in dispatch order."""
+    records = [
+        record(str(index), "CN=user{}".format(index % 5)) for index in range(100)
+    ]
+    processed = run_workers(records)
+    assert len(processed) == 100
+    for remote in range(5):
+        remote_id = "CN=user{}".format(remote)
+        assert [
+            rec["id"] for rec in processed if rec["data"]["remote_id"] == remote_id
+        ] == [rec["id"] for rec in records if rec["data"]["remote_id"] == remote_id]
+    assert not any("claimed_by" in rec for rec in processed)
+
+
+def test_users_finish_before_groups():
+    """Groups are processed only once the users before them are done."""
+    records = [record(str(index), "CN=user{}".format(index)) for index in range(20)]
+    records += [
+        record(str(index), "CN=group{}".format(index), "group")
+        for index in range(20, 30)
+    ]
+    processed = run_workers(records)
+    assert [rec["data_type"] for rec in processed] == ["user"] * 20 + ["group"] * 10
+
+
+def test_records_claimed_elsewhere_are_skipped():
+    """A record leased to another worker is not processed."""
+    records = [record(str(index), "CN=user{}".format(index)) for index in range(4)]
+    processed = run_workers(records, leased_elsewhere={"2"})
+    assert sorted(rec["id"] for rec in processed) == ["0", "1", "3"]
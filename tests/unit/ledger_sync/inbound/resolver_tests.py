@@ -0,0 +1,102 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Test Suite for the remote_id resolver of Ledger Sync."""
+from unittest import mock
+
+from rbac.ledger_sync.inbound import listener
+from rbac.ledger_sync.inbound.resolver import RemoteIdResolver
+
+
+class FakeUsers:
+    """Stands in for RemoteIdResolver._fetch, recording each query."""
+
+    def __init__(self, users):
+        self.users = users
+        self.queries = []
+
+    def __call__(self, remote_ids, conn):  # pylint: disable=unused-argument
+        self.queries.append(sorted(remote_ids))
+        return [
+            {"remote_id": remote_id, "next_id": self.users[remote_id]}
+            for remote_id in remote_ids
+            if remote_id in self.users
+        ]
+
+
+def make_resolver(users, max_size=10):
+    """A user resolver over the given next_ids by remote_id."""
+    resolver = RemoteIdResolver("users", "next_id", max_size=max_size)
+    fetch = FakeUsers(users)
+    resolver._fetch = fetch  # pylint: disable=protected-access
+    return resolver, fetch
+
+
+def test_misses_are_fetched_in_one_query():
+    """Only the remote_ids not cached are fetched, all together, and unknown
+    remote_ids are asked for again."""
+    resolver, fetch = make_resolver({"a": "1", "b": "2", "c": "3"})
+    assert resolver.resolve(["a", "b", "x"]) == {"a": "1", "b": "2"}
+    assert resolver.resolve(["a", "b", "c", "x"]) == {"a": "1", "b": "2", "c": "3"}
+    assert fetch.queries == [["a", "b", "x"], ["c", "x"]]
+    assert resolver.stats()["hits"] == 2
+
+
+def test_least_recently_used_are_evicted():
+    """The cache holds at most max_size ids, dropping the least recently
+    used."""
+    resolver, fetch = make_resolver({"a": "1", "b": "2", "c": "3"}, max_size=2)
+    resolver.resolve(["a", "b"])
+    resolver.resolve(["a"])
+    resolver.resolve(["c"])
+    assert resolver.stats()["evictions"] == 1
+    resolver.resolve(["a", "b"])
+    assert fetch.queries[-1] == ["b"]
+
+
+def test_changes_update_the_cache():
+    """Changefeed changes replace, add and drop cached ids."""
+    resolver, fetch = make_resolver({})
+    resolver.apply_change(
+        {"old_val": None, "new_val": {"remote_id": "a", "next_id": "1"}}
+    )
+    resolver.apply_change(
+        {
+            "old_val": {"remote_id": "b", "next_id": "2"},
+            "new_val": {"remote_id": "b", "next_id": "2"},
+        }
+    )
+    assert resolver.resolve(["a", "b"]) == {"a": "1", "b": "2"}
+    resolver.apply_change(
+        {
+            "old_val": {"remote_id": "a", "next_id": "1"},
+            "new_val": {"remote_id": "a", "next_id": "9"},
+        }
+    )
+    resolver.apply_change(
+        {"old_val": {"remote_id": "b", "next_id": "2"}, "new_val": None}
+    )
+    assert resolver.resolve(["a", "b"]) == {"a": "9"}
+    assert fetch.queries == [["b"]]
+
+
+def test_members_and_owners_are_translated_together():
+    """A group's members and owners are resolved with a single lookup, and
+    unknown users keep their remote_id."""
+    resolver, fetch = make_resolver({"CN=a": "1", "CN=b": "2"})
+    rec = {"data": {"members": ["CN=a", "CN=x"], "owners": "CN=b"}}
+    with mock.patch.object(listener, "USER_IDS", resolver):
+        rec = listener.translate_fields_to_next(rec, ("members", "owners"))
+    assert rec["data"] == {"members": ["1", "CN=x"], "owners": ["2"]}
+    assert fetch.queries == [["CN=a", "CN=b", "CN=x"]]
@@ -0,0 +1,92 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Test Suite for micro-batching of inbound batches in Ledger Sync."""
+from concurrent.futures import ThreadPoolExecutor
+
+from sawtooth_sdk.protobuf import batch_pb2
+
+from rbac.ledger_sync.inbound.submitter import BatchSubmitter
+
+
+class FakeClient:
+    """Stands in for ClientSync. Batches whose id ends in 'x' are invalid,
+    and every batch is pending the first time its status is asked for."""
+
+    def __init__(self):
+        self.sent = []
+        self.asked = set()
+
+    def send_batches(self, batch_list):
+        """Record the ids of the batches sent together."""
+        self.sent.append([batch.header_signature for batch in batch_list.batches])
+
+    def get_statuses(self, batch_ids, wait=None):  # pylint: disable=unused-argument
+        """Answer PENDING, then COMMITTED or INVALID."""
+        statuses = []
+        for batch_id in batch_ids:
+            if batch_id not in self.asked:
+                self.asked.add(batch_id)
+                status = "PENDING"
+            elif batch_id.endswith("x"):
+                status = "INVALID"
+            else:
+                status = "COMMITTED"
+            statuses.append({"id": batch_id, "status": status})
+        return statuses
+
+
+def submit_all(batch_ids, **kwargs):
+    """Submit batches concurrently, returning their statuses and the client."""
+    client = FakeClient()
+    submitter = BatchSubmitter(client=client, **kwargs)
+    with ThreadPoolExecutor(max_workers=len(batch_ids)) as executor:
+        statuses = list(
+            executor.map(
+                lambda batch_id: submitter.submit(
+                    batch_pb2.Batch(header_signature=batch_id)
+                ),
+                batch_ids,
+            )
+        )
+    return statuses, client
+
+
+def test_batches_are_sent_together():
+    """Batches submitted at the same time share one request, and each gets
+    its own status."""
+    batch_ids = ["a", "bx", "c", "d"]
+    statuses, client = submit_all(batch_ids, max_batches=10, max_wait=0.2)
+    assert [sorted(sent) for sent in client.sent] == [sorted(batch_ids)]
+    assert [status["id"] for status in statuses] == batch_ids
+    assert [status["status"] for status in statuses] == [
+        "COMMITTED",
+        "INVALID",
+        "COMMITTED",
+        "COMMITTED",
+    ]
+
+
+def test_requests_are_limited_in_batches_and_bytes():
+    """No request holds more than max_batches batches or max_bytes bytes."""
+    batch_ids = ["batch{}".format(index) for index in range(10)]
+    _, client = submit_all(batch_ids, max_batches=4, max_wait=0.2)
+    assert sorted(len(sent) for sent in client.sent) == [2, 4, 4]
+
+    size = batch_pb2.Batch(header_signature=batch_ids[0]).ByteSize()
+    _, client = submit_all(
+        batch_ids, max_batches=10, max_wait=0.2, max_bytes=size * 3
+    )
+    assert all(len(sent) <= 3 for sent in client.sent)
+    assert sorted(sum(client.sent, [])) == sorted(batch_ids)
@@ -0,0 +1,125 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Test Suite for the queue consumer in rbac/providers/common/db_queries.py"""
+from unittest import mock
+
+import rethinkdb as r
+
+from rbac.providers.common import db_queries
+
+
+class FakeFeed:
+    """Stands in for a changefeed cursor, returning the given changes."""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+
+    def next(self, wait=True):
+        """Return the next change, timing out if there is none."""
+        if not self.changes:
+            if wait:
+                raise r.ReqlCursorEmpty()
+            raise r.ReqlTimeoutError()
+        return self.changes.pop(0)
+
+
+class FakeQuery:
+    """Stands in for the provider queue query."""
+
+    def __init__(self, feed):
+        self.feed = feed
+
+    def changes(self):
+        """Chain the query."""
+        return self
+
+    def run(self, conn):  # pylint: disable=unused-argument
+        """Open the feed."""
+        return self.feed
+
+
+def test_consumer_waits_on_feed_when_queue_is_empty():
+    """An empty queue is read again only once an entry is added to it,
+    changes for entries leaving the queue being ignored."""
+    feed = FakeFeed(
+        [
+            {"new_val": None, "old_val": {"id": "1"}},
+            {"new_val": {"id": "3"}},
+            {"new_val": {"id": "4"}},
+        ]
+    )
+    batches = [[{"id": "1"}, {"id": "2"}], [], [{"id": "3"}, {"id": "4"}]]
+    with mock.patch.object(db_queries, "connect_to_db"), mock.patch.object(
+        db_queries, "unconfirmed_queue", return_value=FakeQuery(feed)
+    ), mock.patch.object(
+        db_queries, "fetch_queue_entries", side_effect=batches
+    ) as fetch:
+        consumer = db_queries.consume_queue("outbound_queue", "provider", 2)
+        assert next(consumer) == batches[0]
+        assert next(consumer) == batches[2]
+    assert not feed.changes
+    assert fetch.call_count == 3
+
+
+def test_consumer_reopens_failed_feed():
+    """A failed changefeed is reopened and the queue read again."""
+    batches = [[], [{"id": "1"}]]
+    with mock.patch.object(db_queries, "connect_to_db"), mock.patch.object(
+        db_queries, "unconfirmed_queue", return_value=FakeQuery(FakeFeed([]))
+    ) as unconfirmed_queue, mock.patch.object(
+        db_queries, "fetch_queue_entries", side_effect=batches
+    ), mock.patch.object(
+        db_queries, "QUEUE_FEED_RETRY_SECS", 0
+    ):
+        consumer = db_queries.consume_queue("outbound_queue", "provider", 2)
+        assert next(consumer) == batches[1]
+    assert unconfirmed_queue.call_count == 2
+
+
+class RecordingQuery:
+    """Stands in for a queue query, recording how it is built."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __getattr__(self, name):
+        def chained(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return chained
+
+    def run(self, conn):  # pylint: disable=unused-argument
+        """Return no entries."""
+        return iter([])
+
+
+def test_fetch_reads_only_unconfirmed_entries():
+    """Entries are read from the unconfirmed range of the provider's
+    entries, in index order, without filtering out confirmed ones."""
+    calls = []
+    fake = mock.Mock(minval="MIN", maxval="MAX")
+    fake.table.return_value = RecordingQuery(calls)
+    with mock.patch.object(db_queries, "r", fake):
+        assert db_queries.fetch_queue_entries("outbound_queue", "p", 10, "conn") == []
+    assert calls == [
+        (
+            "between",
+            (["p", "UNCONFIRMED", "MIN"], ["p", "UNCONFIRMED", "MAX"]),
+            {"index": "provider_status_timestamp"},
+        ),
+        ("order_by", (), {"index": "provider_status_timestamp"}),
+        ("limit", (10,), {}),
+    ]
@@ -0,0 +1,88 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Test Suite for the LDAP connection pool."""
+from unittest import mock
+
+import pytest
+from ldap3.core.exceptions import LDAPSessionTerminatedByServerError
+
+from rbac.providers.common import ldap_connector
+from rbac.providers.common.ldap_connector import LdapConnectionPool
+
+
+class FakeConnection:
+    """Stands in for a bound ldap3 connection."""
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+        self.bound = True
+        self.searches = 0
+
+    def search(self, *args, **kwargs):  # pylint: disable=unused-argument
+        """Answer a liveness check."""
+        self.searches += 1
+        return self.alive
+
+    def unbind(self):
+        """Close the connection."""
+        self.closed = True
+        self.bound = False
+
+
+def connecting(*connections):
+    """Patch await_connection to return the given connections in turn."""
+    return mock.patch.object(
+        ldap_connector, "await_connection", side_effect=connections
+    )
+
+
+def test_connections_are_reused():
+    """A returned connection is handed out again without reconnecting."""
+    first = FakeConnection()
+    pool = LdapConnectionPool("server", "user", "pass", size=2)
+    with connecting(first) as connect:
+        with pool.connection() as connection:
+            assert connection is first
+        with pool.connection() as connection:
+            assert connection is first
+    assert connect.call_count == 1
+    assert first.searches == 0
+
+
+def test_broken_connection_is_discarded():
+    """A connection that loses the server is closed and replaced."""
+    first, second = FakeConnection(), FakeConnection()
+    pool = LdapConnectionPool("server", "user", "pass", size=2)
+    with connecting(first, second):
+        with pytest.raises(LDAPSessionTerminatedByServerError):
+            with pool.connection():
+                raise LDAPSessionTerminatedByServerError("terminated")
+        with pool.connection() as connection:
+            assert connection is second
+    assert first.closed
+
+
+def test_stale_connection_is_replaced():
+    """An idle connection failing its liveness check is replaced."""
+    stale, fresh = FakeConnection(alive=False), FakeConnection()
+    pool = LdapConnectionPool("server", "user", "pass", size=2, liveness_secs=0)
+    with connecting(stale, fresh):
+        with pool.connection():
+            pass
+        with pool.connection() as connection:
+            assert connection is fresh
+    assert stale.searches == 1
+    assert stale.closed
@@ -0,0 +1,81 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Test Suite for LDAP Delta Outbound Sync."""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest import mock
+
+from ldap3.core.exceptions import LDAPSessionTerminatedByServerError
+
+from rbac.providers.ldap import delta_outbound_sync
+
+
+class FakePool:
+    """Stands in for an LdapConnectionPool."""
+
+    @contextmanager
+    def connection(self):  # pylint: disable=no-self-use
+        """Lend a placeholder connection."""
+        yield "connection"
+
+
+def queue_entry(entry_id, remote_id):
+    """An outbound queue entry for a group."""
+    return {"id": entry_id, "data_type": "group", "data": {"remote_id": remote_id}}
+
+
+def process(queue_entries, apply_outbound_entry):
+    """Process a batch, applying entries with the given function."""
+    with mock.patch.object(
+        delta_outbound_sync, "apply_outbound_entry", side_effect=apply_outbound_entry
+    ), mock.patch.object(delta_outbound_sync, "delete_entry_queue") as delete:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            applied = delta_outbound_sync.process_outbound_batch(
+                queue_entries, FakePool(), executor
+            )
+    return applied, delete
+
+
+def test_entries_of_an_object_are_applied_in_order():
+    """Entries are applied in queue order within each LDAP object."""
+    applied_ids = []
+    queue_entries = [
+        queue_entry("1", "CN=a"),
+        queue_entry("2", "CN=b"),
+        queue_entry("3", "cn=A"),
+        {"id": "4", "data_type": "group", "data": {}},
+    ]
+    applied, delete = process(
+        queue_entries, lambda entry, connection: applied_ids.append(entry["id"])
+    )
+    assert applied == 4
+    assert [entry_id for entry_id in applied_ids if entry_id != "2"] == ["1", "3"]
+    assert sorted(applied_ids) == ["1", "2", "3"]
+    delete.assert_called_once_with("4", "outbound_queue")
+
+
+def test_entries_after_lost_connection_are_left_queued():
+    """Entries after a lost connection are not applied, to be retried."""
+    applied_ids = []
+
+    def apply_outbound_entry(entry, connection):  # pylint: disable=unused-argument
+        if entry["id"] == "2":
+            raise LDAPSessionTerminatedByServerError("terminated")
+        applied_ids.append(entry["id"])
+
+    queue_entries = [queue_entry(str(index), "CN=a") for index in range(1, 4)]
+    applied, _ = process(queue_entries, apply_outbound_entry)
+    assert applied == 1
+    assert applied_ids == ["1"]
@@ -0,0 +1,122 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Stand-ins for the rethinkdb module shared by the LDAP sync tests and
+their benchmarks"""
+import time
+
+
+class DeltaSyncQuery:
+    """Stands in for a RethinkDB query of delta inbound sync, recording the
+    inserts it is built into and returning the given rows when run."""
+
+    def __init__(self, rows, inserts):
+        self.rows = rows
+        self.inserts = inserts
+        self.documents = None
+
+    def filter(self, *args):  # pylint: disable=unused-argument
+        """Chain the query."""
+        return self
+
+    def has_fields(self, *args):  # pylint: disable=unused-argument
+        """Chain the query."""
+        return self
+
+    def get_field(self, *args):  # pylint: disable=unused-argument
+        """Chain the query."""
+        return self
+
+    def insert(self, documents):
+        """Build an insert."""
+        query = DeltaSyncQuery([], self.inserts)
+        query.documents = documents
+        return query
+
+    def run(self, conn):  # pylint: disable=unused-argument
+        """Record an insert or return the rows."""
+        if self.documents is not None:
+            self.inserts.append(self.documents)
+        return iter(self.rows)
+
+
+class DeltaSyncRethink:
+    """Stands in for the rethinkdb module of delta inbound sync, knowing the
+    given users."""
+
+    def __init__(self, user_remote_ids):
+        self.user_remote_ids = user_remote_ids
+        self.inserts = []
+
+    def table(self, name):
+        """Only user_mapping has rows."""
+        rows = self.user_remote_ids if name == "user_mapping" else []
+        return DeltaSyncQuery(rows, self.inserts)
+
+    def inserted(self):
+        """The number of documents inserted, by single or bulk inserts."""
+        return sum(
+            len(documents) if isinstance(documents, list) else 1
+            for documents in self.inserts
+        )
+
+
+class InitialSyncInsert:
+    """Stands in for an inbound queue insert, recording it when run, after
+    the given latency."""
+
+    def __init__(self, rethink, documents, durability):
+        self.rethink = rethink
+        self.documents = documents
+        self.durability = durability
+
+    def run(self, conn):  # pylint: disable=unused-argument
+        """Record the insert."""
+        if self.rethink.latency:
+            time.sleep(self.rethink.latency)
+        self.rethink.inserts.append((self.documents, self.durability))
+
+
+class InitialSyncRethink:
+    """Stands in for the rethinkdb module of initial inbound sync, recording
+    inserts.
+
+    Args:
+        latency:
+            float: seconds each insert takes to answer
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.inserts = []
+
+    def table(self, name):  # pylint: disable=unused-argument
+        """Return self as the inbound_queue table."""
+        return self
+
+    def insert(self, documents, durability="hard"):
+        """Build a recorded insert."""
+        return InitialSyncInsert(self, documents, durability)
+
+    @staticmethod
+    def now():
+        """Stands in for r.now()."""
+        return "now"
+
+    def inserted(self):
+        """The number of documents inserted, by single or bulk inserts."""
+        return sum(
+            len(documents) if isinstance(documents, list) else 1
+            for documents, _ in self.inserts
+        )
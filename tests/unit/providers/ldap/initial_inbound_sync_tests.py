@@ -0,0 +1,102 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# -----------------------------------------------------------------------------
+"""Test Suite for LDAP Initial Inbound Sync."""
+from unittest import mock
+
+import ldap3
+
+from rbac.providers.ldap import initial_inbound_sync
+from tests.unit.providers.ldap.fakes import InitialSyncRethink
+
+USER_BASE_DN = "OU=Users,DC=example,DC=com"
+
+
+def make_directory(users):
+    """A mock LDAP connection to a directory with the given number of users."""
+    server = ldap3.Server("fake_server", get_info=None)
+    connection = ldap3.Connection(
+        server, user="CN=admin", password="password", client_strategy=ldap3.MOCK_SYNC
+    )
+    connection.strategy.add_entry("CN=admin", {"userPassword": "password"})
+    for index in range(users):
+        dn = "CN=user{},{}".format(index, USER_BASE_DN)
+        connection.strategy.add_entry(
+            dn,
+            {
+                "objectClass": "person",
+                "cn": "user{}".format(index),
+                "distinguishedName": dn,
+                "mail": "user{}@example.com".format(index),
+            },
+        )
+    connection.bind()
+    return connection
+
+
+def run_initial_sync(users, page_size, durability="hard"):
+    """Run the initial user sync against a mock directory, returning the
+    inserts made."""
+    rethink = InitialSyncRethink()
+    with mock.patch.object(initial_inbound_sync, "r", rethink), mock.patch.object(
+        initial_inbound_sync.ldap_connector,
+        "await_connection",
+        return_value=make_directory(users),
+    ), mock.patch.object(
+        initial_inbound_sync, "connect_to_db"
+    ), mock.patch.object(
+        initial_inbound_sync, "save_sync_time"
+    ) as save_sync_time, mock.patch.multiple(
+        initial_inbound_sync,
+        USER_BASE_DN=USER_BASE_DN,
+        LDAP_SEARCH_PAGE_SIZE=page_size,
+        INITIAL_SYNC_DURABILITY=durability,
+    ):
+        initial_inbound_sync.fetch_ldap_data(data_type="user")
+    assert save_sync_time.call_count == 1
+    return rethink.inserts
+
+
+def test_initial_sync_inserts_a_page_at_a_time():
+    """Each page of the search is inserted with one query."""
+    inserts = run_initial_sync(users=25, page_size=10)
+    assert [len(documents) for documents, _ in inserts] == [10, 10, 5]
+    remote_ids = {
+        document["data"]["remote_id"]
+        for documents, _ in inserts
+        for document in documents
+    }
+    assert len(remote_ids) == 25
+    assert all(
+        document["sync_type"] == "initial" and document["data_type"] == "user"
+        for documents, _ in inserts
+        for document in documents
+    )
+
+
+def test_initial_sync_durability():
+    """Pages are inserted with the configured durability."""
+    inserts = run_initial_sync(users=5, page_size=10, durability="soft")
+    assert [durability for _, durability in inserts] == ["soft"]
+
+
+def test_insert_page_skips_unsupported_data_type():
+    """A page of an unsupported data type inserts nothing."""
+    rethink = InitialSyncRethink()
+    with mock.patch.object(initial_inbound_sync, "r", rethink):
+        inserted = initial_inbound_sync.insert_page(
+            entries=[{}], data_type="device", conn=None
+        )
+    assert inserted == 0
+    assert rethink.inserts == []
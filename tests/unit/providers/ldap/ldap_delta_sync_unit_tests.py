@@ -13,10 +13,16 @@
 # limitations under the License.
 # -----------------------------------------------------------------------------
 """Test Suite for LDAP Delta Inbound Sync."""
+from unittest import mock
 
+import ldap3
 import pytest
 
+from rbac.providers.ldap import delta_inbound_sync
 from rbac.providers.ldap.delta_inbound_sync import insert_deleted_entries
+from tests.unit.providers.ldap.fakes import DeltaSyncRethink
+
+USER_BASE_DN = "OU=Users,DC=example,DC=com"
 
 
 def test_invalid_data_type():
@@ -30,3 +36,44 @@ def test_invalid_data_type():
     data_type = "not_deleted"
     with pytest.raises(ValueError):
         insert_deleted_entries(deleted_entries, data_type)
+
+
+def make_directory(distinguished_names):
+    """A mock LDAP connection to a directory holding the given users."""
+    server = ldap3.Server("fake_server", get_info=None)
+    connection = ldap3.Connection(
+        server, user="CN=admin", password="password", client_strategy=ldap3.MOCK_SYNC
+    )
+    connection.strategy.add_entry("CN=admin", {"userPassword": "password"})
+    for dn in distinguished_names:
+        connection.strategy.add_entry(
+            dn, {"objectClass": "person", "distinguishedName": dn}
+        )
+    connection.bind()
+    return connection
+
+
+def test_fetch_ldap_deletions():
+    """Users no longer in LDAP are queued as deleted with bulk inserts."""
+    remote_ids = ["CN=user{},{}".format(index, USER_BASE_DN) for index in range(30)]
+    rethink = DeltaSyncRethink(remote_ids)
+    with mock.patch.object(delta_inbound_sync, "r", rethink), mock.patch.object(
+        delta_inbound_sync.ldap_connector,
+        "await_connection",
+        return_value=make_directory(remote_ids[5:]),
+    ), mock.patch.object(
+        delta_inbound_sync, "connect_to_db"
+    ), mock.patch.multiple(
+        delta_inbound_sync,
+        USER_BASE_DN=USER_BASE_DN,
+        GROUP_BASE_DN=USER_BASE_DN,
+        LDAP_SEARCH_PAGE_SIZE=10,
+        DELETED_ENTRIES_PER_INSERT=2,
+    ):
+        delta_inbound_sync.fetch_ldap_deletions()
+    assert [len(documents) for documents in rethink.inserts] == [2, 2, 1]
+    deleted = [document for documents in rethink.inserts for document in documents]
+    assert sorted(document["data"]["remote_id"] for document in deleted) == sorted(
+        remote_ids[:5]
+    )
+    assert {document["data_type"] for document in deleted} == {"user_deleted"}
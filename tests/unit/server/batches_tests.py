@@ -0,0 +1,231 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/server/api/batches.py"""
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from sawtooth_sdk.protobuf import client_batch_submit_pb2
+from sawtooth_sdk.protobuf import validator_pb2
+
+from rbac.server.api import batches
+from rbac.server.api.batches import BatchTracker
+from tests.unit.server.conftest import run
+
+STATUS = client_batch_submit_pb2.ClientBatchStatus
+
+
+class FakeValidator:
+    """Answers batch status requests from a dict of batch_id -> status,
+    recording the batch ids of each request."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.requests = []
+
+    async def send(self, message_type, content, timeout):  # pylint: disable=W0613
+        """Answer a CLIENT_BATCH_STATUS_REQUEST."""
+        assert message_type == validator_pb2.Message.CLIENT_BATCH_STATUS_REQUEST
+        request = client_batch_submit_pb2.ClientBatchStatusRequest()
+        request.ParseFromString(content)
+        self.requests.append(list(request.batch_ids))
+        response = client_batch_submit_pb2.ClientBatchStatusResponse(
+            status=client_batch_submit_pb2.ClientBatchStatusResponse.OK,
+            batch_statuses=[
+                STATUS(batch_id=batch_id, status=self.statuses[batch_id])
+                for batch_id in request.batch_ids
+            ],
+        )
+        return SimpleNamespace(content=response.SerializeToString())
+
+
+class FakeClock:
+    """A clock the test moves by hand."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_poll_checks_outstanding_batches_together():
+    """One status request covers every pending batch, and finished batches
+    are not polled again."""
+    validator = FakeValidator({"a": STATUS.COMMITTED, "b": STATUS.PENDING})
+    tracker = BatchTracker()
+    tracker.track(["a", "b"])
+    run(tracker.poll(validator, 10))
+    assert validator.requests == [["a", "b"]]
+    assert tracker.get("a")["status"] == "COMMITTED"
+    assert tracker.get("b")["status"] == "PENDING"
+
+    validator.statuses["b"] = STATUS.INVALID
+    run(tracker.poll(validator, 10))
+    assert validator.requests[-1] == ["b"]
+    assert tracker.get("b")["status"] == "INVALID"
+    assert tracker.pending() == []
+
+
+def test_waiters_wake_on_change():
+    """Waiting for a change returns once a poll changes a batch's status."""
+    validator = FakeValidator({"a": STATUS.COMMITTED})
+    tracker = BatchTracker()
+    tracker.track(["a"])
+
+    async def wait_and_poll():
+        waiter = asyncio.ensure_future(tracker.wait_for_change())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        await tracker.poll(validator, 10)
+        await asyncio.wait_for(waiter, 1)
+
+    run(wait_and_poll())
+
+
+def test_batches_expire():
+    """Batches are forgotten once the retention window has passed."""
+    clock = FakeClock()
+    tracker = BatchTracker(retention=60, clock=clock)
+    tracker.track(["a"])
+    clock.now += 30
+    tracker.track(["b"])
+    clock.now += 30
+    tracker.expire()
+    assert tracker.get("a") is None
+    assert tracker.get("b") is not None
+
+
+class SocketClosed(Exception):
+    """Raised by FakeSocket once it has no more messages to receive."""
+
+
+class FakeSocket:
+    """A web socket receiving the given messages, recording those sent."""
+
+    def __init__(self, received=()):
+        self.received = list(received)
+        self.sent = []
+
+    async def recv(self):
+        """Receive the next message."""
+        if not self.received:
+            raise SocketClosed()
+        return json.dumps(self.received.pop(0))
+
+    async def send(self, message):
+        """Record a message."""
+        self.sent.append(json.loads(message))
+
+    def statuses(self):
+        """The batch statuses sent."""
+        return [message["batch"]["status"] for message in self.sent]
+
+
+def make_request(validator=None, token=None):
+    """A request to a worker talking to the given validator."""
+    config = SimpleNamespace(
+        VAL_CONN=validator, TIMEOUT=10, SECRET_KEY="secret", BATCH_FEED_MAX_IDS=2
+    )
+    return SimpleNamespace(app=SimpleNamespace(config=config), token=token)
+
+
+def test_feed_reports_expired_batch_as_unknown():
+    """A feed waiting on a pending batch wakes when the batch expires and
+    reports it as unknown."""
+    clock = FakeClock()
+    tracker = BatchTracker(retention=60, clock=clock)
+    tracker.track(["a"])
+    web_socket = FakeSocket()
+
+    async def feed_and_expire():
+        feed = asyncio.ensure_future(
+            batches.batch_status_feed(make_request(), web_socket, ["a"])
+        )
+        await asyncio.sleep(0)
+        assert web_socket.statuses() == ["PENDING"]
+        clock.now += 61
+        tracker.expire()
+        await asyncio.wait_for(feed, 1)
+
+    with mock.patch.object(batches, "TRACKER", tracker):
+        run(feed_and_expire())
+    assert web_socket.statuses() == ["PENDING", "UNKNOWN"]
+
+
+def test_feed_looks_up_untracked_batches_once():
+    """Batches this worker did not submit are asked about in one request
+    and are not added to its tracker."""
+    validator = FakeValidator({"x": STATUS.COMMITTED, "y": STATUS.PENDING})
+    tracker = BatchTracker()
+    web_socket = FakeSocket()
+    with mock.patch.object(batches, "TRACKER", tracker):
+        run(
+            asyncio.wait_for(
+                batches.batch_status_feed(
+                    make_request(validator), web_socket, ["x", "y"]
+                ),
+                1,
+            )
+        )
+    assert validator.requests == [["x", "y"]]
+    assert web_socket.statuses() == ["COMMITTED", "PENDING"]
+    assert tracker.get("x") is None and tracker.get("y") is None
+
+
+def test_feed_requires_a_token():
+    """A feed without a token is refused before any batch is looked up."""
+    validator = FakeValidator({})
+    web_socket = FakeSocket([{"batch_ids": ["a"]}])
+    run(batches.batch_feed(make_request(validator), web_socket))
+    assert web_socket.sent[0]["code"] == 401
+    assert validator.requests == []
+
+
+def test_feed_caps_batch_ids():
+    """A message naming more batches than allowed is refused, and the feed
+    goes on with the next message."""
+    validator = FakeValidator({"a": STATUS.COMMITTED})
+    web_socket = FakeSocket(
+        [
+            {"batch_ids": ["a", "b", "c"], "token": "token"},
+            {"batch_ids": ["a"], "token": "token"},
+        ]
+    )
+
+    async def verify_token(secret_key, token):  # pylint: disable=unused-argument
+        return {}, {}
+
+    with mock.patch.object(batches, "verify_token", verify_token):
+        with pytest.raises(SocketClosed):
+            run(batches.batch_feed(make_request(validator), web_socket))
+    assert web_socket.sent[0]["code"] == 400
+    assert web_socket.sent[1]["batch"]["status"] == "COMMITTED"
+    assert validator.requests == [["a"]]
+
+
+def test_wants_async():
+    """Asynchronous handling is requested by query string or Prefer header."""
+
+    def request(args=None, headers=None):
+        return SimpleNamespace(args=args or {}, headers=headers or {})
+
+    assert batches.wants_async(request(args={"async": "true"}))
+    assert batches.wants_async(request(args={"async": "1"}))
+    assert batches.wants_async(request(headers={"Prefer": "respond-async"}))
+    assert not batches.wants_async(request(args={"async": "false"}))
+    assert not batches.wants_async(request())
@@ -0,0 +1,114 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/server/db/connection_pool.py"""
+import pytest
+
+from rbac.server.db.connection_pool import ConnectionPool, _PoolEntry
+from tests.unit.server.conftest import run
+
+
+class FakeConnection:
+    """Stands in for an asyncio RethinkDB connection."""
+
+    def __init__(self):
+        self.open = True
+
+    def is_open(self):
+        """True until the test kills the connection."""
+        return self.open
+
+    async def close(self, noreply_wait=False):  # pylint: disable=unused-argument
+        """Mark the connection as closed."""
+        self.open = False
+
+
+class FakePool(ConnectionPool):
+    """ConnectionPool that opens FakeConnections instead of sockets."""
+
+    async def _connect(self):
+        self._stats["opened"] += 1
+        return _PoolEntry(FakeConnection())
+
+
+def test_pool_reuses_released_connections():
+    """A closed lease is handed out again instead of opening a new socket."""
+
+    async def scenario():
+        pool = await FakePool("rethink", 28015, "rbac", 1, 3, 1, 0).open()
+        first = await pool.acquire()
+        raw = first.raw
+        first.close()
+        second = await pool.acquire()
+        assert second.raw is raw
+        second.close()
+        return pool.metrics()
+
+    metrics = run(scenario())
+    assert metrics["opened"] == 1
+    assert metrics["acquired"] == 2
+    assert metrics["leases"] == 0
+
+
+def test_pool_grows_to_max_then_shares():
+    """Busy connections trigger growth up to max_size, then sharing."""
+
+    async def scenario():
+        pool = await FakePool("rethink", 28015, "rbac", 1, 2, 1, 0).open()
+        leases = [await pool.acquire() for _ in range(3)]
+        return pool.metrics(), leases
+
+    metrics, leases = run(scenario())
+    assert metrics["size"] == 2
+    assert metrics["shared"] == 1
+    assert metrics["leases"] == 3
+    assert len({lease.raw for lease in leases}) == 2
+
+
+def test_pool_discards_dead_connections():
+    """A connection that died while leased is replaced on the next acquire."""
+
+    async def scenario():
+        pool = await FakePool("rethink", 28015, "rbac", 1, 2, 1, 0).open()
+        lease = await pool.acquire()
+        dead = lease.raw
+        dead.open = False
+        lease.close()
+        replacement = await pool.acquire()
+        return pool.metrics(), dead, replacement.raw
+
+    metrics, dead, replacement = run(scenario())
+    assert replacement is not dead
+    assert metrics["discarded"] == 1
+    assert metrics["size"] == 1
+
+
+def test_reconnect_after_close_releases_once():
+    """close/reconnect/close leaves no outstanding lease."""
+
+    async def scenario():
+        pool = await FakePool("rethink", 28015, "rbac", 1, 1, 1, 0).open()
+        with await pool.acquire() as conn:
+            conn.close()
+            conn.reconnect(noreply_wait=False)
+        conn.close()
+        return pool.metrics()
+
+    assert run(scenario())["leases"] == 0
+
+
+def test_invalid_pool_size():
+    """min_size may not exceed max_size."""
+    with pytest.raises(ValueError):
+        FakePool("rethink", 28015, "rbac", min_size=5, max_size=2)
@@ -0,0 +1,181 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/server/db/org_hierarchy_query.py"""
+import asyncio
+from unittest import mock
+
+import pytest
+
+from rbac.server.api import proposals
+from rbac.server.db import org_hierarchy_query
+from rbac.server.db.org_hierarchy_query import moved_users
+
+MOVED_USERS_CASES = [
+    ([{"old_val": None, "new_val": {"next_id": "a", "manager_id": "b"}}], ["a"]),
+    ([{"old_val": {"next_id": "a", "manager_id": "b"}, "new_val": None}], ["a"]),
+    (
+        [
+            {
+                "old_val": {"next_id": "a", "manager_id": "b", "name": "x"},
+                "new_val": {"next_id": "a", "manager_id": "b", "name": "y"},
+            }
+        ],
+        [],
+    ),
+    (
+        [
+            {
+                "old_val": {"next_id": "a", "manager_id": "b"},
+                "new_val": {"next_id": "a", "manager_id": "c"},
+            },
+            {
+                "old_val": {"next_id": "d", "remote_id": ""},
+                "new_val": {"next_id": "d", "remote_id": "CN=d"},
+            },
+        ],
+        ["a", "d"],
+    ),
+]
+
+
+@pytest.mark.parametrize("changes,expected", MOVED_USERS_CASES)
+def test_moved_users(changes, expected):
+    """Only new, deleted or re-parented users need their chains refreshed."""
+    assert moved_users(changes) == expected
+
+
+class FakeQuery:
+    """A query whose run() returns canned rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def run(self, conn):  # pylint: disable=unused-argument
+        """Return the canned rows."""
+        return self.rows
+
+
+def test_compile_proposal_resources_batches_queries():
+    """A page of proposals resolves approvers with one query per table,
+    one for NextAdmins and one for every manager chain."""
+    relationships = {
+        "role_owners": [
+            {"role_id": "role1", "identifiers": ["owner1"]},
+            {"role_id": "role2", "identifiers": ["owner2", "owner1"]},
+        ]
+    }
+    chains = {"owner1": ["manager1", "manager2"], "owner2": ["manager1"]}
+    calls = {"relationships": 0, "chains": 0, "admins": 0}
+
+    def fetch_relationships_of(table, index, identifiers):
+        calls["relationships"] += 1
+        assert index == "role_id"
+        assert sorted(identifiers) == ["role1", "role2"]
+        return FakeQuery(relationships[table])
+
+    async def fetch_manager_chains(conn, next_ids):  # pylint: disable=unused-argument
+        calls["chains"] += 1
+        assert sorted(next_ids) == ["owner1", "owner2"]
+        return chains
+
+    async def get_next_admins(conn):  # pylint: disable=unused-argument
+        calls["admins"] += 1
+        return ["admin1"]
+
+    page = [
+        {"type": "ADD_ROLE_MEMBER", "object": "role1"},
+        {"type": "ADD_ROLE_OWNER", "object": "role2"},
+        {"type": "ADD_ROLE_MEMBER", "object": "role1"},
+        {"type": "UPDATE_USER_MANAGER", "object": "user1"},
+    ]
+    with mock.patch.multiple(
+        proposals,
+        fetch_relationships_of=fetch_relationships_of,
+        fetch_manager_chains=fetch_manager_chains,
+        get_next_admins=get_next_admins,
+    ):
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(
+                proposals.compile_proposal_resources(mock.MagicMock(), page)
+            )
+        finally:
+            loop.close()
+
+    assert calls == {"relationships": 1, "chains": 1, "admins": 1}
+    assert result[0]["approvers"] == ["manager1", "manager2", "owner1"]
+    assert result[1]["approvers"] == ["manager1", "manager2", "owner2", "owner1"]
+    assert result[2]["approvers"] == ["manager1", "manager2", "owner1"]
+    assert result[3]["approvers"] == ["admin1"]
+
+
+class RecordingQuery:
+    """Records the chain of a query, and the chain in the log when run."""
+
+    def __init__(self, log, chain, result=None):
+        self.log = log
+        self.chain = chain
+        self.result = result
+
+    def __getattr__(self, name):
+        def chained(*args, **kwargs):  # pylint: disable=unused-argument
+            return RecordingQuery(
+                self.log, self.chain + ((name,) + args[:1],), self.result
+            )
+
+        return chained
+
+    def run(self, conn):  # pylint: disable=unused-argument
+        """Log the chain."""
+        self.log.append(self.chain)
+        return self.result
+
+
+class RecordingRethink:
+    """Stands in for the rethinkdb module, logging the queries run."""
+
+    def __init__(self, result=None):
+        self.log = []
+        self.result = result
+
+    def table(self, name):
+        """Start a query."""
+        return RecordingQuery(self.log, (name,), self.result)
+
+
+def test_rebuild_marks_the_hierarchy_complete_last():
+    """A rebuild unmarks the table first and marks it complete only after
+    every chain has been rewritten."""
+    rethink = RecordingRethink()
+    with mock.patch.object(org_hierarchy_query, "r", rethink):
+        org_hierarchy_query.rebuild_org_hierarchy(mock.Mock())
+    marker = org_hierarchy_query.COMPLETE_MARKER
+    assert [[step[0] for step in chain[1:]] for chain in rethink.log] == [
+        ["get", "delete"],
+        ["filter", "delete"],
+        ["has_fields", "get_field", "for_each"],
+        ["insert"],
+    ]
+    assert rethink.log[0][1] == ("get", marker)
+    assert rethink.log[-1][1] == ("insert", {"next_id": marker})
+
+
+@pytest.mark.parametrize("complete,queries", [(True, 1), (False, 5)])
+def test_ensure_rebuilds_an_incomplete_hierarchy(complete, queries):
+    """The hierarchy is rebuilt at start up only if no rebuild completed."""
+    rethink = RecordingRethink(result=complete)
+    with mock.patch.object(org_hierarchy_query, "r", rethink):
+        org_hierarchy_query.ensure_org_hierarchy(mock.Mock())
+    assert len(rethink.log) == queries
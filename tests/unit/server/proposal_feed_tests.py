@@ -0,0 +1,133 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/server/api/feed.py"""
+import asyncio
+import json
+from unittest import mock
+
+from rbac.server.api import feed
+from rbac.server.api.feed import ProposalHub
+from tests.unit.server.conftest import run
+
+
+class FakeSocket:
+    """Stands in for a websocket, recording what is sent to it."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = asyncio.get_event_loop().create_future()
+
+    async def send(self, message):
+        """Record a message."""
+        self.sent.append(json.loads(message))
+
+    async def recv(self):
+        """Wait until the test closes the socket."""
+        await self.closed
+        raise ConnectionError("closed")
+
+
+async def idle(self):  # pylint: disable=unused-argument
+    """Stands in for ProposalHub._run."""
+    await asyncio.sleep(3600)
+
+
+def proposal(status="OPEN", opener="opener", approvers=("approver",)):
+    """A compiled proposal resource."""
+    return {
+        "id": "proposal",
+        "status": status,
+        "opener": opener,
+        "approvers": list(approvers),
+    }
+
+
+def test_publish_fans_out_by_next_id():
+    """Approvers of an open proposal and its opener get it; others don't."""
+
+    async def publish():
+        hub = ProposalHub()
+        approver = hub.subscribe("approver")
+        opener = hub.subscribe("opener")
+        other = hub.subscribe("other")
+        hub.publish(proposal())
+        hub.publish(proposal(status="CONFIRMED"))
+        received = [
+            [json.loads(subscriber.queue.get_nowait()) for _ in range(size)]
+            for subscriber, size in (
+                (approver, approver.queue.qsize()),
+                (opener, opener.queue.qsize()),
+                (other, other.queue.qsize()),
+            )
+        ]
+        for subscriber in (approver, opener, other):
+            hub.unsubscribe(subscriber)
+        return received
+
+    with mock.patch.object(ProposalHub, "_run", idle):
+        approver, opener, other = run(publish())
+    assert [list(message) for message in approver] == [["open_proposal"]]
+    assert [list(message) for message in opener] == [
+        ["user_proposal"],
+        ["user_proposal"],
+    ]
+    assert other == []
+
+
+def test_slow_subscriber_is_dropped():
+    """A subscriber that stops reading is dropped once its queue is full,
+    without holding up the others."""
+
+    async def publish():
+        hub = ProposalHub()
+        slow = feed.Subscriber("approver", queue_size=2)
+        hub.subscribers["approver"] = {slow}
+        fast = hub.subscribe("approver")
+        for _ in range(3):
+            hub.publish(proposal())
+            fast.queue.get_nowait()
+        assert slow.dropped
+        assert slow.queue.get_nowait() is None
+        assert hub.subscribers["approver"] == {fast}
+        hub.unsubscribe(fast)
+
+    with mock.patch.object(ProposalHub, "_run", idle):
+        run(publish())
+
+
+def test_proposal_feed_pumps_until_socket_closes():
+    """A socket is sent its user's proposals and unsubscribed when closed."""
+
+    async def pump():
+        socket = FakeSocket()
+        task = asyncio.ensure_future(
+            feed.proposal_feed(socket, {"next_id": "approver"})
+        )
+        await asyncio.sleep(0)
+        feed.HUB.publish(proposal())
+        await asyncio.sleep(0.01)
+        socket.closed.set_result(None)
+        try:
+            await task
+        except ConnectionError:
+            pass
+        return socket.sent
+
+    with mock.patch.object(feed, "HUB", ProposalHub()), mock.patch.object(
+        ProposalHub, "_run", idle
+    ):
+        sent = run(pump())
+        assert not feed.HUB.subscribers
+    assert [list(message) for message in sent] == [["open_proposal"]]
@@ -0,0 +1,169 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for coalesced proposal updates in rbac/server/api/proposals.py"""
+from types import SimpleNamespace
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+from sawtooth_sdk.protobuf import client_batch_submit_pb2
+from sawtooth_sdk.protobuf import validator_pb2
+
+from rbac.common.crypto.keys import Key
+from rbac.server.api import proposals
+from rbac.server.api import utils
+from rbac.server.api.errors import ApiBadRequest, ApiNotFound, ApiUnauthorized
+from tests.unit.server.conftest import run
+
+STATUS = client_batch_submit_pb2.ClientBatchStatus
+TXN_USER_ID = str(uuid4())
+
+
+class FakeValidator:
+    """Accepts every batch and answers status requests with the given
+    statuses, in batch order, recording each request's message type."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.messages = []
+
+    async def send(self, message_type, content, timeout):  # pylint: disable=W0613
+        """Answer a batch submit or batch status request."""
+        self.messages.append(message_type)
+        if message_type == validator_pb2.Message.CLIENT_BATCH_SUBMIT_REQUEST:
+            response = client_batch_submit_pb2.ClientBatchSubmitResponse(
+                status=client_batch_submit_pb2.ClientBatchSubmitResponse.OK
+            )
+        else:
+            request = client_batch_submit_pb2.ClientBatchStatusRequest()
+            request.ParseFromString(content)
+            response = client_batch_submit_pb2.ClientBatchStatusResponse(
+                status=client_batch_submit_pb2.ClientBatchStatusResponse.OK,
+                batch_statuses=[
+                    STATUS(
+                        batch_id=batch_id,
+                        status=status,
+                        invalid_transactions=[
+                            STATUS.InvalidTransaction(message="rejected")
+                        ]
+                        if status == STATUS.INVALID
+                        else [],
+                    )
+                    for batch_id, status in zip(request.batch_ids, self.statuses)
+                ],
+            )
+        return SimpleNamespace(content=response.SerializeToString())
+
+
+def proposal_resource(proposal_id, approvers):
+    """A compiled ADD_ROLE_MEMBER proposal resource."""
+    return {
+        "id": proposal_id,
+        "type": "ADD_ROLE_MEMBER",
+        "object": str(uuid4()),
+        "target": str(uuid4()),
+        "approvers": approvers,
+    }
+
+
+def make_updates(resources, proposal_ids=None, conn=None):
+    """Run make_proposal_updates over canned proposal resources, recording
+    the ids of each proposal query."""
+    by_id = {resource["id"]: resource for resource in resources}
+    queries = []
+
+    async def fetch_proposal_resources_by_ids(conn, proposal_ids):
+        # pylint: disable=unused-argument
+        queries.append(list(proposal_ids))
+        return {
+            proposal_id: by_id[proposal_id]
+            for proposal_id in proposal_ids
+            if proposal_id in by_id
+        }
+
+    async def compile_proposal_resources(conn, proposal_resources):
+        # pylint: disable=unused-argument
+        return proposal_resources
+
+    with mock.patch.object(
+        proposals.proposals_query,
+        "fetch_proposal_resources_by_ids",
+        fetch_proposal_resources_by_ids,
+    ), mock.patch.object(
+        proposals, "compile_proposal_resources", compile_proposal_resources
+    ):
+        batch_list, updated = run(
+            proposals.make_proposal_updates(
+                conn,
+                list(by_id) if proposal_ids is None else proposal_ids,
+                "APPROVED",
+                "reason",
+                Key(),
+                TXN_USER_ID,
+            )
+        )
+    assert len(queries) == 1
+    return batch_list, updated
+
+
+def test_proposal_updates_share_one_batch_list():
+    """Every proposal update is a batch of the same batch list."""
+    resources = [proposal_resource(str(uuid4()), [TXN_USER_ID]) for _ in range(50)]
+    batch_list, updated = make_updates(resources)
+    assert len(batch_list.batches) == 50
+    assert updated == resources
+
+
+def test_missing_proposal_is_not_found():
+    """Updating a proposal that does not exist fails and closes the
+    connection."""
+    conn = mock.Mock()
+    resource = proposal_resource(str(uuid4()), [TXN_USER_ID])
+    with pytest.raises(ApiNotFound):
+        make_updates([resource], [resource["id"], "missing"], conn)
+    conn.close.assert_called_once_with()
+
+
+def test_proposal_updates_require_approver():
+    """No batch list is built if the user may not update every proposal."""
+    resources = [
+        proposal_resource(str(uuid4()), [TXN_USER_ID]),
+        proposal_resource(str(uuid4()), []),
+    ]
+    with pytest.raises(ApiUnauthorized):
+        make_updates(resources)
+
+
+def test_send_waits_on_all_batches_at_once():
+    """A batch list costs one submit and one status request."""
+    batch_list, _ = make_updates(
+        [proposal_resource(str(uuid4()), [TXN_USER_ID]) for _ in range(3)]
+    )
+    validator = FakeValidator([STATUS.COMMITTED] * 3)
+    assert run(utils.send(validator, batch_list, 10)) == STATUS.COMMITTED
+    assert validator.messages == [
+        validator_pb2.Message.CLIENT_BATCH_SUBMIT_REQUEST,
+        validator_pb2.Message.CLIENT_BATCH_STATUS_REQUEST,
+    ]
+
+
+def test_send_reports_any_invalid_batch():
+    """An invalid batch anywhere in the list fails the send."""
+    batch_list, _ = make_updates(
+        [proposal_resource(str(uuid4()), [TXN_USER_ID]) for _ in range(3)]
+    )
+    validator = FakeValidator([STATUS.COMMITTED, STATUS.INVALID, STATUS.COMMITTED])
+    with pytest.raises(ApiBadRequest):
+        run(utils.send(validator, batch_list, 10))
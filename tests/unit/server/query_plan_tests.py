@@ -0,0 +1,289 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Query plan regression tests for hot RethinkDB lookups.
+
+Each hot path is run against a connection that records the queries it is
+given instead of sending them. A table that is read other than through a
+primary key or secondary index lookup is a full table scan and fails the
+test.
+"""
+from unittest import mock
+
+import pytest
+from rethinkdb import ast
+
+from rbac.server.blockchain_transactions import role_transaction
+from rbac.server.db import auth_query
+from rbac.server.db import proposals_query
+from rbac.server.db import relationships_query
+from rbac.server.db import roles_query
+from rbac.server.db import users_query
+from tests.unit.server.conftest import run
+
+NEXT_ID = "b1a0e2c4-3b8f-4d6e-9f11-0c2d3e4f5a6b"
+ROLE_ID = "158fa3c5-5d73-4dbf-9426-84e8b090efd6"
+
+# Terms that read their first argument, a table, through an index
+INDEXED_READS = (ast.Get, ast.GetAll, ast.Between, ast.Insert)
+
+
+class RecordingConnection:
+    """Stands in for an asyncio RethinkDB connection, recording each query
+    and answering it with the next canned result (or an empty list)."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.queries = []
+
+    def _start(self, term, **global_optargs):  # pylint: disable=unused-argument
+        self.queries.append(term)
+        return self._next_result()
+
+    async def _next_result(self):
+        return self.results.pop(0) if self.results else []
+
+    def close(self, *args, **kwargs):  # pylint: disable=unused-argument
+        """Nothing to close."""
+
+
+def table_name(table):
+    """The name of a table term."""
+    return table._args[-1].data  # pylint: disable=protected-access
+
+
+def table_scans(term, parent=None, position=None):
+    """List the names of tables a query reads without an index."""
+    scans = []
+    if isinstance(term, ast.Table):
+        indexed = (
+            (isinstance(parent, INDEXED_READS) and position == 0)
+            or (isinstance(parent, ast.EqJoin) and position == 1)
+            or (
+                isinstance(parent, ast.OrderBy)
+                and position == 0
+                and "index" in parent.optargs
+            )
+        )
+        if not indexed:
+            scans.append(table_name(term))
+    for child_position, child in enumerate(term._args):  # pylint: disable=W0212
+        scans.extend(table_scans(child, term, child_position))
+    for child in term.optargs.values():
+        scans.extend(table_scans(child, term))
+    return scans
+
+
+def recorded(results, call, patch=None):
+    """Run a hot path against a RecordingConnection and return its queries.
+
+    Args:
+        results:
+            list: canned results, one per query, in order
+        call:
+            function: takes the connection and returns a coroutine
+        patch:
+            str: a create_connection to replace with the recording one
+    """
+    conn = RecordingConnection(*results)
+
+    async def create_connection():
+        return conn
+
+    if patch:
+        with mock.patch(patch, create_connection):
+            run(call(conn))
+    else:
+        run(call(conn))
+    return conn.queries
+
+
+HOT_PATHS = [
+    (
+        "get_auth_by_next_id",
+        [{"next_id": NEXT_ID}],
+        lambda conn: auth_query.get_auth_by_next_id(NEXT_ID),
+        "rbac.server.db.auth_query.create_connection",
+    ),
+    (
+        "get_user_map_by_next_id",
+        [],
+        lambda conn: auth_query.get_user_map_by_next_id(NEXT_ID),
+        "rbac.server.db.auth_query.create_connection",
+    ),
+    (
+        "fetch_user_resource",
+        [[{}]],
+        lambda conn: users_query.fetch_user_resource(conn, NEXT_ID),
+        None,
+    ),
+    (
+        "fetch_user_resource_summary",
+        [[{}]],
+        lambda conn: users_query.fetch_user_resource_summary(conn, NEXT_ID),
+        None,
+    ),
+    (
+        "fetch_peers",
+        [[{"next_id": NEXT_ID, "manager_id": "manager"}], []],
+        lambda conn: users_query.fetch_peers(conn, NEXT_ID),
+        None,
+    ),
+    (
+        "fetch_manager_chain",
+        [[{"next_id": NEXT_ID, "manager_id": "manager"}], []],
+        lambda conn: users_query.fetch_manager_chain(conn, NEXT_ID),
+        None,
+    ),
+    (
+        "get_next_admins",
+        [[ROLE_ID], []],
+        lambda conn: users_query.get_next_admins(conn),
+        None,
+    ),
+    (
+        "does_role_exist",
+        [1],
+        lambda conn: roles_query.does_role_exist(conn, ROLE_ID),
+        None,
+    ),
+    (
+        "fetch_role_owners",
+        [],
+        lambda conn: roles_query.fetch_role_owners(conn, ROLE_ID),
+        None,
+    ),
+    (
+        "fetch_role_resource",
+        [[{}]],
+        lambda conn: roles_query.fetch_role_resource(conn, ROLE_ID),
+        None,
+    ),
+    (
+        "get_role_membership",
+        [],
+        lambda conn: roles_query.get_role_membership(conn, NEXT_ID, ROLE_ID),
+        None,
+    ),
+    (
+        "fetch_open_proposals_by_role",
+        [],
+        lambda conn: proposals_query.fetch_open_proposals_by_role(conn, ROLE_ID),
+        None,
+    ),
+    (
+        "create_del_mmbr_by_role_txns",
+        [],
+        lambda conn: role_transaction.create_del_mmbr_by_role_txns(None, ROLE_ID, []),
+        "rbac.server.blockchain_transactions.role_transaction.create_connection",
+    ),
+    (
+        "create_del_mmbr_by_user_txns",
+        [],
+        lambda conn: role_transaction.create_del_mmbr_by_user_txns(None, NEXT_ID, []),
+        "rbac.server.blockchain_transactions.role_transaction.create_connection",
+    ),
+    (
+        "create_del_ownr_by_role_txns",
+        [],
+        lambda conn: role_transaction.create_del_ownr_by_role_txns(None, ROLE_ID, []),
+        "rbac.server.blockchain_transactions.role_transaction.create_connection",
+    ),
+    (
+        "create_del_ownr_by_user_txns",
+        [],
+        lambda conn: role_transaction.create_del_ownr_by_user_txns(None, NEXT_ID, []),
+        "rbac.server.blockchain_transactions.role_transaction.create_connection",
+    ),
+    (
+        "create_del_admin_by_role_txns",
+        [],
+        lambda conn: role_transaction.create_del_admin_by_role_txns(
+            None, ROLE_ID, []
+        ),
+        "rbac.server.blockchain_transactions.role_transaction.create_connection",
+    ),
+    (
+        "create_del_admin_by_user_txns",
+        [],
+        lambda conn: role_transaction.create_del_admin_by_user_txns(
+            None, NEXT_ID, []
+        ),
+        "rbac.server.blockchain_transactions.role_transaction.create_connection",
+    ),
+    (
+        "create_del_relationship_txns",
+        [{"role_owners": [], "role_admins": [], "role_members": []}],
+        lambda conn: role_transaction.create_del_relationship_txns(
+            None, "related_id", NEXT_ID, []
+        ),
+        "rbac.server.blockchain_transactions.role_transaction.create_connection",
+    ),
+]
+
+QUERY_BUILDERS = [
+    (
+        "fetch_relationship_query",
+        lambda: relationships_query.fetch_relationship_query("members", ROLE_ID),
+    ),
+    (
+        "fetch_user_ids_by_manager",
+        lambda: users_query.fetch_user_ids_by_manager(NEXT_ID),
+    ),
+    ("fetch_expired_roles", lambda: roles_query.fetch_expired_roles(NEXT_ID)),
+    (
+        "fetch_open_proposals_by_opener",
+        lambda: proposals_query.fetch_open_proposals_by_opener(NEXT_ID),
+    ),
+    (
+        "get_open_proposals_by_approver",
+        lambda: proposals_query.get_open_proposals_by_approver(NEXT_ID),
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "name, results, call, patch", HOT_PATHS, ids=[path[0] for path in HOT_PATHS]
+)
+def test_hot_path_uses_indexes(name, results, call, patch):
+    """Hot lookups read every table through an index."""
+    queries = recorded(results, call, patch)
+    assert queries, "{} ran no queries".format(name)
+    for query in queries:
+        assert table_scans(query) == []
+
+
+@pytest.mark.parametrize(
+    "name, build", QUERY_BUILDERS, ids=[builder[0] for builder in QUERY_BUILDERS]
+)
+def test_query_builder_uses_indexes(name, build):  # pylint: disable=unused-argument
+    """Hot subqueries read every table through an index."""
+    assert table_scans(build()) == []
+
+
+def test_table_scans_detects_filter():
+    """A filter straight over a table is reported as a scan, including one
+    nested in a subquery."""
+    scan = (
+        ast.Table("users")
+        .get_all(NEXT_ID, index="next_id")
+        .merge(
+            lambda user: {
+                "peers": ast.Table("users")
+                .filter({"manager_id": user["manager_id"]})
+                .coerce_to("array")
+            }
+        )
+    )
+    assert table_scans(scan) == ["users"]
@@ -0,0 +1,71 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/server/api/signer_cache.py"""
+from unittest import mock
+
+from rbac.common.crypto.keys import Key
+from rbac.common.crypto.secrets import encrypt_private_key
+from rbac.server.api import signer_cache
+from rbac.server.api.signer_cache import SignerCache
+
+AES_KEY = "1111111111111111111111111111111111111111111111111111111111111111"
+
+
+class FakeClock:
+    """A clock the test moves by hand."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_signer_decrypts_once():
+    """A cached signer is reused until the user's encrypted key changes."""
+    key = Key()
+    encrypted = encrypt_private_key(AES_KEY, key.public_key, key.private_key_bytes)
+    with mock.patch.object(signer_cache, "SIGNER_CACHE", SignerCache()) as cache:
+        first = signer_cache.get_signer(AES_KEY, "a", encrypted)
+        second = signer_cache.get_signer(AES_KEY, "a", encrypted)
+        assert first is second
+        assert first.public_key == key.public_key
+        assert cache.get("a", b"rotated") is None
+    assert cache.metrics()["hits"] == 1
+
+
+def test_signers_expire():
+    """Signers are dropped once their TTL has passed."""
+    clock = FakeClock()
+    cache = SignerCache(ttl=60, clock=clock)
+    cache.put("a", b"encrypted", Key().private_key_bytes)
+    clock.now += 59
+    assert cache.get("a", b"encrypted") is not None
+    clock.now += 1
+    assert cache.get("a", b"encrypted") is None
+
+
+def test_evicted_secrets_are_zeroed():
+    """Dropping a signer overwrites its decrypted key bytes."""
+    cache = SignerCache(max_size=1)
+    cache.put("a", b"encrypted", Key().private_key_bytes)
+    # pylint: disable=protected-access
+    entry = cache._entries["a"]
+    cache.put("b", b"encrypted", Key().private_key_bytes)
+    assert entry.secret == bytearray(32)
+    assert entry.key is None
+    assert cache.metrics()["evictions"] == 1
+    cache.invalidate("b")
+    assert cache.metrics()["size"] == 0
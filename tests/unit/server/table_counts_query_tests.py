@@ -0,0 +1,34 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/server/db/table_counts_query.py"""
+import pytest
+
+from rbac.server.db.table_counts_query import is_count_fresh
+
+FRESHNESS_CASES = [
+    (None, "users", 10, False),
+    ({"count": 5, "block_num": 10}, "users", None, False),
+    ({"count": 5, "block_num": 10}, "users", 10, True),
+    ({"count": 5, "block_num": 11}, "users", 10, True),
+    ({"count": 5, "block_num": 9}, "users", 10, False),
+    ({"count": 11, "block_num": 10}, "blocks", 10, True),
+    ({"count": 12, "block_num": 11}, "blocks", 10, False),
+]
+
+
+@pytest.mark.parametrize("cached,table,head_block_num,expected", FRESHNESS_CASES)
+def test_is_count_fresh(cached, table, head_block_num, expected):
+    """Cached counts are only used when they cover the requested head block."""
+    assert is_count_fresh(cached, table, head_block_num) is expected
@@ -0,0 +1,106 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for rbac/server/api/token_cache.py"""
+from unittest import mock
+
+import pytest
+from itsdangerous import BadSignature
+
+from rbac.common.crypto.secrets import generate_api_key
+from rbac.server.api import token_cache
+from rbac.server.api.token_cache import TokenCache
+from tests.unit.server.conftest import run
+
+SECRET_KEY = "ABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890"
+
+
+class FakeClock:
+    """A clock the test moves by hand."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_with_ttl_or_token():
+    """An entry lasts until the earlier of the TTL and the token expiry."""
+    clock = FakeClock()
+    cache = TokenCache(ttl=60, clock=clock)
+    cache.put("long", {"id": "a"}, {"next_id": "a"}, token_expires_at=clock.now + 600)
+    cache.put("short", {"id": "a"}, {"next_id": "a"}, token_expires_at=clock.now + 10)
+    assert cache.get("long") == ({"id": "a"}, {"next_id": "a"})
+    assert cache.get("short") is not None
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("long") is not None
+    clock.now += 50
+    assert cache.get("long") is None
+    assert cache.metrics()["size"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    """The cache never holds more than max_size tokens."""
+    cache = TokenCache(max_size=2)
+    cache.put("one", {}, {"next_id": "a"})
+    cache.put("two", {}, {"next_id": "b"})
+    cache.get("one")
+    cache.put("three", {}, {"next_id": "c"})
+    assert cache.get("two") is None
+    assert cache.get("one") is not None
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_invalidate_drops_every_token_of_a_user():
+    """Invalidating a user drops all of their tokens and no one else's."""
+    cache = TokenCache()
+    cache.put("one", {}, {"next_id": "a"})
+    cache.put("two", {}, {"next_id": "a"})
+    cache.put("three", {}, {"next_id": "b"})
+    cache.invalidate("a")
+    assert cache.get("one") is None
+    assert cache.get("two") is None
+    assert cache.get("three") is not None
+
+
+def test_verify_token_looks_up_auth_once():
+    """A warm token is answered without verifying or querying again."""
+    token = generate_api_key(SECRET_KEY, "a")
+    lookups = []
+
+    async def get_auth_by_next_id(next_id):
+        lookups.append(next_id)
+        return {"next_id": next_id}
+
+    with mock.patch.object(token_cache, "TOKEN_CACHE", TokenCache()), mock.patch(
+        "rbac.server.api.token_cache.get_auth_by_next_id", get_auth_by_next_id
+    ):
+        first = run(token_cache.verify_token(SECRET_KEY, token))
+        second = run(token_cache.verify_token(SECRET_KEY, token))
+        token_cache.invalidate("a")
+        run(token_cache.verify_token(SECRET_KEY, token))
+    assert first == second == ({"id": "a"}, {"next_id": "a"})
+    assert lookups == ["a", "a"]
+
+
+def test_verify_token_rejects_bad_signature():
+    """Tokens signed with another key are neither accepted nor cached."""
+    token = generate_api_key("ZYXWVUTSRQPONMLKJIHGFEDCBA0987654321", "a")
+    cache = TokenCache()
+    with mock.patch.object(token_cache, "TOKEN_CACHE", cache):
+        with pytest.raises(BadSignature):
+            run(token_cache.verify_token(SECRET_KEY, token))
+    assert cache.metrics()["size"] == 0
@@ -0,0 +1,110 @@
+# Copyright 2019 Contributors to Hyperledger Sawtooth
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ------------------------------------------------------------------------------
+"""Unit Tests for wait_for_resource_in_db in rbac/server/db/db_utils.py"""
+import asyncio
+from unittest import mock
+
+from rbac.server.db import db_utils
+from tests.unit.server.conftest import run
+
+
+class FakeExists:
+    """Stands in for _resource_exists, finding the resource on the nth
+    check."""
+
+    def __init__(self, found_on=None):
+        self.found_on = found_on
+        self.checks = 0
+
+    async def __call__(self, table, index, identifier):  # pylint: disable=W0613
+        self.checks += 1
+        return self.found_on is not None and self.checks >= self.found_on
+
+
+async def open_feed(feed):
+    """Stands in for _ResourceFeed._run with a feed that opens and idles."""
+    feed.ready.set_result(True)
+    await asyncio.sleep(3600)
+
+
+async def failing_connection():
+    """Stands in for create_connection when RethinkDB is unreachable."""
+    raise OSError("connection refused")
+
+
+def test_waiters_share_one_feed():
+    """Concurrent waiters on a table share its feed and are woken by it."""
+    exists = FakeExists()
+
+    async def wait_for_two():
+        first = asyncio.ensure_future(
+            db_utils.wait_for_resource_in_db("proposals", "proposal_id", "a")
+        )
+        second = asyncio.ensure_future(
+            db_utils.wait_for_resource_in_db("proposals", "proposal_id", "b")
+        )
+        await asyncio.sleep(0.01)
+        assert len(db_utils._FEEDS) == 1  # pylint: disable=protected-access
+        feed = db_utils._FEEDS[("proposals", "proposal_id")]  # pylint: disable=W0212
+        feed._resolve("a", True)  # pylint: disable=protected-access
+        feed._resolve("b", True)  # pylint: disable=protected-access
+        return await asyncio.gather(first, second)
+
+    with mock.patch.object(
+        db_utils._ResourceFeed, "_run", open_feed  # pylint: disable=W0212
+    ), mock.patch.object(db_utils, "_resource_exists", exists):
+        assert run(wait_for_two()) == [True, True]
+    assert exists.checks == 2
+    assert not db_utils._FEEDS  # pylint: disable=protected-access
+
+
+def test_polls_without_blocking_when_feed_fails():
+    """Without a feed the resource is polled for, and other tasks keep
+    running in the meantime."""
+    exists = FakeExists(found_on=4)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def wait_with_ticker():
+        tick = asyncio.ensure_future(ticker())
+        try:
+            return await db_utils.wait_for_resource_in_db(
+                "users", "next_id", "a", timeout=5
+            )
+        finally:
+            tick.cancel()
+
+    with mock.patch.object(
+        db_utils, "create_connection", failing_connection
+    ), mock.patch.object(db_utils, "_resource_exists", exists):
+        assert run(wait_with_ticker()) is True
+    assert exists.checks == 4
+    assert len(ticks) > 1
+
+
+def test_gives_up_at_timeout():
+    """A resource that never appears times out."""
+    exists = FakeExists()
+    with mock.patch.object(
+        db_utils._ResourceFeed, "_run", open_feed  # pylint: disable=W0212
+    ), mock.patch.object(db_utils, "_resource_exists", exists):
+        found = run(
+            db_utils.wait_for_resource_in_db("users", "next_id", "a", timeout=0.1)
+        )
+    assert found is False